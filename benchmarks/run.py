@@ -0,0 +1,262 @@
+"""Offline benchmarks of the pipeline hot paths on deterministic synthetic data.
+
+    python -m benchmarks.run --scale 100k                  # time every case, print items/s
+    python -m benchmarks.run --scale 100k --check          # exit 1 if a case is slower than baseline
+    python -m benchmarks.run --scale 1k --update-baseline  # record this machine's numbers
+
+Each case gets a fresh working directory (DBs, data files); setup is not timed. Throughput is
+units per second of the best of ``--repeat`` runs. Baselines are machine specific: record them on
+the machine (or CI runner class) that runs ``--check``.
+"""
+from __future__ import annotations
+import argparse, json, logging, os, platform, shutil, sys, tempfile, time
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+import pandas as pd
+from benchmarks import synth
+
+SCALES = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+BASELINE_PATH = Path(__file__).with_name("baseline.json")
+DAY = "2024-01-02"
+BARS = 250
+CASES: Dict[str, Callable[[int], tuple]] = {}
+
+def case(fn):
+    """Register ``fn(n) -> (run, units[, score])``; ``fn`` does the untimed setup in the current directory.
+
+    ``score(result)``, if given, returns extra quality metrics (e.g. recall) reported next to the timing.
+    """
+    CASES[fn.__name__] = fn
+    return fn
+
+@lru_cache(maxsize=None)
+def _universe(n: int = 2000) -> tuple:
+    return tuple(synth.symbol_universe(n))
+
+@lru_cache(maxsize=2)
+def _items(n: int) -> tuple:
+    return tuple(synth.news_items(n, list(_universe())))
+
+@lru_cache(maxsize=2)
+def _texts(n: int) -> tuple:
+    from src.nlp.clean import clean_text
+    return tuple(clean_text(f"{it['title']}. {it['summary']}") for it in _items(n))
+
+@lru_cache(maxsize=2)
+def _rows(n: int) -> tuple:
+    return tuple(synth.nlp_rows(n, list(_universe())))
+
+def _panel(n: int) -> dict:
+    return synth.ohlcv_panel(max(1, n // BARS), BARS, end=DAY, universe=list(_universe(max(2000, n // BARS))))
+
+@case
+def clean_text(n):
+    from src.nlp.clean import clean_text as fn
+    raw = [f"{it['title']}. {it['summary']}" for it in _items(n)]
+    return (lambda: [fn(t) for t in raw]), n
+
+@case
+def map_symbols(n):
+    from src.nlp.ticker_map import load_symbol_index, map_symbols as fn
+    index = load_symbol_index(str(synth.write_symbol_csv("syms.csv", list(_universe()))), use_pickle=False)
+    texts = _texts(n)
+    return (lambda: [fn(t, index) for t in texts]), n
+
+def _mentions(n: int, fuzzy: bool):
+    from src.nlp.ticker_map import load_symbol_index, map_symbols as fn
+    # names only, under symbols that cannot occur in text, so every hit comes from the name
+    names = {u["company_name"]: u for u in _universe()}
+    universe = [{"symbol": f"S{i:05d}", "company_name": name, "aliases": name.replace(" Limited", "")} for i, name in enumerate(names)]
+    index = load_symbol_index(str(synth.write_symbol_csv("names.csv", universe)), use_pickle=False)
+    texts, gold = synth.mention_texts(n, universe)
+    kw = {"fuzzy_cutoff": 80} if fuzzy else {}
+    def score(found):
+        hits = sum(g in f for g, f in zip(gold, found))
+        return {"recall": round(hits / n, 4), "precision": round(hits / max(1, sum(len(f) for f in found)), 4)}
+    return (lambda: [fn(t, index, **kw) for t in texts]), n, score
+
+@case
+def map_symbols_exact(n):
+    return _mentions(n, fuzzy=False)
+
+@case
+def map_symbols_fuzzy(n):
+    return _mentions(n, fuzzy=True)
+
+@case
+def detect_events(n):
+    from src.nlp.events import detect_events_batch
+    texts = list(_texts(n))
+    return (lambda: detect_events_batch(texts)), n
+
+@case
+def sentiment_rule(n):
+    from src.nlp.sentiment import SentimentEngine
+    se, texts = SentimentEngine("rule"), list(_texts(n))
+    return (lambda: se.score_batch(texts)), n
+
+@case
+def dedup_cluster(n):
+    from src.nlp.dedup import DedupIndex, simhash, url_key
+    texts, urls = _texts(n), [it["url"] for it in _items(n)]
+    def run():
+        idx = DedupIndex()
+        return [idx.assign(url_key(u), simhash(t)) for u, t in zip(urls, texts)]
+    return run, n
+
+@case
+def news_insert(n):
+    from src.storage.db import NewsDB
+    db = NewsDB("news.db"); db.create_tables()
+    items = list(_items(n))
+    return (lambda: db.insert_many(items)), n
+
+@case
+def nlp_insert(n):
+    from src.storage.db_nlp_addon import NewsDB_NLP
+    db = NewsDB_NLP("news.db"); db.create_tables()
+    rows = list(_rows(n))
+    return (lambda: db.insert_many(rows)), n
+
+@case
+def features_insert(n):
+    from src.storage.db_features_addon import FeaturesDB
+    db = FeaturesDB("news.db"); db.create_tables()
+    df = synth.features_frame(n, list(_universe()), DAY)
+    return (lambda: db.insert_many(df)), n
+
+def _feature_days(n):
+    """``n`` feature rows as daily frames of ``len(_universe())`` symbols each."""
+    df = synth.features_frame(n, list(_universe()), DAY)
+    return [g.drop(columns="date") for _, g in df.groupby("fe_date", sort=True)]
+
+_TRAIN_COLS = ["news_count", "sent_mean", "EARNINGS_sum", "close", "rsi", "macd", "vol_20"]
+
+@case
+def features_parquet_load(n):
+    """Training read of the daily feature Parquet files (the path the feature store replaces)."""
+    from src.storage.files import write_frame
+    paths = []
+    for g in _feature_days(n):
+        paths.append(Path(f"features/{g['fe_date'].iloc[0]}.parquet")); write_frame(g, paths[-1])
+    return (lambda: pd.concat([pd.read_parquet(p, columns=["fe_date", "symbol", *_TRAIN_COLS]) for p in paths], ignore_index=True)), n
+
+@case
+def feature_store_load(n):
+    from src.storage.feature_store import FeatureStore
+    fs = FeatureStore("store")
+    for g in _feature_days(n): fs.write_day(g)
+    return (lambda: fs.load_arrays(columns=_TRAIN_COLS)), n
+
+@case
+def build_news_features(n):
+    from src.features.fe_news import build_news_features as fn
+    rows = list(_rows(n))
+    return (lambda: fn(rows)), n
+
+@case
+def compute_indicators(n):
+    from src.features.fe_prices import compute_indicators as fn
+    panel = _panel(n)
+    return (lambda: [fn(df, {}) for df in panel.values()]), len(panel) * BARS
+
+@case
+def compute_indicators_panel(n):
+    from src.features.fe_prices import compute_indicators_panel as fn, long_frame
+    panel = _panel(n)
+    long = long_frame(panel)
+    return (lambda: fn(long, {})), len(long)
+
+@case
+def stage_nlp(n):
+    from src import nlp_process
+    from src.storage.db_nlp_addon import NewsDB_NLP
+    from src.storage.files import append_jsonl, raw_path
+    Path("db").mkdir(exist_ok=True)
+    append_jsonl(raw_path(DAY), list(_items(n)))
+    synth.write_symbol_csv("syms.csv", list(_universe()))
+    NewsDB_NLP("db/news.db").create_tables()
+    nlp_process.init_worker({"nlp": {"cache": {"enabled": False}}, "reference": {"nse_symbols_csv": "syms.csv"}})
+    return (lambda: nlp_process.process_day(DAY)), n
+
+@case
+def stage_features(n):
+    from src import features_process
+    from src.storage.db_features_addon import FeaturesDB
+    from src.storage.db_prices_addon import PricesDB
+    from src.storage.files import ProcessedWriter, processed_path
+    Path("db").mkdir(exist_ok=True)
+    with ProcessedWriter(processed_path(DAY)) as out: out.write(list(_rows(n)))
+    store = PricesDB("db/news.db"); store.create_tables()
+    for sym, df in synth.ohlcv_panel(len(_universe()), 120, end=DAY, universe=list(_universe())).items(): store.upsert(sym, df)
+    FeaturesDB("db/news.db").create_tables()
+    features_process.init_worker({"features": {"lookback_days": 120}}, 120, False)
+    return (lambda: features_process.process_day(DAY)), n
+
+def run_case(name: str, n: int, repeat: int = 3) -> Dict:
+    best, units, quality = None, n, None
+    cwd = os.getcwd()
+    for _ in range(max(1, repeat)):
+        ws = tempfile.mkdtemp(prefix=f"bench_{name}_")
+        try:
+            os.chdir(ws)
+            fn, units, *score = CASES[name](n)
+            t0 = time.perf_counter(); out = fn(); dt = time.perf_counter() - t0
+            best = dt if best is None else min(best, dt)
+            if score and quality is None: quality = score[0](out)
+        finally:
+            os.chdir(cwd); shutil.rmtree(ws, ignore_errors=True)
+    res = {"units": units, "seconds": round(best, 4), "per_sec": round(units / max(best, 1e-9), 1)}
+    if quality: res["quality"] = quality
+    return res
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, float], threshold: float) -> List[str]:
+    """Cases whose throughput fell more than ``threshold`` (fraction) below their baseline."""
+    return [f"{name}: {r['per_sec']:.0f}/s vs baseline {baseline[name]:.0f}/s ({r['per_sec'] / baseline[name] - 1:+.0%})"
+            for name, r in results.items() if name in baseline and r["per_sec"] < baseline[name] * (1 - threshold)]
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m benchmarks.run", description="Benchmark pipeline hot paths on synthetic data")
+    ap.add_argument("--scale", choices=list(SCALES), default="1k")
+    ap.add_argument("--cases", type=str, default=None, help=f"Comma-separated subset of: {', '.join(CASES)}")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--baseline", type=str, default=str(BASELINE_PATH))
+    ap.add_argument("--check", action="store_true", help="Exit 1 if any case regressed past --threshold")
+    ap.add_argument("--threshold", type=float, default=0.3, help="Allowed throughput drop vs baseline (fraction)")
+    ap.add_argument("--update-baseline", action="store_true", help="Store these results as the baseline for --scale")
+    ap.add_argument("--out", type=str, default=None, help="Write results JSON here")
+    ap.add_argument("--verbose", action="store_true", help="Keep the pipeline's INFO logging")
+    args = ap.parse_args(argv)
+    names = args.cases.split(",") if args.cases else list(CASES)
+    unknown = [c for c in names if c not in CASES]
+    if unknown: ap.error(f"unknown cases: {unknown}")
+
+    n = SCALES[args.scale]
+    results = {}
+    if not args.verbose: logging.disable(logging.INFO)
+    try:
+        for name in names:
+            results[name] = r = run_case(name, n, args.repeat)
+            extra = "".join(f"  {k}={v}" for k, v in r.get("quality", {}).items())
+            print(f"{name:<26} {r['units']:>9} units {r['seconds']:>9.3f}s {r['per_sec']:>12.0f}/s{extra}", flush=True)
+    finally:
+        logging.disable(logging.NOTSET)
+    report = {"scale": args.scale, "python": platform.python_version(), "machine": platform.machine(), "cases": results}
+    if args.out: Path(args.out).write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+    path = Path(args.baseline)
+    baselines = json.loads(path.read_text(encoding="utf-8")) if path.exists() else {}
+    if args.update_baseline:
+        baselines.setdefault(args.scale, {}).update({k: r["per_sec"] for k, r in results.items()})
+        path.write_text(json.dumps(baselines, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+        print(f"Baseline for {args.scale} written to {path}")
+    if args.check:
+        slow = compare(results, baselines.get(args.scale, {}), args.threshold)
+        for line in slow: print(f"REGRESSION {line}")
+        if slow: return 1
+        print(f"No regressions beyond {args.threshold:.0%}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+"""Deterministic synthetic corpora: symbol universes, raw news items, processed NLP rows, OHLCV bars.
+
+Everything is a pure function of ``(n, seed)``, so benchmark runs on any machine see the same data.
+"""
+from __future__ import annotations
+import csv
+from pathlib import Path
+from typing import Dict, List
+import numpy as np
+import pandas as pd
+
+_SYL = ["ra", "ta", "ni", "ko", "vi", "sha", "man", "dra", "pur", "lak", "bha", "ind", "sun", "gan", "ver", "mo"]
+_SUFFIX = ["Industries", "Finance", "Pharma", "Motors", "Steel", "Power", "Textiles", "Chemicals", "Infra", "Foods"]
+_TEMPLATES = [
+    "{co} reports {pos} in Q{q} results; board declares interim dividend",
+    "{co} shares {move} after {neg} concerns",
+    "{co} bags order worth Rs {amt} crore from {co2}",
+    "SEBI probe into {co}; promoter resigns amid {neg}",
+    "{co} board meeting on {day} to consider fund raising via QIP",
+    "{co} announces buyback of shares at Rs {amt}",
+    "{co} to acquire stake in {co2} for Rs {amt} crore",
+    "Brokerages {rating} {co}; target price raised to Rs {amt}",
+    "{co} no loss expected despite {neg} in {co2} unit",
+    "Market wrap: Nifty ends flat, {co} and {co2} top movers",
+]
+_POS = ["profit growth", "record revenue", "margin expansion", "strong growth", "all-time high sales"]
+_NEG = ["loss", "weak demand", "penalty", "default", "litigation", "delay"]
+_MOVES = ["surge", "rally", "falls", "decline", "trade flat"]
+_RATINGS = ["upgrade", "downgrade", "reiterate buy on"]
+_EVENT_TAGS = ["EARNINGS", "DIVIDEND", "BUYBACK", "MERGER_ACQUISITION", "BOARD_MEETING", "FUNDRAISE"]
+
+def symbol_universe(n: int, seed: int = 0) -> List[Dict]:
+    """``n`` unique symbols with a company name and ``;``-joined aliases (as in nse_symbols.csv)."""
+    rng = np.random.default_rng(seed)
+    out, seen = [], set()
+    while len(out) < n:
+        stem = "".join(rng.choice(_SYL, size=rng.integers(2, 4))).capitalize()
+        sym = stem.upper()[:10]
+        if sym in seen: sym = f"{sym[:8]}{len(out) % 100:02d}"
+        if sym in seen: continue
+        seen.add(sym)
+        name = f"{stem} {rng.choice(_SUFFIX)} Limited"
+        out.append({"symbol": sym, "company_name": name, "aliases": f"{stem} {name.split()[1]};{stem}"})
+    return out
+
+def write_symbol_csv(path, universe: List[Dict]) -> Path:
+    path = Path(path); path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        w = csv.DictWriter(f, fieldnames=["symbol", "company_name", "aliases"]); w.writeheader(); w.writerows(universe)
+    return path
+
+def news_items(n: int, universe: List[Dict], day: str = "2024-01-02", seed: int = 0, dup_rate: float = 0.15) -> List[Dict]:
+    """Raw feed items for ``day``; about ``dup_rate`` of them re-word an earlier story (syndication)."""
+    rng = np.random.default_rng(seed)
+    names = [u["company_name"].replace(" Limited", "") for u in universe]
+    tpl = rng.integers(0, len(_TEMPLATES), n); co = rng.integers(0, len(names), n); co2 = rng.integers(0, len(names), n)
+    dup = rng.random(n) < dup_rate; src = rng.integers(0, np.arange(n) + 1)
+    minutes = np.sort(rng.integers(0, 24 * 60, n))
+    items = []
+    for i in range(n):
+        j = int(src[i]) if dup[i] and i else i
+        title = _TEMPLATES[tpl[j]].format(co=names[co[j]], co2=names[co2[j]], pos=_POS[j % len(_POS)], neg=_NEG[j % len(_NEG)],
+                                          move=_MOVES[j % len(_MOVES)], rating=_RATINGS[j % len(_RATINGS)],
+                                          q=j % 4 + 1, amt=100 + j % 9000, day=f"{j % 28 + 1} Jan")
+        if j != i: title = f"{title} - report"
+        items.append({"source": "rss", "title": title, "summary": f"<p>{title}. Read more at https://news.example.com/{j}</p>",
+                      "url": f"https://news.example.com/{day}/{i}", "published_at": f"{day}T{minutes[i] // 60:02d}:{minutes[i] % 60:02d}:00+05:30",
+                      "company_symbols": [], "raw": None})
+    return items
+
+_ABBREV = {"Industries": "Inds", "Finance": "Fin", "Pharma": "Phrma", "Motors": "Mtrs", "Steel": "Stl", "Power": "Pwr",
+           "Textiles": "Tex", "Chemicals": "Chem", "Infra": "Infra", "Foods": "Fds"}
+
+def mention_texts(n: int, universe: List[Dict], seed: int = 0) -> tuple:
+    """``(texts, gold)``: headlines naming one company each, exactly, abbreviated ("Ravita Inds") or with
+    a typo, and the symbol each one is about. Match against ``universe`` written without aliases."""
+    rng = np.random.default_rng(seed)
+    co = rng.integers(0, len(universe), n); kind = rng.integers(0, 3, n); cut = rng.integers(1, 4, n)
+    texts, gold = [], []
+    for i in range(n):
+        u = universe[co[i]]
+        stem, suffix = u["company_name"].split()[:2]
+        if kind[i] == 1: suffix = _ABBREV[suffix]
+        elif kind[i] == 2: stem = stem[:cut[i]] + stem[cut[i] + 1:] if len(stem) > 4 else stem + "a"
+        texts.append(f"{stem} {suffix} {_MOVES[i % len(_MOVES)]} after {_NEG[i % len(_NEG)]} update")
+        gold.append(u["symbol"])
+    return texts, gold
+
+def nlp_rows(n: int, universe: List[Dict], day: str = "2024-01-02", seed: int = 0) -> List[Dict]:
+    """Processed NLP rows (the shape ``nlp_process.annotate_items`` returns)."""
+    rng = np.random.default_rng(seed)
+    syms = [u["symbol"] for u in universe]
+    k = rng.integers(0, 3, n); s1 = rng.integers(0, len(syms), n); s2 = rng.integers(0, len(syms), n)
+    ev = rng.integers(-3, len(_EVENT_TAGS), n); score = rng.uniform(-1, 1, n)
+    cluster = np.where(rng.random(n) < 0.15, rng.integers(0, np.arange(n) + 1), np.arange(n))
+    labels = np.select([score > 0.15, score < -0.15], ["positive", "negative"], "neutral")
+    return [{"url": f"https://news.example.com/{day}/{i}", "title": f"item {i}", "published_at": f"{day}T10:{i % 60:02d}:00+05:30",
+             "symbols": [syms[s1[i]], syms[s2[i]]][:k[i]], "events": [_EVENT_TAGS[ev[i]]] if ev[i] >= 0 else [],
+             "sentiment_label": str(labels[i]), "sentiment_score": float(score[i]), "sentiment_engine": "rule", "source": "rss",
+             "cluster_id": int(cluster[i]), "simhash": None, "content_hash": f"{i:040x}",
+             "sent_version": "bench", "events_version": "bench", "map_version": "bench"} for i in range(n)]
+
+def ohlcv_panel(n_symbols: int, n_bars: int, end: str = "2024-01-02", seed: int = 0, universe: List[Dict] | None = None) -> Dict[str, pd.DataFrame]:
+    """``{symbol: bars}`` of geometric random walks ending the business day before ``end``."""
+    rng = np.random.default_rng(seed)
+    syms = [u["symbol"] for u in universe[:n_symbols]] if universe else [f"SYM{i:05d}" for i in range(n_symbols)]
+    dates = pd.bdate_range(end=pd.Timestamp(end) - pd.Timedelta(days=1), periods=n_bars)
+    rets = rng.normal(0.0003, 0.02, (n_bars, len(syms)))
+    close = 100 * np.exp(np.cumsum(rets, axis=0))
+    spread = np.abs(rng.normal(0, 0.01, (n_bars, len(syms))))
+    vol = rng.integers(10_000, 5_000_000, (n_bars, len(syms))).astype(float)
+    return {s: pd.DataFrame({"date": dates, "open": close[:, i] * (1 - spread[:, i] / 2), "high": close[:, i] * (1 + spread[:, i]),
+                             "low": close[:, i] * (1 - spread[:, i]), "close": close[:, i], "adj_close": close[:, i], "volume": vol[:, i]})
+            for i, s in enumerate(syms)}
+
+def features_frame(n: int, universe: List[Dict], fe_date: str = "2024-01-02", seed: int = 0) -> pd.DataFrame:
+    """Merged feature rows (the shape ``features_process`` writes) for ``n`` distinct (fe_date, symbol) keys,
+    one feature date per business day ending ``fe_date``."""
+    rng = np.random.default_rng(seed)
+    syms = np.array([u["symbol"] for u in universe])
+    days = pd.bdate_range(end=fe_date, periods=-(-n // len(syms)))
+    date = np.repeat(days, len(syms))[:n]; sym = np.tile(syms, len(days))[:n]
+    df = pd.DataFrame({"date": date, "symbol": sym})
+    df["fe_date"] = df["date"].dt.strftime("%Y-%m-%d")
+    for c in ("news_count", "is_pos_sum", "is_neg_sum", "is_neu_sum", "EARNINGS_sum", "DIVIDEND_sum", "ORDER_WIN_sum"):
+        df[c] = rng.integers(0, 5, n)
+    for c in ("sent_mean", "sent_max", "sent_min", "pos_ratio", "neg_ratio", "close", "sma_20", "ema_20", "ema_50",
+              "rsi", "macd", "macd_signal", "macd_hist", "atr", "vol_20"):
+        df[c] = rng.normal(0, 1, n)
+    return df
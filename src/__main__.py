@@ -0,0 +1,3 @@
+from src.pipeline import main
+
+main()
@@ -0,0 +1,278 @@
+from __future__ import annotations
+
+import argparse
+import queue
+import signal
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from src.utils.logger import get_logger
+from src.nlp_process import _CTX, annotate_items, init_worker, load_config
+from src.nlp.dedup import normalize_url
+from src.sources.rss_feeds import fetch_from_all_feeds, load_feed_state, save_feed_state
+from src.sources.nse_announcements import try_fetch_nse_announcements
+from src.storage.db import NewsDB
+from src.storage.db_nlp_addon import NewsDB_NLP
+from src.storage.engine import normalize_ts
+
+
+class SeenURLs:
+    """Bounded LRU set of item URLs already queued, so feeds repeating old items cost nothing."""
+
+    def __init__(self, maxsize: int = 200_000):
+        self.maxsize = max(1, int(maxsize))
+        self._d: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, url: str) -> bool:
+        """Remember ``url``; True if it was not seen before."""
+        with self._lock:
+            if url in self._d:
+                self._d.move_to_end(url)
+                return False
+            self._d[url] = None
+            if len(self._d) > self.maxsize:
+                self._d.popitem(last=False)
+            return True
+
+    def discard(self, url: str) -> None:
+        with self._lock:
+            self._d.pop(url, None)
+
+    def __len__(self) -> int:
+        return len(self._d)
+
+
+class FeedValidators:
+    """ETag/Last-Modified state of the daemon's feeds (its own file, not data_fetch's).
+
+    A poll's validators are committed only once every item it queued has been stored, and polls
+    commit in order. A failed batch drops all uncommitted polls, including one fetching at the
+    time, so the next poll refetches with the last committed validators.
+    """
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self.committed: Dict[str, Dict] = load_feed_state(path)
+        self._polls: OrderedDict = OrderedDict()  # poll no -> [urls not yet stored, new state]
+        self._gen = self._n = 0
+        self._lock = threading.Lock()
+
+    def current(self) -> Tuple[Dict[str, Dict], int]:
+        with self._lock:
+            return dict(self.committed), self._gen
+
+    def opened(self, gen: int, state: Dict[str, Dict], urls) -> None:
+        with self._lock:
+            if gen != self._gen:
+                return
+            self._n += 1
+            self._polls[self._n] = [set(urls), state]
+            self._flush()
+
+    def stored(self, urls) -> None:
+        with self._lock:
+            for pending, _ in self._polls.values():
+                pending.difference_update(urls)
+            self._flush()
+
+    def failed(self) -> None:
+        with self._lock:
+            self._polls.clear()
+            self._gen += 1
+
+    def _flush(self) -> None:
+        done = None
+        while self._polls and not next(iter(self._polls.values()))[0]:
+            done = self._polls.popitem(last=False)[1][1]
+        if done is not None:
+            self.committed = done
+            save_feed_state(self.path, done)
+
+
+class LatencyStats:
+    """Rolling latency samples in seconds over the last ``window`` stored items.
+
+    ``publish`` is publish time -> scored row in SQLite, ``pipeline`` is fetch -> scored row.
+    """
+
+    def __init__(self, window: int = 10_000):
+        self.samples = {"publish": deque(maxlen=window), "pipeline": deque(maxlen=window)}
+        self.items = 0
+
+    def add(self, kind: str, seconds: float) -> None:
+        self.samples[kind].append(seconds)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        out = {}
+        for kind, xs in self.samples.items():
+            if not xs:
+                continue
+            s = sorted(xs)
+            out[kind] = {"p50": s[len(s) // 2], "p95": s[min(len(s) - 1, int(len(s) * 0.95))], "max": s[-1]}
+        return out
+
+
+def published_at(item: Dict, tz) -> Optional[datetime]:
+    ts = normalize_ts(item.get("published_at"))
+    try:
+        dt = datetime.fromisoformat(ts) if ts else None
+    except ValueError:
+        return None
+    return dt.replace(tzinfo=tz) if dt is not None and dt.tzinfo is None else dt
+
+
+def poll_once(cfg: dict, seen: SeenURLs, validators: FeedValidators, stats: Optional[List[Dict]] = None) -> List[Tuple[float, Dict]]:
+    """One fetch round over all feeds (and NSE announcements if enabled); returns unseen items
+    as ``(fetched_at, item)`` and registers the round's validators with ``validators``."""
+    tz_name = cfg.get("timezone", "Asia/Kolkata")
+    fetch_cfg = cfg.get("feed_fetch", {})
+    state, gen = validators.current()
+    items, state = fetch_from_all_feeds(
+        cfg.get("feeds", []),
+        tz_name=tz_name,
+        max_workers=int(fetch_cfg.get("max_workers", 16)),
+        timeout=float(fetch_cfg.get("timeout_seconds", 15)),
+        state=state,
+        stats=stats,
+    )
+    ann_cfg = cfg.get("nse_corporate_announcements", {})
+    if ann_cfg.get("enabled"):
+        items += try_fetch_nse_announcements(datetime.now(ZoneInfo(tz_name)), ann_cfg)
+    now = time.time()
+    new = [(now, it) for it in items if normalize_url(it.get("url")) and seen.add(normalize_url(it["url"]))]
+    validators.opened(gen, state, (normalize_url(it["url"]) for _, it in new))
+    return new
+
+
+def poller(cfg: dict, q: queue.Queue, seen: SeenURLs, validators: FeedValidators, stop: threading.Event, logger) -> None:
+    every = float(cfg.get("daemon", {}).get("poll_seconds", 60))
+    while not stop.is_set():
+        t0 = time.monotonic()
+        try:
+            new = poll_once(cfg, seen, validators)
+        except Exception as e:
+            logger.warning(f"Poll failed: {type(e).__name__}: {e}")
+            new = []
+        if new:
+            logger.info(f"Poll: {len(new)} new items (queue {q.qsize()})")
+        for entry in new:
+            # a full queue blocks the poller: backpressure instead of unbounded memory
+            while not stop.is_set():
+                try:
+                    q.put(entry, timeout=1)
+                    break
+                except queue.Full:
+                    continue
+        stop.wait(max(0.0, every - (time.monotonic() - t0)))
+
+
+def micro_batches(q: queue.Queue, batch_size: int, flush_seconds: float, stop: threading.Event) -> Iterator[List]:
+    """Yield up to ``batch_size`` queued entries, or fewer once ``flush_seconds`` pass; ends when
+    ``stop`` is set and the queue is drained."""
+    while True:
+        try:
+            batch = [q.get(timeout=flush_seconds)]
+        except queue.Empty:
+            if stop.is_set():
+                return
+            continue
+        deadline = time.monotonic() + flush_seconds
+        while len(batch) < batch_size:
+            left = deadline - time.monotonic()
+            if left <= 0:
+                break
+            try:
+                batch.append(q.get(timeout=left))
+            except queue.Empty:
+                break
+        yield batch
+
+
+def store_batch(batch: List[Tuple[float, Dict]], news_db: NewsDB, latency: LatencyStats, tz) -> int:
+    """Score one micro-batch and write raw and NLP rows in one go each."""
+    items = [it for _, it in batch]
+    rows = annotate_items(items)
+    news_db.insert_many(items)
+    ins = _CTX["db"].insert_many(rows)
+    now = time.time()
+    for fetched_at, it in batch:
+        latency.add("pipeline", now - fetched_at)
+        pub = published_at(it, tz)
+        if pub is not None:
+            latency.add("publish", now - pub.timestamp())
+    latency.items += len(batch)
+    return ins
+
+
+def log_latency(logger, latency: LatencyStats) -> None:
+    parts = [f"{k} p50={v['p50']:.1f}s p95={v['p95']:.1f}s max={v['max']:.1f}s" for k, v in latency.summary().items()]
+    logger.info(f"Daemon: {latency.items} items stored | " + " | ".join(parts))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming ingest -> NLP -> SQLite daemon")
+    parser.add_argument("--config", type=str, default="config/config.yaml")
+    parser.add_argument("--once", action="store_true", help="Run a single poll, store it and exit")
+    args = parser.parse_args()
+
+    cfg = load_config(args.config)
+    d_cfg = cfg.get("daemon", {})
+    tz = ZoneInfo(cfg.get("timezone", "Asia/Kolkata"))
+    logger = get_logger(__name__)
+
+    news_db = NewsDB(cfg.get("storage", {}).get("sqlite_path", "db/news.db"))
+    news_db.create_tables()
+    NewsDB_NLP("db/news.db").create_tables()
+    init_worker(cfg)
+    seen = SeenURLs(int(d_cfg.get("seen_urls", 200_000)))
+    for url in reversed(_CTX["db"].recent_urls(seen.maxsize)):
+        seen.add(normalize_url(url))
+    latency = LatencyStats(int(d_cfg.get("latency_window", 10_000)))
+    batch_size = int(d_cfg.get("batch_size", 256))
+    logger.info(f"Daemon started: {len(cfg.get('feeds', []))} feeds, {len(seen)} known URLs")
+
+    validators = FeedValidators(d_cfg.get("state_path", "data/raw/.daemon_feed_state.json"))
+
+    if args.once:
+        new = poll_once(cfg, seen, validators)
+        for i in range(0, len(new), batch_size):
+            store_batch(new[i:i + batch_size], news_db, latency, tz)
+            validators.stored(normalize_url(it["url"]) for _, it in new[i:i + batch_size])
+        log_latency(logger, latency)
+        return
+
+    stop = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stop.set())
+    q: queue.Queue = queue.Queue(maxsize=int(d_cfg.get("queue_size", 5000)))
+    t = threading.Thread(target=poller, args=(cfg, q, seen, validators, stop, logger), name="poller", daemon=True)
+    t.start()
+    every = float(d_cfg.get("stats_seconds", 300))
+    last_log = time.monotonic()
+    for batch in micro_batches(q, batch_size, float(d_cfg.get("flush_seconds", 2)), stop):
+        try:
+            store_batch(batch, news_db, latency, tz)
+            validators.stored(normalize_url(it["url"]) for _, it in batch)
+        except Exception as e:
+            # keep the validators and forget the URLs, so the next poll refetches and requeues them
+            validators.failed()
+            for _, it in batch:
+                seen.discard(normalize_url(it["url"]))
+            logger.error(f"Batch of {len(batch)} failed: {type(e).__name__}: {e}")
+        if time.monotonic() - last_log >= every:
+            log_latency(logger, latency)
+            last_log = time.monotonic()
+    t.join(timeout=5)
+    if _CTX["cache"] is not None:
+        _CTX["cache"].close()
+    log_latency(logger, latency)
+    logger.info("Daemon stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,6 @@
 from __future__ import annotations
 
 import argparse
-import json
 import os
 from datetime import datetime, timedelta, timezone
 from zoneinfo import ZoneInfo
@@ -12,9 +11,12 @@ from typing import List, Dict
 import yaml
 
 from src.utils.logger import get_logger
-from src.sources.rss_feeds import fetch_from_all_feeds
+from src.utils.metrics import RunReport, StageMetrics, add_cli_args
+from src.sources.rss_feeds import fetch_from_all_feeds, load_feed_state, save_feed_state
 from src.sources.nse_announcements import try_fetch_nse_announcements
+from src.nlp.dedup import normalize_url
 from src.storage.db import NewsDB
+from src.storage.files import append_jsonl, raw_path, raw_urls
 
 
 def load_config(path: str = "config/config.yaml") -> dict:
@@ -41,21 +43,34 @@ def dedupe(items: List[Dict]) -> List[Dict]:
     seen = set()
     unique = []
     for it in items:
-        key = (it.get("url") or "").strip()
+        key = normalize_url(it.get("url"))
         if key and key not in seen:
             seen.add(key)
             unique.append(it)
     return unique
 
 
-def main():
-    parser = argparse.ArgumentParser(description="Phase 1: fetch daily NSE news")
-    parser.add_argument("--date", type=str, default="today", help="YYYY-MM-DD (IST) or 'today'")
-    args = parser.parse_args()
-
-    cfg = load_config()
+def log_feed_stats(logger, stats: List[Dict]) -> None:
+    if not stats:
+        return
+    failed = [st for st in stats if st["error"]]
+    unchanged = sum(1 for st in stats if st["status"] == 304)
+    lat = sorted(st["elapsed_ms"] for st in stats)
+    logger.info(
+        f"Feeds: {len(stats) - len(failed) - unchanged} fetched, {unchanged} not modified, {len(failed)} failed | "
+        f"latency p50={lat[len(lat) // 2]:.0f}ms max={lat[-1]:.0f}ms"
+    )
+    for st in sorted(stats, key=lambda x: -x["elapsed_ms"])[:5]:
+        logger.info(f"Feed {st['url']}: status={st['status']} items={st['items']} {st['elapsed_ms']:.0f}ms")
+    for st in failed:
+        logger.warning(f"Feed failed {st['url']}: {st['error']}")
+
+
+def run(cfg: dict, date_str: str | None = "today", stage: StageMetrics | None = None) -> Path:
+    """Fetch one IST day into its raw file and the DB; returns the raw file path."""
+    stage = stage if stage is not None else StageMetrics("fetch")
     tz_name = cfg.get("timezone", "Asia/Kolkata")
-    run_day = to_ist_midnight(args.date, tz_name)
+    run_day = to_ist_midnight(date_str, tz_name)
     iso_day = run_day.date().isoformat()
 
     logger = get_logger(__name__)
@@ -70,7 +85,22 @@ def main():
 
     # Collect from RSS feeds
     feeds = cfg.get("feeds", [])
-    rss_items = fetch_from_all_feeds(feeds, tz_name=tz_name)
+    fetch_cfg = cfg.get("feed_fetch", {})
+    feed_stats: List[Dict] = []
+    state_path = fetch_cfg.get("state_path", str(out_dir / ".feed_state.json"))
+    rss_items, feed_state = fetch_from_all_feeds(
+        feeds,
+        tz_name=tz_name,
+        max_workers=int(fetch_cfg.get("max_workers", 16)),
+        timeout=float(fetch_cfg.get("timeout_seconds", 15)),
+        state=load_feed_state(state_path),
+        stats=feed_stats,
+    )
+    log_feed_stats(logger, feed_stats)
+    for st in feed_stats:
+        stage.count("feeds_not_modified" if st["status"] == 304 else "feeds_failed" if st["error"] else "feeds_fetched")
+        if st["error"]: stage.failure("feed", st["url"], st["error"])
+    stage.count("rss_items", len(rss_items))
     logger.info(f"RSS items collected: {len(rss_items)}")
 
     # Optionally collect NSE corporate announcements (disabled by default)
@@ -79,20 +109,43 @@ def main():
     if ann_cfg.get("enabled"):
         ann_items = try_fetch_nse_announcements(run_day, ann_cfg)
         logger.info(f"NSE announcements collected: {len(ann_items)}")
+        stage.count("nse_items", len(ann_items))
 
     all_items = dedupe(rss_items + ann_items)
     logger.info(f"Total unique items: {len(all_items)}")
 
-    # Persist to JSON (daily file)
-    out_file = out_dir / f"{iso_day}.json"
-    with open(out_file, "w", encoding="utf-8") as f:
-        json.dump(all_items, f, ensure_ascii=False, indent=2)
+    # Persist to the daily raw file (append-only gzip JSONL; items already in it are skipped)
+    out_file = raw_path(iso_day, str(out_dir))
+    known = {normalize_url(u) for u in raw_urls(iso_day, str(out_dir))}
+    appended = append_jsonl(out_file, (it for it in all_items if normalize_url(it["url"]) not in known))
+    stage.count("appended", appended)
+    logger.info(f"Appended {appended} new items to {out_file}")
 
     # Persist to SQLite
-    inserted = db.insert_many(all_items)
+    with stage.timed("db"):
+        inserted = db.insert_many(all_items)
+    stage.add(items=len(all_items), db_rows=len(all_items))
     logger.info(f"Inserted into DB: {inserted} rows")
 
+    # Advance the feed validators only now, so a failed run refetches the same items
+    save_feed_state(state_path, feed_state)
+
     logger.info(f"Done. JSON: {out_file} | DB: {db_path}")
+    return out_file
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Phase 1: fetch daily NSE news")
+    parser.add_argument("--date", type=str, default="today", help="YYYY-MM-DD (IST) or 'today'")
+    add_cli_args(parser)
+    args = parser.parse_args()
+    cfg = load_config()
+    report = RunReport.from_args("fetch", to_ist_midnight(args.date, cfg.get("timezone", "Asia/Kolkata")).date().isoformat(), args)
+    try:
+        with report.stage("fetch") as stage:
+            run(cfg, args.date, stage)
+    finally:
+        get_logger(__name__).info(f"Run report: {report.write()}")
 
 
 if __name__ == "__main__":
@@ -1,5 +1,7 @@
 from __future__ import annotations
-from typing import Dict, List
+from datetime import date, timedelta
+from typing import Dict, List, Union
+import numpy as np
 import pandas as pd
 
 EVENTS = [
@@ -8,39 +10,63 @@ EVENTS = [
     "INSIDER_TRADE","FUNDRAISE"
 ]
 
-def _explode_rows(rows: List[Dict]) -> List[Dict]:
-    out = []
-    for r in rows:
-        syms = r.get("symbols") or []
-        for s in syms:
-            out.append({**r, "symbol": s})
-    return out
+def _days(start: str, end: str) -> List[str]:
+    d0, d1 = date.fromisoformat(start), date.fromisoformat(end)
+    return [(d0 + timedelta(days=i)).isoformat() for i in range((d1 - d0).days + 1)]
 
-def build_news_features(nlp_rows: List[Dict]) -> pd.DataFrame:
-    exploded = _explode_rows(nlp_rows)
-    if not exploded:
+def load_processed_rows(start: str, end: str, processed_dir: str = "data/processed") -> pd.DataFrame:
+    """Concatenate processed NLP day files for ``start``..``end`` (inclusive); missing days are skipped."""
+    from src.storage.files import read_processed
+    frames = [df for df in (read_processed(day, processed_dir) for day in _days(start, end)) if df is not None]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+def load_db_rows(db_path: str, start: str, end: str) -> pd.DataFrame:
+    from src.storage.db_nlp_addon import NewsDB_NLP
+    return NewsDB_NLP(db_path).frame_between(start, end)
+
+def build_news_features(nlp_rows: Union[List[Dict], pd.DataFrame]) -> pd.DataFrame:
+    """Aggregate NLP rows to one row per (date, symbol).
+
+    Accepts the processed-file rows of one or many days (list of dicts or a DataFrame with
+    list-valued ``symbols``/``events``). Rows sharing a ``cluster_id`` (near-duplicate stories
+    with the same symbol set) count once per (date, symbol).
+    """
+    df = nlp_rows if isinstance(nlp_rows, pd.DataFrame) else pd.DataFrame(list(nlp_rows))
+    if df.empty or "symbols" not in df.columns:
+        return pd.DataFrame(columns=["date","symbol"])
+    df = df.reset_index(drop=True)
+    n = len(df)
+    label = df["sentiment_label"].astype("category")
+    base = pd.DataFrame({
+        "date": pd.to_datetime(df["published_at"].astype("string").str[:10], errors="coerce"),
+        "url": df["url"] if "url" in df.columns else pd.Series([None] * n, dtype=object),
+        "is_pos": (label == "positive").astype(np.int64),
+        "is_neg": (label == "negative").astype(np.int64),
+        "is_neu": (label == "neutral").astype(np.int64),
+        "s_score": pd.to_numeric(df["sentiment_score"], errors="coerce").astype(float),
+    })
+    # one-hot of events per row: explode once, scatter category codes (presence, not counts)
+    ev = df["events"].explode() if "events" in df.columns else pd.Series(dtype=object)
+    codes = pd.Index(EVENTS).get_indexer(ev)
+    onehot = np.zeros((n, len(EVENTS)), dtype=np.int64)
+    onehot[ev.index.to_numpy()[codes >= 0], codes[codes >= 0]] = 1
+    base[EVENTS] = onehot
+    syms = df["symbols"].explode()
+    syms = syms[syms.notna()]
+    if syms.empty:
         return pd.DataFrame(columns=["date","symbol"])
-    df = pd.DataFrame(exploded)
-    df["date"] = pd.to_datetime(df["published_at"].str[:10], errors="coerce")
-    df = df.dropna(subset=["date","symbol"])
-    df["is_pos"] = (df["sentiment_label"] == "positive").astype(int)
-    df["is_neg"] = (df["sentiment_label"] == "negative").astype(int)
-    df["is_neu"] = (df["sentiment_label"] == "neutral").astype(int)
-    df["s_score"] = df["sentiment_score"].astype(float)
-    for e in EVENTS:
-        df[e] = df["events"].apply(lambda ev: int(e in (ev or [])))
-    agg = {
-        "url": "count",
-        "is_pos": "sum",
-        "is_neg": "sum",
-        "is_neu": "sum",
-        "s_score": ["mean","max","min"],
-    }
-    for e in EVENTS:
-        agg[e] = "sum"
-    g = df.groupby(["date","symbol"]).agg(agg)
-    g.columns = ["_".join([c for c in col if c]).strip("_") for col in g.columns.values]
-    g = g.rename(columns={"url_count":"news_count","s_score_mean":"sent_mean","s_score_max":"sent_max","s_score_min":"sent_min"}).reset_index()
+    ex = base.loc[syms.index].assign(symbol=pd.Categorical(syms.to_numpy()))
+    ex = ex.dropna(subset=["date","symbol"])
+    if "cluster_id" in df.columns:
+        # rows without a cluster (legacy files) stay distinct
+        cluster = pd.to_numeric(df["cluster_id"], errors="coerce").fillna(pd.Series(-1.0 - np.arange(n)))
+        ex = ex.assign(cluster=cluster.loc[ex.index].to_numpy()).drop_duplicates(subset=["date","symbol","cluster"])
+    g = ex.groupby(["date","symbol"], observed=True, sort=True).agg(
+        news_count=("url", "count"),
+        is_pos_sum=("is_pos", "sum"), is_neg_sum=("is_neg", "sum"), is_neu_sum=("is_neu", "sum"),
+        sent_mean=("s_score", "mean"), sent_max=("s_score", "max"), sent_min=("s_score", "min"),
+        **{f"{e}_sum": (e, "sum") for e in EVENTS},
+    ).reset_index()
     g["pos_ratio"] = g["is_pos_sum"] / g["news_count"].clip(lower=1)
     g["neg_ratio"] = g["is_neg_sum"] / g["news_count"].clip(lower=1)
     return g
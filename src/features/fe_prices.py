@@ -1,51 +1,191 @@
 from __future__ import annotations
-from typing import List, Dict
+from typing import Callable, List, Dict, Optional
+import numpy as np
 import pandas as pd
-import yfinance as yf
-from .indicators import sma, ema, rsi, macd, atr, realized_vol
+from src.storage.db_prices_addon import PRICE_COLS
+from .indicators import sma, ema, rsi, macd, atr, realized_vol, IndicatorState
 
-def fetch_prices(symbols: List[str], lookback_days: int, end_date: str) -> Dict[str, pd.DataFrame]:
-    prices = {}
+def _ticker(symbol: str) -> str:
+    return symbol if symbol.endswith(".NS") else f"{symbol}.NS"
+
+def yf_download(tickers: List[str], start: str, end: str) -> pd.DataFrame:
+    """One multi-ticker yfinance request; columns are (ticker, field)."""
+    import yfinance as yf
+    return yf.download(tickers, start=start, end=end, group_by="ticker", auto_adjust=False, progress=False, threads=True)
+
+def _normalize(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.rename(columns=lambda c: str(c).lower().replace(" ", "_")).dropna(how="all")
+    if df.empty: return df
+    df = df.reset_index().rename(columns={"index": "date", "Date": "date"})
+    df["date"] = pd.to_datetime(df["date"]).dt.tz_localize(None)
+    return df
+
+def _split_batch(raw: pd.DataFrame, tickers: List[str]) -> Dict[str, pd.DataFrame]:
+    if raw is None or raw.empty: return {}
+    if not isinstance(raw.columns, pd.MultiIndex):
+        return {tickers[0]: _normalize(raw)} if len(tickers) == 1 else {}
+    level = 0 if set(tickers) & set(raw.columns.get_level_values(0)) else 1
+    out = {}
+    for t in tickers:
+        if t in raw.columns.get_level_values(level):
+            out[t] = _normalize(raw.xs(t, axis=1, level=level))
+    return out
+
+def fetch_prices(
+    symbols: List[str],
+    lookback_days: int,
+    end_date: str,
+    store=None,
+    downloader: Optional[Callable[[List[str], str, str], pd.DataFrame]] = None,
+    batch_size: int = 50,
+    status: Optional[Dict[str, Dict]] = None,
+    load_from: Optional[str] = None,
+) -> Dict[str, pd.DataFrame]:
+    """Daily bars for ``symbols`` over ``lookback_days + 10`` days before ``end_date`` (exclusive).
+
+    With a ``PricesDB`` ``store`` only the missing tail after each symbol's last stored bar is
+    downloaded, in multi-ticker batches of ``batch_size``; the window is then read back from the
+    store (from ``load_from`` instead of the window start when given). Per-symbol outcomes go
+    into ``status`` (and the store's fetch-status table).
+    """
+    download = downloader or yf_download
+    status = {} if status is None else status
     end = pd.to_datetime(end_date)
     start = end - pd.Timedelta(days=lookback_days + 10)
+    stored = store.date_ranges(symbols) if store is not None else {}
+    plan: Dict[str, List[str]] = {}
     for s in symbols:
-        ysym = s if s.endswith(".NS") else f"{s}.NS"
-        try:
-            df = yf.download(ysym, start=start.strftime("%Y-%m-%d"), end=end.strftime("%Y-%m-%d"), progress=False)
-            if df.empty:
-                continue
-            df = df.rename(columns=str.lower).reset_index().rename(columns={"index":"date"})
-            df["date"] = pd.to_datetime(df["date"]).dt.tz_localize(None)
-            prices[s] = df
-        except Exception:
+        fetch_from = start
+        if s in stored:
+            first, last_ = (pd.Timestamp(d) for d in stored[s])
+            # history already covers the window start (allowing for a week of holidays): fetch the tail only
+            if first <= start + pd.Timedelta(days=7):
+                fetch_from = last_ + pd.Timedelta(days=1)
+        if np.busday_count(fetch_from.date(), end.date()) <= 0:
+            status[s] = {"status": "up_to_date", "rows": 0}
             continue
-    return prices
+        plan.setdefault(fetch_from.strftime("%Y-%m-%d"), []).append(s)
 
-def compute_indicators(df: pd.DataFrame, cfg: dict) -> pd.DataFrame:
+    fetched: Dict[str, pd.DataFrame] = {}
+    for from_str, syms in plan.items():
+        for i in range(0, len(syms), max(1, batch_size)):
+            batch = syms[i:i + max(1, batch_size)]
+            tickers = [_ticker(s) for s in batch]
+            try:
+                frames = _split_batch(download(tickers, from_str, end.strftime("%Y-%m-%d")), tickers)
+            except Exception as e:
+                for s in batch:
+                    status[s] = {"status": "error", "error": f"{type(e).__name__}: {e}", "rows": 0}
+                continue
+            for s, t in zip(batch, tickers):
+                df = frames.get(t)
+                if df is None or df.empty:
+                    status[s] = {"status": "no_data", "rows": 0}
+                    continue
+                status[s] = {"status": "ok", "rows": len(df)}
+                if store is not None:
+                    store.upsert(s, df)
+                else:
+                    fetched[s] = df
+    if store is None:
+        return fetched
+    store.record_status(status)
+    return store.load(symbols, load_from or start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d"))
+
+INDICATOR_COLS = ["sma_20", "ema_20", "ema_50", "rsi", "macd", "macd_signal", "macd_hist", "atr", "ret_1d", "ret_5d", "vol_20", "vol_chg"]
+
+def _indicators(high, low, close, volume, cfg: dict) -> dict:
+    """Indicator columns from Series (one symbol) or DataFrames (bars x symbols)."""
     p = cfg.get("indicators", {})
     rsi_p = int(p.get("rsi_period", 14))
     macd_f = int(p.get("macd_fast", 12))
     macd_s = int(p.get("macd_slow", 26))
     macd_sig = int(p.get("macd_signal", 9))
     atr_p = int(p.get("atr_period", 14))
+    macd_line, sig_line, hist = macd(close, macd_f, macd_s, macd_sig)
+    return {
+        "sma_20": sma(close, 20), "ema_20": ema(close, 20), "ema_50": ema(close, 50), "rsi": rsi(close, rsi_p),
+        "macd": macd_line, "macd_signal": sig_line, "macd_hist": hist, "atr": atr(high, low, close, atr_p),
+        "ret_1d": close.pct_change(1), "ret_5d": close.pct_change(5), "vol_20": realized_vol(close, 20),
+        "vol_chg": volume.pct_change(1),
+    }
 
+def compute_indicators(df: pd.DataFrame, cfg: dict) -> pd.DataFrame:
     out = df.copy()
-    out["sma_20"] = sma(out["close"], 20)
-    out["ema_20"] = ema(out["close"], 20)
-    out["ema_50"] = ema(out["close"], 50)
-    out["rsi"] = rsi(out["close"], rsi_p)
-    macd_line, sig_line, hist = macd(out["close"], macd_f, macd_s, macd_sig)
-    out["macd"] = macd_line; out["macd_signal"] = sig_line; out["macd_hist"] = hist
-    out["atr"] = atr(out["high"], out["low"], out["close"], atr_p)
-    out["ret_1d"] = out["close"].pct_change(1)
-    out["ret_5d"] = out["close"].pct_change(5)
-    out["vol_20"] = realized_vol(out["close"], 20)
-    out["vol_chg"] = out["volume"].pct_change(1)
+    for c, v in _indicators(out["high"], out["low"], out["close"], out["volume"], cfg).items():
+        out[c] = v
     return out
 
+def long_frame(prices: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """``{symbol: bars}`` as one long frame with a ``symbol`` column."""
+    frames = {s: df for s, df in prices.items() if df is not None and not df.empty}
+    if not frames: return pd.DataFrame(columns=["symbol", "date", *PRICE_COLS])
+    return pd.concat(frames, names=["symbol", None]).reset_index(level=0).reset_index(drop=True)
+
+def compute_indicators_panel(prices: pd.DataFrame, cfg: dict, chunk_size: int = 500) -> pd.DataFrame:
+    """``compute_indicators`` for every symbol of a long (symbol, date) frame at once.
+
+    Bars are scattered into a (bar ordinal x symbol) matrix so rolling/EWM windows run column-wise
+    in one call; symbols with shorter histories only get trailing NaNs, which never feed back into
+    earlier bars. ``chunk_size`` symbols are processed at a time to bound memory. Returns the input
+    rows sorted by (symbol, date) with the indicator columns added.
+    """
+    out = prices.sort_values(["symbol", "date"], kind="stable").reset_index(drop=True)
+    if out.empty:
+        return out.assign(**{c: pd.Series(dtype=float) for c in INDICATOR_COLS})
+    codes, uniques = pd.factorize(out["symbol"])
+    ordinal = out.groupby(codes, sort=False).cumcount().to_numpy()
+    bounds = np.searchsorted(codes, np.arange(0, len(uniques) + chunk_size, chunk_size))
+    res = {c: np.empty(len(out)) for c in INDICATOR_COLS}
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        if lo == hi: continue
+        col, row = codes[lo:hi] - codes[lo], ordinal[lo:hi]
+        shape = (row.max() + 1, col.max() + 1)
+        def wide(name):
+            a = np.full(shape, np.nan); a[row, col] = out[name].to_numpy(dtype=float)[lo:hi]
+            return pd.DataFrame(a)
+        for c, v in _indicators(wide("high"), wide("low"), wide("close"), wide("volume"), cfg).items():
+            res[c][lo:hi] = v.to_numpy()[row, col]
+    return out.assign(**res)
+
+def asof_join(left: pd.DataFrame, prices: pd.DataFrame, on: str = "fe_date", by: str = "symbol") -> pd.DataFrame:
+    """Attach to each ``left`` row the latest bar of its symbol dated on or before ``left[on]``.
+
+    Point-in-time: every row can carry its own as-of date. Columns shared with ``prices`` (e.g.
+    the news ``date``) keep a ``_news`` suffix, as with the plain symbol merge.
+    """
+    key = pd.to_datetime(left[on])
+    l = left.assign(_asof=key.to_numpy(), _order=np.arange(len(left)), **{by: left[by].astype(str)}).sort_values("_asof", kind="stable")
+    r = prices.assign(_asof=pd.to_datetime(prices["date"]).astype(key.dtype), **{by: prices[by].astype(str)}).sort_values("_asof", kind="stable")
+    m = pd.merge_asof(l, r, on="_asof", by=by, suffixes=("_news", ""))
+    return m.sort_values("_order").drop(columns=["_asof", "_order"]).reset_index(drop=True)
+
 def latest_asof(df: pd.DataFrame, date_str: str):
     d = pd.to_datetime(date_str)
     f = df[df["date"] <= d]
     if f.empty:
         return None
     return f.sort_values("date").iloc[-1]
+
+def latest_incremental(prices: Dict[str, pd.DataFrame], cfg: dict, states: Dict[str, dict]):
+    """Advance per-symbol ``IndicatorState`` with bars newer than each state's ``asof``.
+
+    ``states`` holds serialised states (``IndicatorState.to_dict``); a missing state, or one built
+    with other indicator parameters, is warm-started from the bars given. Returns the latest row
+    per symbol and the updated serialised states.
+    """
+    rows, new_states = [], {}
+    params = IndicatorState.from_config(cfg).params
+    for sym in sorted(set(prices) | set(states)):
+        d = states.get(sym)
+        st = IndicatorState.from_dict(d) if d and d.get("params") == params else IndicatorState.from_config(cfg)
+        df = prices.get(sym)
+        if df is not None and not df.empty:
+            if st.asof is not None:
+                df = df[df["date"] > pd.Timestamp(st.asof)]
+            st.warm_start(df.sort_values("date"))
+        if not st.last: continue
+        new_states[sym] = st.to_dict()
+        row = dict(st.last); row["date"] = pd.Timestamp(row["date"]); row["symbol"] = sym
+        rows.append(row)
+    return rows, new_states
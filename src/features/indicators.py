@@ -1,4 +1,6 @@
 from __future__ import annotations
+import math
+from collections import deque
 import numpy as np
 import pandas as pd
 
@@ -26,9 +28,122 @@ def macd(close: pd.Series, fast: int = 12, slow: int = 26, signal: int = 9):
 
 def atr(high: pd.Series, low: pd.Series, close: pd.Series, period: int = 14) -> pd.Series:
     prev_close = close.shift(1)
-    tr = pd.concat([(high - low), (high - prev_close).abs(), (low - prev_close).abs()], axis=1).max(axis=1)
+    # fmax skips NaN like a row-wise max and also works column-wise on (bars x symbols) panels
+    tr = np.fmax(np.fmax(high - low, (high - prev_close).abs()), (low - prev_close).abs())
     return tr.rolling(window=period, min_periods=period).mean()
 
 def realized_vol(close: pd.Series, window: int = 20) -> pd.Series:
     log_ret = np.log(close/close.shift(1))
     return log_ret.rolling(window=window, min_periods=window).std() * np.sqrt(252)
+
+def _pct(a: float, b: float) -> float:
+    # same result as pandas pct_change, including division by zero
+    if b == 0 or b != b:
+        return float("nan") if (a == 0 or a != a or b != b) else math.copysign(math.inf, a)
+    return a / b - 1
+
+def _mean(buf: deque, n: int) -> float:
+    return sum(buf) / n if len(buf) == n else float("nan")
+
+class IndicatorState:
+    """Incremental version of ``compute_indicators`` for one symbol.
+
+    Holds EMA values, RSI gain/loss, ATR true-range and rolling-window buffers so that ``update``
+    handles a new bar in O(1) and returns the same values as a full recomputation's last row.
+    ``to_dict``/``from_dict`` round-trip through JSON for persistence between runs.
+    """
+    WINDOW = 20
+
+    def __init__(self, rsi_period: int = 14, macd_fast: int = 12, macd_slow: int = 26, macd_signal: int = 9, atr_period: int = 14):
+        self.params = {"rsi_period": int(rsi_period), "macd_fast": int(macd_fast), "macd_slow": int(macd_slow),
+                       "macd_signal": int(macd_signal), "atr_period": int(atr_period)}
+        self.n = 0
+        self.n_macd = 0
+        self.asof = None
+        self.prev_close = None
+        self.prev_volume = None
+        self.ema = {}
+        self.closes = deque(maxlen=self.WINDOW)
+        self.gains = deque(maxlen=self.params["rsi_period"])
+        self.losses = deque(maxlen=self.params["rsi_period"])
+        self.trs = deque(maxlen=self.params["atr_period"])
+        self.log_rets = deque(maxlen=self.WINDOW)
+        self.last = {}
+
+    @classmethod
+    def from_config(cls, cfg: dict) -> "IndicatorState":
+        p = cfg.get("indicators", {})
+        return cls(p.get("rsi_period", 14), p.get("macd_fast", 12), p.get("macd_slow", 26), p.get("macd_signal", 9), p.get("atr_period", 14))
+
+    def _ema(self, key: str, x: float, span: int) -> float:
+        a = 2.0 / (span + 1)
+        self.ema[key] = x if key not in self.ema else (1 - a) * self.ema[key] + a * x
+        return self.ema[key]
+
+    def update(self, date, high: float, low: float, close: float, volume: float) -> dict:
+        p = self.params
+        self.n += 1
+        pc = self.prev_close
+        delta = close - pc if pc is not None else float("nan")
+        self.gains.append(delta if delta > 0 else 0.0)
+        self.losses.append(-delta if delta < 0 else 0.0)
+        self.trs.append(high - low if pc is None else max(high - low, abs(high - pc), abs(low - pc)))
+        if pc is not None:
+            self.log_rets.append(math.log(close / pc) if pc > 0 and close > 0 else float("nan"))
+        self.closes.append(close)
+
+        ema20 = self._ema("ema_20", close, 20)
+        ema50 = self._ema("ema_50", close, 50)
+        fast = self._ema("fast", close, p["macd_fast"])
+        slow = self._ema("slow", close, p["macd_slow"])
+        nan = float("nan")
+        macd_v = fast - slow if self.n >= max(p["macd_fast"], p["macd_slow"]) else nan
+        sig_v = nan
+        if macd_v == macd_v:
+            self.n_macd += 1
+            sig = self._ema("signal", macd_v, p["macd_signal"])
+            sig_v = sig if self.n_macd >= p["macd_signal"] else nan
+        gain, loss = _mean(self.gains, p["rsi_period"]), _mean(self.losses, p["rsi_period"])
+        rsi_v = 100 - 100 / (1 + gain / loss) if loss == loss and loss != 0 else nan
+        vol = nan
+        if len(self.log_rets) == self.WINDOW:
+            m = sum(self.log_rets) / self.WINDOW
+            vol = math.sqrt(sum((x - m) ** 2 for x in self.log_rets) / (self.WINDOW - 1)) * math.sqrt(252)
+        out = {
+            "sma_20": _mean(self.closes, self.WINDOW),
+            "ema_20": ema20 if self.n >= 20 else nan,
+            "ema_50": ema50 if self.n >= 50 else nan,
+            "rsi": rsi_v,
+            "macd": macd_v, "macd_signal": sig_v, "macd_hist": macd_v - sig_v,
+            "atr": _mean(self.trs, p["atr_period"]),
+            "ret_1d": _pct(close, pc) if pc is not None else nan,
+            "ret_5d": _pct(close, self.closes[-6]) if len(self.closes) >= 6 else nan,
+            "vol_20": vol,
+            "vol_chg": _pct(volume, self.prev_volume) if self.prev_volume is not None else nan,
+        }
+        self.prev_close, self.prev_volume = close, volume
+        self.asof = pd.Timestamp(date).date().isoformat()
+        self.last = {"date": self.asof, "high": high, "low": low, "close": close, "volume": volume, **out}
+        return out
+
+    def warm_start(self, df: pd.DataFrame) -> dict:
+        """Feed historical bars (``date/high/low/close/volume`` columns, oldest first)."""
+        out = {}
+        for d, h, l, c, v in df[["date", "high", "low", "close", "volume"]].itertuples(index=False, name=None):
+            out = self.update(d, float(h), float(l), float(c), float(v))
+        return out
+
+    def to_dict(self) -> dict:
+        return {"params": self.params, "n": self.n, "n_macd": self.n_macd, "asof": self.asof,
+                "prev_close": self.prev_close, "prev_volume": self.prev_volume, "ema": self.ema,
+                "closes": list(self.closes), "gains": list(self.gains), "losses": list(self.losses),
+                "trs": list(self.trs), "log_rets": list(self.log_rets), "last": self.last}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "IndicatorState":
+        st = cls(**d["params"])
+        st.n, st.n_macd, st.asof = d["n"], d["n_macd"], d["asof"]
+        st.prev_close, st.prev_volume, st.ema, st.last = d["prev_close"], d["prev_volume"], dict(d["ema"]), dict(d["last"])
+        for k in ("closes", "gains", "losses", "trs", "log_rets"):
+            getattr(st, k).extend(d[k])
+        return st
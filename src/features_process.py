@@ -1,27 +1,160 @@
 from __future__ import annotations
-import argparse, json
+import argparse
 from pathlib import Path
+from typing import Optional
 import yaml, pandas as pd
 from src.utils.logger import get_logger
-from src.features.fe_news import build_news_features
-from src.features.fe_prices import fetch_prices, compute_indicators, latest_asof
+from src.utils.metrics import RunReport, StageMetrics, add_cli_args
+from src.utils.backfill import day_range, run_days
+from src.storage.feature_store import FeatureStore
+from src.storage.files import read_processed, write_frame
+from src.features.fe_news import build_news_features, load_processed_rows
+from src.features.fe_prices import fetch_prices, compute_indicators_panel, long_frame, latest_incremental, asof_join
+from src.features.indicators import IndicatorState
 from src.storage.db_features_addon import FeaturesDB
+from src.storage.db_prices_addon import PricesDB
+
+_CTX: dict = {}
 
 def load_config(path: str = "config/config.yaml") -> dict:
     with open(path, "r", encoding="utf-8") as f:
         return yaml.safe_load(f)
 
+def _price_store(feat_cfg: dict) -> Optional[PricesDB]:
+    px_cfg = feat_cfg.get("price_cache", {})
+    return PricesDB(px_cfg.get("sqlite_path", "db/news.db")) if px_cfg.get("enabled", True) else None
+
+def init_worker(cfg: dict, lookback: int, incremental: bool) -> None:
+    feat_cfg = cfg.get("features", {})
+    store = _price_store(feat_cfg)
+    _CTX.update(feat_cfg=feat_cfg, lookback=lookback, store=store, incremental=incremental and store is not None,
+                db=FeaturesDB("db/news.db"), logger=get_logger(__name__))
+
+def feature_store(feat_cfg: dict) -> Optional[FeatureStore]:
+    st_cfg = feat_cfg.get("store", {})
+    return FeatureStore(st_cfg.get("root", "data/feature_store")) if st_cfg.get("enabled", True) else None
+
+def output_path(raw_day: str) -> Path:
+    return Path(f"data/processed/features/{raw_day}.parquet")
+
+def process_day(raw_day: str, stage: Optional[StageMetrics] = None) -> Optional[int]:
+    """Features for one processed NLP day; returns the number of feature rows (None if nothing was built).
+
+    The Parquet file is written last and atomically, so its presence marks a completed day.
+    """
+    feat_cfg, store, logger = _CTX["feat_cfg"], _CTX["store"], _CTX["logger"]
+    stage = stage if stage is not None else StageMetrics("features")
+    nlp_rows = read_processed(raw_day)
+    if nlp_rows is None:
+        logger.error(f"Processed NLP file not found for {raw_day}. Run src/nlp_process.py first.")
+        return None
+
+    news_df = build_news_features(nlp_rows)
+    if news_df.empty:
+        logger.warning(f"{raw_day}: no news features to build."); return None
+
+    symbols = sorted(news_df["symbol"].unique().tolist())
+    logger.info(f"{raw_day}: symbols to fetch prices for: {len(symbols)}")
+    px_cfg = feat_cfg.get("price_cache", {})
+    incremental = _CTX["incremental"]
+    states, load_from = {}, None
+    if incremental:
+        # states built past raw_day (e.g. when backfilling) cannot be rewound, and states built with
+        # other indicator params are discarded; those symbols warm-start from the full lookback
+        params = IndicatorState.from_config(feat_cfg).params
+        states = {s: st for s, st in store.load_indicator_states(symbols).items()
+                  if st.get("asof") and st["asof"] < raw_day and st.get("params") == params}
+        if states and len(states) == len(symbols):
+            load_from = (pd.Timestamp(min(st["asof"] for st in states.values())) + pd.Timedelta(days=1)).date().isoformat()
+        logger.info(f"Incremental indicators: {len(states)}/{len(symbols)} symbols have state")
+    fetch_status = {}
+    with stage.timed("prices"):
+        prices = fetch_prices(symbols, lookback_days=_CTX["lookback"], end_date=raw_day, store=store,
+                              batch_size=int(px_cfg.get("batch_size", 50)), status=fetch_status, load_from=load_from)
+    counts = pd.Series([st["status"] for st in fetch_status.values()]).value_counts().to_dict()
+    logger.info(f"Price fetch status: {counts}")
+    for k, n in counts.items(): stage.count(f"prices_{k}", int(n))
+    for sym, st in fetch_status.items():
+        if st["status"] == "error":
+            logger.warning(f"Price fetch failed for {sym}: {st.get('error')}"); stage.failure("symbol", sym, st.get("error"))
+        elif st["status"] == "no_data":
+            stage.failure("symbol", sym, "no_data")
+
+    if incremental:
+        price_rows, new_states = latest_incremental(prices, feat_cfg, states)
+        store.save_indicator_states(new_states)
+        price_df = pd.DataFrame(price_rows)
+    else:
+        price_df = compute_indicators_panel(long_frame(prices), feat_cfg)
+    if price_df.empty:
+        logger.error(f"{raw_day}: no price rows computed."); return None
+
+    merged = asof_join(news_df.assign(fe_date=raw_day), price_df)
+    merged["fe_date"] = merged.pop("fe_date")
+
+    with stage.timed("db"):
+        ins = _CTX["db"].insert_many(merged)
+    stage.add(items=len(merged), db_rows=ins)
+    logger.info(f"Inserted/updated {ins} feature rows into DB")
+    out_path = output_path(raw_day)
+    write_frame(merged, out_path)
+    logger.info(f"Wrote features: {out_path} with {len(merged)} rows")
+    fs = feature_store(feat_cfg)
+    if fs is not None:
+        with stage.timed("store"): fs.write_day(merged, raw_day)
+    return len(merged)
+
+def prefetch_range(cfg: dict, days: list, lookback: int, logger) -> None:
+    """Fill the price cache once for every symbol of ``days`` so backfill workers only read it."""
+    store = _price_store(cfg.get("features", {}))
+    if store is None: return
+    rows = load_processed_rows(days[0], days[-1])
+    if rows.empty or "symbols" not in rows: return
+    symbols = sorted(set(rows["symbols"].explode().dropna()))
+    span = (pd.Timestamp(days[-1]) - pd.Timestamp(days[0])).days
+    status = {}
+    fetch_prices(symbols, lookback_days=lookback + span, end_date=days[-1], store=store,
+                 batch_size=int(cfg.get("features", {}).get("price_cache", {}).get("batch_size", 50)), status=status)
+    logger.info(f"Prefetched prices for {len(symbols)} symbols: {pd.Series([s['status'] for s in status.values()]).value_counts().to_dict()}")
+
 def main():
     ap = argparse.ArgumentParser(description="Phase 2: Feature Engineering (news + prices)")
     ap.add_argument("--date", type=str, default="today", help="YYYY-MM-DD or 'today' (local)")
+    ap.add_argument("--start", type=str, default=None, help="Backfill from YYYY-MM-DD (with --end)")
+    ap.add_argument("--end", type=str, default=None, help="Backfill up to YYYY-MM-DD inclusive")
+    ap.add_argument("--workers", type=int, default=None, help="Backfill processes (default: CPU count)")
+    ap.add_argument("--force", action="store_true", help="Backfill: redo days that already have output")
     ap.add_argument("--config", type=str, default="config/config.yaml")
     ap.add_argument("--lookback", type=int, default=None, help="Override lookback days")
+    add_cli_args(ap)
     args = ap.parse_args()
 
     logger = get_logger(__name__)
     cfg = load_config(args.config)
     feat_cfg = cfg.get("features", {})
     lookback = args.lookback or int(feat_cfg.get("lookback_days", 180))
+    store = _price_store(feat_cfg)
+    if store is not None: store.create_tables()
+    FeaturesDB("db/news.db").create_tables()
+
+    if args.start or args.end:
+        days = day_range(args.start or args.end, args.end or args.start)
+        todo = [d for d in days if args.force or not output_path(d).exists()]
+        logger.info(f"Feature backfill {days[0]}..{days[-1]}: {len(todo)}/{len(days)} days to process")
+        if not todo: return
+        prefetch_range(cfg, todo, lookback, logger)
+        # days finish out of order, so per-symbol incremental state is not used here
+        report = RunReport.from_args("features_backfill", f"{days[0]}..{days[-1]}", args)
+        try:
+            with report.stage("features") as stage:
+                res = run_days(todo, process_day, init_worker, (cfg, lookback, False), args.workers, logger)
+                stage.add(items=sum(v or 0 for v in res.values()))
+                for d, v in res.items():
+                    if v is None: stage.failure("day", d, "failed")
+        finally:
+            logger.info(f"Run report: {report.write()}")
+        logger.info(f"Backfill finished: {sum(1 for v in res.values() if v is not None)}/{len(todo)} days, {sum(v or 0 for v in res.values())} rows")
+        return
 
     raw_day = args.date
     if raw_day == "today":
@@ -29,43 +162,13 @@ def main():
         from zoneinfo import ZoneInfo
         tz = ZoneInfo(cfg.get("timezone","Asia/Kolkata"))
         raw_day = datetime.now(tz).date().isoformat()
-
-    proc_path = Path(f"data/processed/{raw_day}.json")
-    if not proc_path.exists():
-        logger.error(f"Processed NLP file not found: {proc_path}. Run src/nlp_process.py first.")
-        return
-
-    nlp_rows = json.loads(proc_path.read_text(encoding="utf-8"))
-    news_df = build_news_features(nlp_rows)
-    if news_df.empty:
-        logger.warning("No news features to build."); return
-
-    symbols = sorted(news_df["symbol"].unique().tolist())
-    logger.info(f"Symbols to fetch prices for: {len(symbols)}")
-    prices = fetch_prices(symbols, lookback_days=lookback, end_date=raw_day)
-
-    price_rows = []
-    for sym, df in prices.items():
-        if df is None or df.empty: continue
-        df2 = compute_indicators(df, cfg.get("features", {}))
-        row = latest_asof(df2, raw_day)
-        if row is not None:
-            r = row.to_dict(); r["symbol"] = sym; price_rows.append(r)
-
-    price_df = pd.DataFrame(price_rows)
-    if price_df.empty:
-        logger.error("No price rows computed."); return
-
-    merged = news_df.merge(price_df, on="symbol", how="left", suffixes=("_news",""))
-    merged["fe_date"] = raw_day
-
-    out_dir = Path("data/processed/features"); out_dir.mkdir(parents=True, exist_ok=True)
-    out_path = out_dir / f"{raw_day}.csv"
-    merged.to_csv(out_path, index=False, encoding="utf-8")
-    logger.info(f"Wrote features: {out_path} with {len(merged)} rows")
-
-    db = FeaturesDB("db/news.db"); db.create_tables(); ins = db.insert_many(merged)
-    logger.info(f"Inserted/updated {ins} feature rows into DB")
+    report = RunReport.from_args("features", raw_day, args)
+    try:
+        with report.stage("features") as stage:
+            init_worker(cfg, lookback, bool(feat_cfg.get("incremental", False)))
+            process_day(raw_day, stage=stage)
+    finally:
+        logger.info(f"Run report: {report.write()}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,87 @@
+
+from __future__ import annotations
+import hashlib, json, sqlite3, time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List
+
+_CHUNK = 500
+
+def content_key(namespace: str, text: str) -> str:
+    return hashlib.sha256(f"{namespace}\x00{text or ''}".encode("utf-8")).hexdigest()
+
+class ResultCache:
+    """Disk-backed LRU cache of JSON-serialisable NLP results.
+
+    Entries are keyed by ``sha256(namespace + text)``; the namespace carries the engine, model
+    and rule versions, so a model or lexicon change simply misses. The least recently used
+    entries are evicted once ``max_entries`` is exceeded.
+    """
+    def __init__(self, path: str, max_entries: int = 500_000):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.max_entries = max(1, int(max_entries))
+        self.hits = 0
+        self.misses = 0
+        self._conn = sqlite3.connect(path, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS nlp_cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, used INTEGER NOT NULL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_nlp_cache_used ON nlp_cache(used)")
+        self._conn.commit()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM nlp_cache").fetchone()[0]
+
+    def get_many(self, namespace: str, texts: Iterable[str]) -> Dict[str, object]:
+        keys = {content_key(namespace, t): t for t in dict.fromkeys(texts)}
+        found: Dict[str, object] = {}
+        klist = list(keys)
+        for i in range(0, len(klist), _CHUNK):
+            chunk = klist[i:i + _CHUNK]
+            q = f"SELECT key, value FROM nlp_cache WHERE key IN ({','.join('?' * len(chunk))})"
+            for k, v in self._conn.execute(q, chunk):
+                found[keys[k]] = json.loads(v)
+        if found:
+            now = time.time_ns()
+            self._conn.executemany("UPDATE nlp_cache SET used = ? WHERE key = ?", [(now, content_key(namespace, t)) for t in found])
+            self._conn.commit()
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def get(self, namespace: str, text: str):
+        return self.get_many(namespace, [text]).get(text)
+
+    def put_many(self, namespace: str, results: Dict[str, object]) -> None:
+        if not results: return
+        now = time.time_ns()
+        before = self._conn.total_changes
+        self._conn.executemany(
+            "INSERT INTO nlp_cache(key, value, used) VALUES (?, ?, ?) ON CONFLICT(key) DO NOTHING",
+            [(content_key(namespace, t), json.dumps(v, ensure_ascii=False), now) for t, v in results.items()],
+        )
+        self._count += self._conn.total_changes - before
+        if self._count > self.max_entries:
+            excess = self._count - self.max_entries
+            self._conn.execute("DELETE FROM nlp_cache WHERE key IN (SELECT key FROM nlp_cache ORDER BY used LIMIT ?)", (excess,))
+            self._count -= excess
+        self._conn.commit()
+
+    def put(self, namespace: str, text: str, value) -> None:
+        self.put_many(namespace, {text: value})
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": (self.hits / total) if total else 0.0, "entries": self._count}
+
+    def close(self) -> None:
+        self._conn.close()
+
+def cached_apply(cache: ResultCache | None, namespace: str, texts: List[str], fn: Callable[[List[str]], List]) -> List:
+    """Apply batch function ``fn`` to ``texts``, computing only distinct texts missing from ``cache``."""
+    if cache is None: return fn(texts)
+    found = cache.get_many(namespace, texts)
+    missing = [t for t in dict.fromkeys(texts) if t not in found]
+    if missing:
+        computed = dict(zip(missing, fn(missing)))
+        cache.put_many(namespace, computed)
+        found.update(computed)
+    return [found[t] for t in texts]
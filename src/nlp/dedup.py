@@ -0,0 +1,122 @@
+from __future__ import annotations
+import hashlib, re
+from array import array
+from typing import Iterable, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+import numpy as np
+
+_TRACKING = {"fbclid", "gclid", "yclid", "dclid", "msclkid", "igshid", "mc_cid", "mc_eid", "cmpid", "ref", "ref_src", "from", "_ga"}
+_token_re = re.compile(r"\w+")
+_SHIFTS = np.arange(64, dtype=np.uint64)
+_SCAN_MIN = 64
+
+def normalize_url(url: str | None) -> str:
+    """Canonical form for de-duplication: lower-case host without ``www.``, no fragment, no
+    tracking parameters (``utm_*``, ``fbclid``...), sorted query, no trailing slash."""
+    url = (url or "").strip()
+    if not url: return ""
+    try:
+        p = urlsplit(url)
+    except ValueError:
+        return url
+    host = (p.hostname or "").lower()
+    if host.startswith("www."): host = host[4:]
+    if p.port and not ((p.scheme == "http" and p.port == 80) or (p.scheme == "https" and p.port == 443)):
+        host = f"{host}:{p.port}"
+    query = sorted((k, v) for k, v in parse_qsl(p.query, keep_blank_values=True)
+                   if not k.lower().startswith("utm_") and k.lower() not in _TRACKING)
+    return urlunsplit((p.scheme.lower(), host, p.path.rstrip("/") or "/", urlencode(query), ""))
+
+def _h64(s: str) -> int:
+    return int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little")
+
+def simhash(text: str) -> Optional[int]:
+    """64-bit SimHash over word bigrams of the casefolded text; None when there are no words."""
+    words = _token_re.findall((text or "").casefold())
+    if not words: return None
+    grams = [f"{a} {b}" for a, b in zip(words, words[1:])] or words
+    h = np.fromiter((_h64(g) for g in grams), dtype=np.uint64, count=len(grams))
+    ones = ((h[:, None] >> _SHIFTS) & np.uint64(1)).sum(axis=0)
+    return int(((ones * 2 > len(grams)).astype(np.uint64) << _SHIFTS).sum())
+
+def to_signed(fp: int) -> int:
+    """SQLite INTEGER is signed 64-bit."""
+    return fp - (1 << 64) if fp >= 1 << 63 else fp
+
+def to_unsigned(fp: int) -> int:
+    return fp + (1 << 64) if fp < 0 else fp
+
+def url_key(url: str | None) -> int:
+    """Positive 63-bit id of a normalised URL; used as the cluster id of the story first seen."""
+    return _h64(normalize_url(url)) >> 1
+
+def symbols_tag(symbols: Iterable[str]) -> int:
+    """Order-free id of an item's symbol set; only items with equal tags share a cluster."""
+    return _h64("|".join(sorted(set(symbols)))) >> 1
+
+class DedupIndex:
+    """SimHash near-duplicate index with banded LSH buckets.
+
+    Fingerprints are split into ``bands`` blocks; two fingerprints within ``max_distance`` bits
+    (< ``bands``) share at least one block exactly, so a lookup only compares the entries of the
+    item's ``bands`` buckets. Each entry keeps the cluster id of the first story it matched and a
+    symbol-set tag: templated headlines ("X Q2 profit rises 12%") differ by a few bits across
+    companies, so matches are restricted to entries with the same tag. Storage is flat arrays,
+    about 40 bytes per indexed item.
+    """
+    def __init__(self, max_distance: int = 3, bands: int = 4):
+        if bands <= max_distance: raise ValueError("bands must exceed max_distance")
+        self.max_distance, self.bands = max_distance, bands
+        self.width = 64 // bands
+        self._mask = (1 << self.width) - 1
+        self.fps = array("Q")
+        self.clusters = array("q")
+        self.tags = array("q")
+        self.buckets: list[dict[int, array]] = [{} for _ in range(bands)]
+
+    def __len__(self) -> int:
+        return len(self.fps)
+
+    def _blocks(self, fp: int) -> Iterable[int]:
+        return ((fp >> (b * self.width)) & self._mask for b in range(self.bands))
+
+    def query(self, fp: int, tag: int = 0) -> Optional[int]:
+        """Cluster id of the closest indexed fingerprint with ``tag`` within ``max_distance``, if any."""
+        best, best_d = None, self.max_distance + 1
+        fps = tags = None
+        for b, block in enumerate(self._blocks(fp)):
+            bucket = self.buckets[b].get(block)
+            if not bucket: continue
+            if len(bucket) < _SCAN_MIN:
+                for i in bucket:
+                    if self.tags[i] != tag: continue
+                    d = (self.fps[i] ^ fp).bit_count()
+                    if d < best_d: best, best_d = i, d
+                continue
+            # templated headlines crowd a few buckets; scan those with one vectorised popcount
+            if fps is None: fps, tags = np.frombuffer(self.fps, dtype=np.uint64), np.frombuffer(self.tags, dtype=np.int64)
+            idx = np.frombuffer(bucket, dtype=np.uint32)
+            idx = idx[tags[idx] == tag]
+            if not len(idx): continue
+            dist = np.bitwise_count(fps[idx] ^ np.uint64(fp))
+            j = int(dist.argmin())
+            if dist[j] < best_d: best, best_d = int(idx[j]), int(dist[j])
+        del fps, tags
+        return None if best is None else self.clusters[best]
+
+    def add(self, fp: int, cluster: int, tag: int = 0) -> None:
+        i = len(self.fps)
+        self.fps.append(fp); self.clusters.append(cluster); self.tags.append(tag)
+        for b, block in enumerate(self._blocks(fp)):
+            bucket = self.buckets[b].get(block)
+            if bucket is None:
+                bucket = self.buckets[b][block] = array("I")
+            bucket.append(i)
+
+    def assign(self, key: int, fp: Optional[int], tag: int = 0) -> int:
+        """Cluster id for a new item: an existing near-duplicate's cluster (same ``tag``), else ``key``."""
+        if fp is None: return key
+        cluster = self.query(fp, tag)
+        if cluster is None: cluster = key
+        self.add(fp, cluster, tag)
+        return cluster
@@ -1,6 +1,6 @@
 
 from __future__ import annotations
-import re
+import hashlib, re
 EVENT_PATTERNS = {
     "EARNINGS": [re.compile(r"(?i)results? (?:for|of|q[1-4]|quarter|annual|fy\d{2,4})"),
                  re.compile(r"(?i)financial (?:results|statements)")],
@@ -21,9 +21,47 @@ EVENT_PATTERNS = {
     "INSIDER_TRADE": [re.compile(r"(?i)insider trading|promoter (?:buy|sell)|share sale by promoter")],
     "FUNDRAISE": [re.compile(r"(?i)QIP|qualified institutional placement|rights issue|preferential issue|NCD|debenture issue")],
 }
+# Literal keywords (casefolded) that any match of the tag's patterns must contain. They prefilter
+# the text so only plausible tags run their confirmation regex; keep them in sync with the patterns.
+EVENT_KEYWORDS = {
+    "EARNINGS": ["result", "financial"],
+    "DIVIDEND": ["dividend"],
+    "BUYBACK": ["buy", "share repurchase"],
+    "SPLIT": ["split"],
+    "BONUS": ["bonus"],
+    "MERGER_ACQUISITION": ["merger", "amalgamation", "acquisition", "acquires", "takeover"],
+    "BOARD_MEETING": ["board meeting"],
+    "PLEDGE": ["pledg"],
+    "LITIGATION": ["litigation", "lawsuit", "legal notice", "court order", "writ"],
+    "REGULATORY": ["sebi", "rbi", "nclt", "nclat", "sat", "regulator", "show cause"],
+    "RATING_ACTION": ["rating", "crisil", "icra", "fitch", "moody"],
+    "ORDER_WIN": ["order win", "secures order", "bags order", "contract worth"],
+    "GUIDANCE": ["guidance", "outlook"],
+    "CAPEX": ["capex", "capital expenditure", "expansion plan"],
+    "INSIDER_TRADE": ["insider trading", "promoter", "share sale by promoter"],
+    "FUNDRAISE": ["qip", "qualified institutional placement", "rights issue", "preferential issue", "ncd", "debenture issue"],
+}
+def _casefold_pattern(src: str) -> str:
+    # lower-case literals but not escapes (\d, \s), so the regex can run case-sensitively on casefolded text
+    out, esc = [], False
+    for ch in src.replace("(?i)", ""):
+        out.append(ch if esc else ch.lower()); esc = ch == "\\" and not esc
+    return "".join(out)
+_CONFIRM = {t: re.compile("|".join(f"(?:{_casefold_pattern(p.pattern)})" for p in ps)) for t, ps in EVENT_PATTERNS.items()}
+def _version(keywords: dict, confirm: dict) -> str:
+    # tags depend on both the prefilter keywords and the confirmation regexes
+    return hashlib.sha1(repr([(t, keywords.get(t), rx.pattern) for t, rx in confirm.items()]).encode()).hexdigest()[:12]
+EVENTS_VERSION = _version(EVENT_KEYWORDS, _CONFIRM)
 def detect_events(text: str) -> list[str]:
+    t = (text or "").casefold()
     tags = []
-    for tag, patterns in EVENT_PATTERNS.items():
-        if any(p.search(text or "") for p in patterns):
-            tags.append(tag)
+    for tag, rx in _CONFIRM.items():
+        kws = EVENT_KEYWORDS.get(tag)
+        if kws and not any(k in t for k in kws): continue
+        if rx.search(t): tags.append(tag)
     return tags
+def detect_events_batch(texts):
+    """Tag a list or pandas Series of texts; a Series comes back as a Series on the same index."""
+    if hasattr(texts, "map") and hasattr(texts, "index"):
+        return texts.map(detect_events)
+    return [detect_events(t) for t in texts]
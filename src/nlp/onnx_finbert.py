@@ -0,0 +1,121 @@
+from __future__ import annotations
+import argparse, hashlib, json, os, time
+from pathlib import Path
+from typing import Dict, List, Sequence
+import numpy as np
+
+DEFAULT_DIR = "models/finbert-onnx-int8"
+
+class OnnxFinbert:
+    """FinBERT classifier on ONNX Runtime (CPU), called like a ``transformers`` text-classification
+    pipeline: a string gives ``[{"label", "score"}]``, a list gives one dict per text.
+
+    Only ``onnxruntime`` and ``tokenizers`` are imported, so loading takes a fraction of a second
+    instead of the torch + transformers start-up.
+    """
+    def __init__(self, session, tokenizer, id2label: Dict[int, str], version: str = ""):
+        self.session, self.tokenizer = session, tokenizer
+        self.labels = [id2label[i].lower() for i in range(len(id2label))]
+        self.version = version
+        self._inputs = [i.name for i in session.get_inputs()]
+
+    @classmethod
+    def load(cls, model_dir: str = DEFAULT_DIR, num_threads: int | None = None) -> "OnnxFinbert":
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+        d = Path(model_dir)
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads: opts.intra_op_num_threads = int(num_threads)
+        session = ort.InferenceSession(str(d / "model.onnx"), opts, providers=["CPUExecutionProvider"])
+        tok = Tokenizer.from_file(str(d / "tokenizer.json"))
+        tok.enable_truncation(512); tok.enable_padding()
+        cfg = json.loads((d / "config.json").read_text(encoding="utf-8"))
+        st = (d / "model.onnx").stat()
+        version = hashlib.sha1(f"{cfg.get('_name_or_path', '')}|{st.st_size}|{int(st.st_mtime)}".encode()).hexdigest()[:12]
+        return cls(session, tok, {int(k): v for k, v in cfg["id2label"].items()}, version)
+
+    def logits(self, texts: Sequence[str]) -> np.ndarray:
+        enc = self.tokenizer.encode_batch([t or "" for t in texts])
+        feed = {"input_ids": np.array([e.ids for e in enc], dtype=np.int64),
+                "attention_mask": np.array([e.attention_mask for e in enc], dtype=np.int64),
+                "token_type_ids": np.array([e.type_ids for e in enc], dtype=np.int64)}
+        return self.session.run(None, {k: feed[k] for k in self._inputs})[0]
+
+    def __call__(self, texts, batch_size: int | None = None):
+        if isinstance(texts, str): return self([texts])
+        texts = list(texts)
+        bs = max(1, int(batch_size or len(texts) or 1))
+        out: List[Dict] = []
+        for k in range(0, len(texts), bs):
+            z = self.logits(texts[k:k + bs])
+            p = np.exp(z - z.max(axis=1, keepdims=True)); p /= p.sum(axis=1, keepdims=True)
+            top = p.argmax(axis=1)
+            out.extend({"label": self.labels[j], "score": float(p[i, j])} for i, j in enumerate(top))
+        return out
+
+def export(model_name: str = "ProsusAI/finbert", out_dir: str = DEFAULT_DIR, quantize: bool = True, opset: int = 17) -> Path:
+    """Export ``model_name`` to ``out_dir/model.onnx`` (int8 dynamic quantisation unless ``quantize`` is
+    False) with its ``tokenizer.json`` and ``config.json``. Needs torch, transformers and onnxruntime."""
+    import torch
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+    out = Path(out_dir); out.mkdir(parents=True, exist_ok=True)
+    tok = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForSequenceClassification.from_pretrained(model_name).eval()
+    enc = tok(["Company reports record quarterly profit"], return_tensors="pt")
+    names = ["input_ids", "attention_mask", "token_type_ids"]
+    fp32 = out / ("model_fp32.onnx" if quantize else "model.onnx")
+    with torch.no_grad():
+        torch.onnx.export(model, tuple(enc[n] for n in names), str(fp32), input_names=names, output_names=["logits"],
+                          dynamic_axes={**{n: {0: "batch", 1: "seq"} for n in names}, "logits": {0: "batch"}}, opset_version=opset)
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(str(fp32), str(out / "model.onnx"), weight_type=QuantType.QInt8)
+        fp32.unlink()
+    tok.save_pretrained(str(out)); model.config.save_pretrained(str(out))
+    return out
+
+def agreement_report(texts: List[str], gold: List[str] | None = None, engines: Sequence = (), batch_size: int = 32) -> Dict:
+    """Run each ``SentimentEngine`` on ``texts``; report throughput, accuracy against ``gold`` labels and
+    label agreement / mean absolute score difference of every engine with the first one."""
+    report: Dict = {"n": len(texts), "engines": {}}
+    results = {}
+    for se in engines:
+        t0 = time.perf_counter()
+        res = se._score_batch(list(texts), batch_size)
+        dt = time.perf_counter() - t0
+        name = se.engine if se.engine not in results else f"{se.engine}#{len(results)}"
+        results[name] = res
+        row = {"seconds": round(dt, 3), "items_per_sec": round(len(texts) / dt, 1) if dt else None,
+               "fallbacks": sum(1 for r in res if r["engine"] != se.engine)}
+        if gold: row["accuracy"] = round(float(np.mean([r["label"] == g.lower() for r, g in zip(res, gold)])), 4)
+        report["engines"][name] = row
+    names = list(results)
+    for name in names[1:]:
+        a, b = results[names[0]], results[name]
+        report["engines"][name]["agreement"] = round(float(np.mean([x["label"] == y["label"] for x, y in zip(a, b)])), 4)
+        report["engines"][name]["mean_abs_score_diff"] = round(float(np.mean([abs(x["score"] - y["score"]) for x, y in zip(a, b)])), 4)
+    return report
+
+def main():
+    ap = argparse.ArgumentParser(description="Export a quantized ONNX FinBERT and compare it with the PyTorch engine")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    ex = sub.add_parser("export"); ex.add_argument("--model", default="ProsusAI/finbert"); ex.add_argument("--out", default=DEFAULT_DIR)
+    ex.add_argument("--no-quantize", action="store_true")
+    rp = sub.add_parser("report", help="agreement on a labelled CSV (columns: text[, label])")
+    rp.add_argument("--sample", required=True); rp.add_argument("--model-dir", default=DEFAULT_DIR)
+    rp.add_argument("--hf-model", default="ProsusAI/finbert"); rp.add_argument("--batch-size", type=int, default=32)
+    rp.add_argument("--num-threads", type=int, default=os.cpu_count())
+    args = ap.parse_args()
+    if args.cmd == "export":
+        print(export(args.model, args.out, quantize=not args.no_quantize)); return
+    import pandas as pd
+    from src.nlp.sentiment import SentimentEngine
+    df = pd.read_csv(args.sample)
+    engines = [SentimentEngine("hf_finbert", hf_model=args.hf_model, num_threads=args.num_threads),
+               SentimentEngine("onnx_finbert", onnx_model_dir=args.model_dir, num_threads=args.num_threads)]
+    gold = df["label"].astype(str).tolist() if "label" in df else None
+    print(json.dumps(agreement_report(df["text"].fillna("").astype(str).tolist(), gold, engines, args.batch_size), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -1,38 +1,202 @@
-
 from __future__ import annotations
-from typing import Dict, Tuple
-_POS_WORDS = {"profit","growth","surge","rally","upgrade","order win","bags order","raises guidance","beat","beats","dividend","bonus","buyback","record","approval","approved","secures","margin expansion","expansion","qip success","all-time high","acquires"}
-_NEG_WORDS = {"loss","decline","falls","downgrade","probe","fraud","pledge","default","delay","resigns","resignation","litigation","penalty","raid","sebi notice","weak","guidance cut","miss","fire","closure","strike","bankruptcy","insolvency"}
+import hashlib, json, re
+from pathlib import Path
+from typing import Dict, List, Tuple
+import numpy as np
+import pandas as pd
+import yaml
+LEXICON_PATH = Path(__file__).resolve().parents[2] / "data" / "reference" / "sentiment_lexicon.yaml"
+_SEP = "\x00"
+_WEIGHT_MEMO = 65536
+_GAP = r"[^\w.;:!?\x00]+"  # words within a negation window; stops at sentence ends and between texts
+def _atoms(term: str) -> List[str]:
+    """Regex atoms of a lexicon term: escaped characters, ``[\\s-]+`` between words, ``\\w*`` for a trailing ``*``."""
+    out: List[str] = []
+    for i, w in enumerate(w for w in re.split(r"[\s-]+", term.rstrip("*").strip()) if w):
+        if i: out.append(r"[\s-]+")
+        out.extend(re.escape(c) for c in w)
+    if term.endswith("*"): out.append(r"\w*")
+    return out
+def _trie_pattern(terms) -> str:
+    """Alternation of ``terms`` factored into a prefix trie, so the regex engine tries one branch per
+    character instead of every term at every word start."""
+    trie: dict = {}
+    for t in terms:
+        node = trie
+        for a in _atoms(t): node = node.setdefault(a, {})
+        node[""] = {}
+    def render(node: dict) -> str:
+        alts = [a + render(child) for a, child in sorted(node.items()) if a]
+        if not alts: return ""
+        body = alts[0] if len(alts) == 1 else f"(?:{'|'.join(alts)})"
+        return f"(?:{body})?" if "" in node else body
+    return render(trie)
+class RuleLexicon:
+    """Weighted terms compiled into one word-bounded regex with an optional negation prefix.
+
+    ``score_many`` joins all texts and scans them in a single ``findall`` pass; per-text sums come
+    from ``np.bincount`` over the matches, so Python work scales with matches, not texts.
+    """
+    def __init__(self, terms: Dict[str, float], negators: List[str] = (), window: int = 3, version: str = "0"):
+        self.terms = {str(k).casefold(): float(v) for k, v in terms.items()}
+        self.negators = sorted({str(n).casefold() for n in negators})
+        self.window = max(1, int(window))
+        digest = hashlib.sha1(json.dumps([sorted(self.terms.items()), self.negators, self.window]).encode()).hexdigest()[:12]
+        self.version = f"{version}:{digest}"
+        alts, neg = _trie_pattern(self.terms), _trie_pattern(self.negators)
+        prefix = rf"(?:({neg}){_GAP}(?:\w+{_GAP}){{0,{self.window - 1}}}?)?" if neg else "()"
+        self._rx = re.compile(rf"({_SEP})|(?<!\w){prefix}({alts})(?!\w)")
+        self._exact = [(re.compile(self._term_pattern(t)), w) for t, w in self.terms.items()]
+        self._weights: Dict[str, float] = dict(self.terms)  # per-instance memo of matched spans
+    @staticmethod
+    def _term_pattern(term: str) -> str:
+        return "".join(_atoms(term))
+    @classmethod
+    def load(cls, path=None) -> "RuleLexicon":
+        with open(path or LEXICON_PATH, "r", encoding="utf-8") as f:
+            d = yaml.safe_load(f)
+        terms = {**{t: abs(float(w)) for t, w in (d.get("positive") or {}).items()},
+                 **{t: -abs(float(w)) for t, w in (d.get("negative") or {}).items()}}
+        return cls(terms, d.get("negators") or [], int(d.get("negation_window", 3)), str(d.get("version", "0")))
+    def weight(self, match: str) -> float:
+        """Signed weight of a matched span (phrase spacing and ``*`` endings vary)."""
+        w = self._weights.get(match)
+        if w is not None: return w
+        w = next((w for rx, w in self._exact if rx.fullmatch(match)), 0.0)
+        # ``*`` terms match open-ended spans; keep the memo bounded
+        if len(self._weights) >= len(self.terms) + _WEIGHT_MEMO: self._weights = dict(self.terms)
+        self._weights[match] = w
+        return w
+    def sums(self, texts) -> Tuple[np.ndarray, np.ndarray]:
+        """Per text: summed positive and (absolute) negative weight, negation applied."""
+        texts = ["" if t is None or t != t else str(t).replace(_SEP, " ") for t in texts]
+        pos, neg = np.zeros(len(texts)), np.zeros(len(texts))
+        if not texts: return pos, neg
+        found = self._rx.findall(_SEP.join(texts).casefold())
+        if not found: return pos, neg
+        if len(found) < 256:
+            row = 0
+            for sep, negated, term in found:
+                if sep: row += 1; continue
+                w = -self.weight(term) if negated else self.weight(term)
+                if w > 0: pos[row] += w
+                else: neg[row] -= w
+            return pos, neg
+        m = pd.DataFrame(found, columns=["sep", "neg", "term"])
+        row = (m["sep"] != "").cumsum().to_numpy()
+        hit = (m["sep"] == "").to_numpy()
+        terms = m["term"][hit]
+        w = terms.map({t: self.weight(t) for t in terms.unique()}).to_numpy(dtype=float)
+        w = np.where(m["neg"][hit].to_numpy() != "", -w, w)
+        pos += np.bincount(row[hit], weights=np.clip(w, 0, None), minlength=len(texts))
+        neg += np.bincount(row[hit], weights=np.clip(-w, 0, None), minlength=len(texts))
+        return pos, neg
+    def score_many(self, texts) -> Tuple[np.ndarray, np.ndarray]:
+        """``(labels, scores)``: score is (pos - neg) / (pos + neg) in [-1, 1]; |score| <= 0.15 is neutral."""
+        pos, neg = self.sums(texts)
+        total = pos + neg
+        score = np.divide(pos - neg, total, out=np.zeros_like(total), where=total > 0)
+        labels = np.select([score > 0.15, score < -0.15], ["positive", "negative"], "neutral")
+        return labels, score
+_DEFAULT_LEXICON: RuleLexicon | None = None
+def default_lexicon() -> RuleLexicon:
+    global _DEFAULT_LEXICON
+    if _DEFAULT_LEXICON is None: _DEFAULT_LEXICON = RuleLexicon.load()
+    return _DEFAULT_LEXICON
+MODEL_ENGINES = ("hf_finbert", "onnx_finbert")
 class SentimentEngine:
-    def __init__(self, engine: str = "rule", hf_model: str = "ProsusAI/finbert"):
+    def __init__(self, engine: str = "rule", hf_model: str = "ProsusAI/finbert", batch_size: int = 32, num_threads: int | None = None, cache=None, lexicon=None,
+                 onnx_model_dir: str = "models/finbert-onnx-int8"):
         self.engine = engine
+        self.lexicon = lexicon if isinstance(lexicon, RuleLexicon) else (RuleLexicon.load(lexicon) if lexicon else default_lexicon())
         self.hf_model = hf_model
+        self.batch_size = max(1, int(batch_size))
+        self.cache = cache
         self._pipe = None
         if engine == "hf_finbert":
             try:
+                if num_threads:
+                    import torch
+                    torch.set_num_threads(int(num_threads))
                 from transformers import pipeline
                 self._pipe = pipeline("text-classification", model=hf_model, truncation=True)
             except Exception:
                 self.engine = "rule"
                 self._pipe = None
+        elif engine == "onnx_finbert":
+            try:
+                from src.nlp.onnx_finbert import OnnxFinbert
+                self._pipe = OnnxFinbert.load(onnx_model_dir, num_threads)
+            except Exception:
+                self.engine = "rule"
+                self._pipe = None
     def _rule_score(self, text: str) -> tuple[str, float]:
-        t = (text or "").lower()
-        pos = sum(1 for w in _POS_WORDS if w in t)
-        neg = sum(1 for w in _NEG_WORDS if w in t)
-        if pos == 0 and neg == 0: return "neutral", 0.0
-        score = (pos - neg) / max(1, pos + neg)
-        if score > 0.15: return "positive", float(score)
-        if score < -0.15: return "negative", float(score)
-        return "neutral", float(score)
+        labels, scores = self.lexicon.score_many([text])
+        return str(labels[0]), float(scores[0])
+    def _rule_batch(self, texts) -> List[Dict]:
+        labels, scores = self.lexicon.score_many(texts)
+        return [{"label": l, "score": s, "engine": "rule"} for l, s in zip(labels.tolist(), scores.tolist())]
+    def score_series(self, texts: pd.Series) -> pd.DataFrame:
+        """Score a Series; returns ``label``/``score``/``engine`` columns on the same index.
+
+        The rule engine scores the whole Series in one regex pass and bypasses the cache, since it
+        is cheaper than the cache lookup."""
+        if self.engine not in MODEL_ENGINES or self._pipe is None:
+            labels, scores = self.lexicon.score_many(texts.tolist())
+            return pd.DataFrame({"label": labels, "score": scores, "engine": "rule"}, index=texts.index)
+        return pd.DataFrame(self.score_batch(texts.fillna("").astype(str).tolist()), index=texts.index)
+    def _hf_result(self, out: Dict) -> Dict:
+        label = out.get("label","neutral").lower()
+        score = float(out.get("score", 0.0))
+        signed = score if "pos" in label else (-score if "neg" in label else 0.0)
+        return {"label": label, "score": signed, "engine": self.engine}
+    @property
+    def cache_namespace(self) -> str:
+        version = {"hf_finbert": self.hf_model, "onnx_finbert": getattr(self._pipe, "version", "")}.get(self.engine, self.lexicon.version)
+        return f"sentiment|{self.engine}|{version}"
     def score(self, text: str) -> Dict:
-        if self.engine == "hf_finbert" and self._pipe is not None:
+        if self.cache is not None:
+            return self.score_batch([text])[0]
+        return self._score_one(text)
+    def _score_one(self, text: str) -> Dict:
+        if self.engine in MODEL_ENGINES and self._pipe is not None:
             try:
-                out = self._pipe(text[:512])[0]
-                label = out.get("label","neutral").lower()
-                score = float(out.get("score", 0.0))
-                signed = score if "pos" in label else (-score if "neg" in label else 0.0)
-                return {"label": label, "score": signed, "engine": "hf_finbert"}
+                return self._hf_result(self._pipe(text[:512])[0])
             except Exception:
                 pass
         label, s = self._rule_score(text)
         return {"label": label, "score": s, "engine": "rule"}
+    def score_batch(self, texts: List[str], batch_size: int | None = None) -> List[Dict]:
+        """Score many texts; FinBERT (PyTorch or ONNX) runs length-sorted batches so each batch pads only to its longest item.
+
+        A batch that fails is re-scored item by item, keeping the rule fallback per item.
+        With a ``cache``, only texts not scored before by the same engine/model/lexicon are run.
+        """
+        texts = [t or "" for t in texts]
+        if self.cache is None:
+            return self._score_batch(texts, batch_size)
+        ns = self.cache_namespace
+        found = self.cache.get_many(ns, texts)
+        missing = [t for t in dict.fromkeys(texts) if t not in found]
+        if missing:
+            computed = dict(zip(missing, self._score_batch(missing, batch_size)))
+            # rule fallbacks from a failed model call are not cached under the model's namespace
+            self.cache.put_many(ns, {t: r for t, r in computed.items() if r["engine"] == self.engine})
+            found.update(computed)
+        return [found[t] for t in texts]
+    def _score_batch(self, texts: List[str], batch_size: int | None = None) -> List[Dict]:
+        if self.engine not in MODEL_ENGINES or self._pipe is None:
+            return self._rule_batch(texts)
+        bs = max(1, int(batch_size or self.batch_size))
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        out: List[Dict] = [None] * len(texts)
+        for k in range(0, len(order), bs):
+            chunk = order[k:k + bs]
+            try:
+                res = self._pipe([texts[i][:512] for i in chunk], batch_size=bs)
+                for i, r in zip(chunk, res):
+                    out[i] = self._hf_result(r[0] if isinstance(r, list) else r)
+            except Exception:
+                for i in chunk:
+                    out[i] = self._score_one(texts[i])
+        return out
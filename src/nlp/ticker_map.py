@@ -1,12 +1,169 @@
 
 from __future__ import annotations
-import csv
+import csv, hashlib, os, pickle, re
+from collections import Counter, deque
+from itertools import chain
+
+_PICKLE_VERSION = 3
+_TOKEN = re.compile(r"[A-Z0-9]+")
+# dropped from both names and text before fuzzy matching
+_NAME_STOPWORDS = frozenset({"LIMITED", "LTD", "THE", "OF", "AND", "CO", "COMPANY", "CORP", "CORPORATION", "INC"})
+_LOADED: dict[str, "SymbolIndex"] = {}
+
 def _split_aliases(s: str | None) -> list[str]:
     return [] if not s else [a.strip() for a in s.split(";") if a.strip()]
-def load_symbol_index(csv_path: str) -> list[dict]:
+
+def _is_word(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+class AliasAutomaton:
+    """Aho-Corasick automaton over upper-cased aliases.
+
+    ``find`` scans the text once and yields ``(start, length, record_id)`` for every alias
+    occurrence that sits on word boundaries.
+    """
+    def __init__(self, aliases: dict[str, set[int]]):
+        self.goto: list[dict[str, int]] = [{}]
+        self.fail: list[int] = [0]
+        self.out: list[list[tuple[int, int]]] = [[]]
+        for alias, rids in aliases.items():
+            node = 0
+            for ch in alias:
+                nxt = self.goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto); self.goto[node][ch] = nxt
+                    self.goto.append({}); self.fail.append(0); self.out.append([])
+                node = nxt
+            self.out[node].extend((len(alias), rid) for rid in sorted(rids))
+        q = deque(self.goto[0].values())
+        while q:
+            node = q.popleft()
+            for ch, nxt in self.goto[node].items():
+                if node:
+                    f = self.fail[node]
+                    while f and ch not in self.goto[f]: f = self.fail[f]
+                    self.fail[nxt] = self.goto[f].get(ch, 0)
+                    self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+                q.append(nxt)
+
+    def find(self, T: str):
+        goto, fail, out = self.goto, self.fail, self.out
+        n = len(T); node = 0
+        for i, ch in enumerate(T):
+            while node and ch not in goto[node]: node = fail[node]
+            node = goto[node].get(ch, 0)
+            if not out[node]: continue
+            for length, rid in out[node]:
+                start = i - length + 1
+                if start > 0 and _is_word(T[start]) and _is_word(T[start - 1]): continue
+                if i + 1 < n and _is_word(ch) and _is_word(T[i + 1]): continue
+                yield start, length, rid
+
+def _name_tokens(s: str) -> list[str]:
+    return [t for t in _TOKEN.findall(s.upper()) if t not in _NAME_STOPWORDS]
+
+def _block_key(token: str) -> str:
+    return token[:3]
+
+def _trigrams(token: str) -> set[str]:
+    return {token[i:i + 3] for i in range(len(token) - 2)} or {token}
+
+class FuzzyNames:
+    """Token/trigram blocking index for fuzzy company-name matching.
+
+    Multi-word names and aliases are indexed by the trigrams of their first token. A text window
+    becomes a candidate for a name only if its first token shares at least half of those trigrams
+    (so a typo anywhere still blocks together) and at least half of the name's tokens, the first
+    included, line up on their 3-character prefix ("Inds"/"Industries"). Only candidates are scored with rapidfuzz, so
+    the cost per article depends on the number of windows, not on the size of the universe.
+    Single-word aliases are left to the exact tier; fuzzing them mostly adds false positives.
+    """
+    def __init__(self, records: list[dict]):
+        self.names: list[str] = []
+        self.keys: list[tuple[str, ...]] = []
+        self.rids: list[int] = []
+        self.first_grams: list[int] = []
+        self.by_gram: dict[str, list[int]] = {}
+        self._memo: dict[str, list[tuple[int, int]]] = {}
+        seen = set()
+        for rid, rec in enumerate(records):
+            for alias in rec["aliases"]:
+                toks = _name_tokens(alias)
+                if len(toks) < 2 or len(" ".join(toks)) < 6 or (rid, tuple(toks)) in seen: continue
+                seen.add((rid, tuple(toks)))
+                nid = len(self.names)
+                self.names.append(" ".join(toks)); self.keys.append(tuple(_block_key(t) for t in toks)); self.rids.append(rid)
+                grams = _trigrams(toks[0]); self.first_grams.append(len(grams))
+                for g in grams: self.by_gram.setdefault(g, []).append(nid)
+
+    def _blocked(self, token: str) -> list[tuple[int, int]]:
+        """``(name id, shared trigrams)`` of names whose first token blocks with ``token`` (memoised)."""
+        hit = self._memo.get(token)
+        if hit is None:
+            grams = _trigrams(token); ng = len(grams); first_grams = self.first_grams
+            shared = Counter(chain.from_iterable(self.by_gram.get(g, ()) for g in grams))
+            hit = [(nid, c) for nid, c in shared.items() if 2 * c >= ng or 2 * c >= first_grams[nid]]
+            if len(self._memo) >= 100_000: self._memo.clear()
+            self._memo[token] = hit
+        return hit
+
+    def __getstate__(self):
+        return {**self.__dict__, "_memo": {}}
+
+    def candidates(self, tokens: list[str], max_windows: int, skip: frozenset = frozenset()) -> dict[str, list[int]]:
+        """``{window text: [name ids]}`` for the best-aligned ``max_windows`` (window, name) pairs;
+        windows starting at a token position in ``skip`` are not considered."""
+        keys = [_block_key(t) for t in tokens]
+        pairs = []
+        for p, t in enumerate(tokens):
+            if p in skip: continue
+            for nid, c in self._blocked(t):
+                nk = self.keys[nid]
+                if p + len(nk) > len(keys): continue
+                hits = sum(a == b for a, b in zip(nk, keys[p:p + len(nk)]))
+                if 2 * hits >= len(nk): pairs.append((-hits, -c / self.first_grams[nid], p, nid))
+        out: dict[str, list[int]] = {}
+        for *_, p, nid in sorted(pairs)[:max_windows]:
+            out.setdefault(" ".join(tokens[p:p + len(self.keys[nid])]), []).append(nid)
+        return out
+
+    def find(self, text: str, score_cutoff: float, max_windows: int = 32, exact_spans=()) -> list[tuple[float, int, int]]:
+        """``(score, window_rank, record_id)`` of the best name for each text window scoring at least
+        ``score_cutoff``; windows starting inside an ``(start, length)`` exact-match span are skipped."""
+        from rapidfuzz import fuzz, process
+        found = [(m.group(), m.start()) for m in _TOKEN.finditer(text.upper()) if m.group() not in _NAME_STOPWORDS]
+        skip = frozenset(p for p, (_, at) in enumerate(found) if any(s <= at < s + n for s, n in exact_spans))
+        hits = []
+        for rank, (window, nids) in enumerate(self.candidates([t for t, _ in found], max_windows, skip).items()):
+            for _, score, nid in process.extract(window, {nid: self.names[nid] for nid in nids}, scorer=fuzz.ratio,
+                                                  score_cutoff=score_cutoff, limit=1):
+                hits.append((score, rank, self.rids[nid]))
+        return hits
+
+class SymbolIndex:
+    """Symbol records plus a compiled alias automaton; iterates like the old ``list[dict]``."""
+    def __init__(self, records: list[dict], source: tuple | None = None):
+        self.records = records
+        self.source = source
+        self.version = hashlib.sha1(repr([(r["symbol"], r["aliases_upper"]) for r in records]).encode()).hexdigest()[:12]
+        aliases: dict[str, set[int]] = {}
+        for rid, rec in enumerate(records):
+            for a in rec["aliases_upper"]:
+                if a: aliases.setdefault(a, set()).add(rid)
+        self.automaton = AliasAutomaton(aliases)
+        self.fuzzy = FuzzyNames(records)
+    def __iter__(self): return iter(self.records)
+    def __len__(self) -> int: return len(self.records)
+    def __getitem__(self, i): return self.records[i]
+
+def _source_fingerprint(csv_path: str) -> tuple:
+    st = os.stat(csv_path)
+    return (_PICKLE_VERSION, st.st_size, st.st_mtime_ns)
+
+def _read_records(csv_path: str) -> list[dict]:
     out = []
     with open(csv_path, "r", encoding="utf-8") as f:
-        for row in csv.DictReader(f):
+        for row in csv.DictReader(line for line in f if line.strip()):
             sym = (row.get("symbol") or "").strip().upper()
             name = (row.get("company_name") or "").strip()
             aliases = _split_aliases(row.get("aliases"))
@@ -14,17 +171,56 @@ def load_symbol_index(csv_path: str) -> list[dict]:
             aliases_full = [name] + aliases + [sym]
             out.append({"symbol": sym, "name": name, "aliases": aliases_full, "aliases_upper": [x.upper() for x in aliases_full]})
     return out
-def map_symbols(text: str, index: list[dict], max_symbols: int = 5) -> list[str]:
+
+def load_symbol_index(csv_path: str, use_pickle: bool = True) -> SymbolIndex:
+    """Load the symbol CSV into a compiled ``SymbolIndex``.
+
+    The compiled index is memoised per process and, with ``use_pickle``, cached as
+    ``<csv>.pkl`` next to the CSV; both are rebuilt when the CSV changes.
+    """
+    key = os.path.abspath(csv_path)
+    fp = _source_fingerprint(csv_path)
+    idx = _LOADED.get(key)
+    if idx is not None and idx.source == fp: return idx
+    pkl = f"{csv_path}.pkl"
+    idx = None
+    if use_pickle and os.path.exists(pkl):
+        try:
+            with open(pkl, "rb") as f: cached = pickle.load(f)
+            if isinstance(cached, SymbolIndex) and cached.source == fp: idx = cached
+        except Exception:
+            idx = None
+    if idx is None:
+        idx = SymbolIndex(_read_records(csv_path), source=fp)
+        if use_pickle:
+            try:
+                with open(pkl, "wb") as f: pickle.dump(idx, f, protocol=pickle.HIGHEST_PROTOCOL)
+            except OSError:
+                pass
+    _LOADED[key] = idx
+    return idx
+
+def map_symbols(text: str, index: SymbolIndex | list[dict], max_symbols: int = 5,
+                fuzzy_cutoff: float | None = None, fuzzy_windows: int = 32) -> list[str]:
+    """Return symbols whose aliases occur in ``text`` as whole words, most specific alias first.
+
+    With ``fuzzy_cutoff`` (a rapidfuzz ratio, 0-100), multi-word names that are only approximately
+    present ("Reliance Inds", "Tata Consultancy Svcs") are appended after the exact matches, best
+    score first; at most ``fuzzy_windows`` candidate windows are scored per text.
+    """
     if not text: return []
-    T = text.upper()
-    hits = []
-    for rec in index:
-        if any(alias and alias in T for alias in rec["aliases_upper"]):
-            hits.append(rec["symbol"])
-            if len(hits) >= max_symbols: break
-    uniq = []
-    seen = set()
-    for h in hits:
-        if h not in seen:
-            seen.add(h); uniq.append(h)
-    return uniq
+    if not isinstance(index, SymbolIndex): index = SymbolIndex(list(index))
+    best: dict[str, tuple[int, int]] = {}
+    spans = []
+    for start, length, rid in index.automaton.find(text.upper()):
+        sym = index.records[rid]["symbol"]
+        rank = (-length, start)
+        if sym not in best or rank < best[sym]: best[sym] = rank
+        spans.append((start, length))
+    out = sorted(best, key=best.__getitem__)
+    if fuzzy_cutoff is not None and len(out) < max_symbols:
+        hits = index.fuzzy.find(text, fuzzy_cutoff, fuzzy_windows, spans)
+        for score, _, rid in sorted(hits, key=lambda h: (-h[0], h[1])):
+            sym = index.records[rid]["symbol"]
+            if sym not in best: best[sym] = (0, 0); out.append(sym)
+    return out[:max_symbols]
@@ -1,56 +1,181 @@
 
 from __future__ import annotations
-import argparse, json
-from pathlib import Path
+import argparse, hashlib, json, time
+from functools import partial
 from datetime import datetime
 from zoneinfo import ZoneInfo
-import yaml, pandas as pd
+import yaml
 from src.utils.logger import get_logger
+from src.utils.metrics import RunReport, StageMetrics, add_cli_args
 from src.nlp.clean import clean_text
-from src.nlp.events import detect_events
+from src.nlp.dedup import DedupIndex, simhash, symbols_tag, to_signed, to_unsigned, url_key
+from src.nlp.cache import ResultCache, cached_apply
+from src.nlp.events import EVENTS_VERSION, detect_events_batch
 from src.nlp.sentiment import SentimentEngine
 from src.nlp.ticker_map import load_symbol_index, map_symbols
 from src.storage.db_nlp_addon import NewsDB_NLP
+from src.storage.files import ProcessedWriter, batched, iter_raw_items, processed_exists, processed_path, raw_exists, raw_path
+from src.utils.backfill import day_range, run_days
 def load_config(path: str = "config/config.yaml") -> dict:
     with open(path, "r", encoding="utf-8") as f:
         return yaml.safe_load(f)
+_CTX: dict = {}
+def init_worker(cfg: dict) -> None:
+    """Load the symbol index, cache, sentiment engine and DB once per process."""
+    sym_csv = cfg.get("reference", {}).get("nse_symbols_csv", "data/reference/nse_symbols.csv")
+    nlp_cfg = cfg.get("nlp", {}); sent_cfg = nlp_cfg.get("sentiment", {}); cache_cfg = nlp_cfg.get("cache", {})
+    cache = ResultCache(cache_cfg.get("path", "db/nlp_cache.db"), cache_cfg.get("max_entries", 500_000)) if cache_cfg.get("enabled", True) else None
+    engine = SentimentEngine(engine=sent_cfg.get("engine","rule"), hf_model=sent_cfg.get("hf_model","ProsusAI/finbert"),
+                             batch_size=sent_cfg.get("batch_size", 32), num_threads=sent_cfg.get("num_threads"), cache=cache,
+                             lexicon=sent_cfg.get("lexicon_path"), onnx_model_dir=sent_cfg.get("onnx_model_dir", "models/finbert-onnx-int8"))
+    db = NewsDB_NLP("db/news.db")
+    dd_cfg = nlp_cfg.get("dedup", {}); dedup = None
+    if dd_cfg.get("enabled", True):
+        dedup = DedupIndex(int(dd_cfg.get("max_distance", 3)), int(dd_cfg.get("bands", 4)))
+        for fp, c, sy in db.fingerprints(int(dd_cfg.get("history_items", 1_000_000))): dedup.add(to_unsigned(fp), c, symbols_tag(sy))
+    index = load_symbol_index(sym_csv)
+    versions = {"sent_version": engine.cache_namespace,
+                "events_version": EVENTS_VERSION if nlp_cfg.get("events", {}).get("enabled", True) else "off",
+                "map_version": f"{index.version}|{_map_params(nlp_cfg)}"}
+    _CTX.update(cfg=nlp_cfg, index=index, cache=cache, engine=engine, db=db, dedup=dedup, versions=versions, logger=get_logger(__name__))
+def _map_params(nlp_cfg: dict) -> str:
+    tm = nlp_cfg.get("ticker_map", {}); fz = tm.get("fuzzy", {})
+    fuzzy = f"|fz{fz.get('score_cutoff', 80)}/{fz.get('max_windows', 32)}" if fz.get("enabled", False) else ""
+    return f"{tm.get('max_symbols', 5)}{fuzzy}"
+def item_hash(it: dict) -> str:
+    """Hash of the raw fields NLP output depends on."""
+    payload = [it.get("title") or "", it.get("summary") or "", it.get("published_at"), it.get("source", "rss"), sorted(it.get("company_symbols") or [])]
+    return hashlib.sha1(json.dumps(payload, ensure_ascii=False).encode("utf-8")).hexdigest()
+def split_by_watermark(items: list, force: bool = False) -> tuple:
+    """``(todo, kept)``: items that are new, changed or produced by other NLP versions, and the
+    stored rows (by URL) of the rest."""
+    stored = {} if force else _CTX["db"].rows_for_urls({it.get("url", "") for it in items})
+    mark = _CTX["versions"]; todo, kept = [], {}
+    for it in items:
+        row = stored.get(it.get("url", ""))
+        if row is not None and row["content_hash"] == item_hash(it) and all(row[k] == v for k, v in mark.items()):
+            kept[row["url"]] = row
+        else:
+            todo.append(it)
+    return todo, kept
+def annotate_items(items: list) -> list:
+    """clean -> events -> ticker map -> sentiment for raw news items; returns processed rows.
+
+    Symbols are mapped for every item. Items are then grouped into near-duplicate clusters of
+    equal symbol sets; events and sentiment run once per new cluster and are shared with the
+    other members (clusters already stored reuse the stored result).
+    """
+    nlp_cfg, index, cache, engine, dedup = (_CTX[k] for k in ("cfg", "index", "cache", "engine", "dedup"))
+    texts = [clean_text(f"{it.get('title') or ''}. {it.get('summary') or ''}") for it in items]
+    keys = [url_key(it.get("url")) for it in items]
+    tm_cfg = nlp_cfg.get("ticker_map", {}); fz_cfg = tm_cfg.get("fuzzy", {})
+    map_kw = {"max_symbols": tm_cfg.get("max_symbols", 5)}
+    if fz_cfg.get("enabled", False): map_kw.update(fuzzy_cutoff=float(fz_cfg.get("score_cutoff", 80)), fuzzy_windows=int(fz_cfg.get("max_windows", 32)))
+    detected_all = cached_apply(cache, f"ticker_map|{index.version}|{_map_params(nlp_cfg)}", texts, lambda ts: [map_symbols(t, index, **map_kw) for t in ts])
+    symbols_all = [list(dict.fromkeys([*(it.get("company_symbols") or []), *d])) for it, d in zip(items, detected_all)]
+    fps = [simhash(t) for t in texts] if dedup is not None else [None] * len(texts)
+    clusters = [dedup.assign(k, fp, symbols_tag(sy)) if dedup is not None else k for k, fp, sy in zip(keys, fps, symbols_all)]
+    founded = {k for k, c in zip(keys, clusters) if k == c}
+    stored = _CTX["db"].cluster_results({c for c in clusters if c not in founded}, _CTX["versions"]) if dedup is not None else {}
+    rep_of: dict = {}
+    for i, c in enumerate(clusters):
+        if c not in stored: rep_of.setdefault(c, i)
+    reps = list(rep_of.values()); rep_texts = [texts[i] for i in reps]
+    if nlp_cfg.get("events", {}).get("enabled", True):
+        events_all = cached_apply(cache, f"events|{EVENTS_VERSION}", rep_texts, detect_events_batch)
+    else:
+        events_all = [[] for _ in rep_texts]
+    sents = engine.score_batch(rep_texts)
+    results = dict(stored)
+    for i, events, sent in zip(reps, events_all, sents):
+        results[clusters[i]] = {"events": events, "sentiment": sent}
+    out_rows = []
+    for it, c, fp, symbols in zip(items, clusters, fps, symbols_all):
+        res = results[c]; sent = res["sentiment"]
+        out_rows.append({
+            "url": it.get("url",""), "title": it.get("title") or "", "published_at": it.get("published_at"),
+            "symbols": symbols, "events": list(res["events"]),
+            "sentiment_label": sent["label"], "sentiment_score": sent["score"], "sentiment_engine": sent["engine"],
+            "source": it.get("source","rss"), "cluster_id": c, "simhash": to_signed(fp) if fp is not None else None,
+            "content_hash": item_hash(it), **_CTX["versions"],
+            # a rule fallback from a failed model call is not current: leave it for the next run to re-score
+            "sent_version": _CTX["versions"]["sent_version"] if sent["engine"] == engine.engine else None,
+        })
+    return out_rows
+def process_day(run_day: str, force: bool = False, stage: StageMetrics | None = None):
+    """NLP for one day's raw file; returns the number of processed items, or None without a raw file.
+
+    Raw items are streamed in ``nlp.chunk_size`` batches. Items whose URL, content hash and NLP
+    versions match their stored row are not reprocessed (unless ``force``); every batch is written
+    to the DB and appended as a row group to the day's Parquet file, which is renamed into place
+    last so its presence marks a completed day.
+    """
+    cache, logger = _CTX["cache"], _CTX["logger"]
+    stage = stage if stage is not None else StageMetrics("nlp")
+    if not raw_exists(run_day):
+        logger.error(f"Raw file not found: {raw_path(run_day)}. Run Phase 1 first."); return None
+    t0 = time.perf_counter(); ins = done = 0
+    out_path = processed_path(run_day)
+    with ProcessedWriter(out_path) as out:
+        for items in batched(iter_raw_items(run_day), int(_CTX["cfg"].get("chunk_size", 5000))):
+            todo, kept = split_by_watermark(items, force)
+            with stage.timed("nlp"):
+                rows = annotate_items(todo)
+            with stage.timed("db"):
+                ins += _CTX["db"].insert_many(rows)
+            done += len(rows)
+            by_url = {**kept, **{r["url"]: r for r in rows}}
+            out.write([by_url[it.get("url", "")] for it in items])
+    dt = time.perf_counter() - t0
+    stage.add(items=out.rows, db_rows=done)
+    stage.count("new_or_changed", done); stage.count("inserted", ins); stage.count("clusters", out.clusters)
+    logger.info(f"{run_day} NLP ({_CTX['engine'].engine}): {done} new/changed of {out.rows} items in {dt:.2f}s ({done / max(dt, 1e-9):.1f} items/s)")
+    if cache is not None:
+        st = cache.stats()
+        stage.cache("nlp", st["hits"], st["misses"])
+        logger.info(f"NLP cache: hits={st['hits']} misses={st['misses']} hit_rate={st['hit_rate']:.1%} entries={st['entries']}")
+    logger.info(f"{run_day} processed items: {out.rows} in {out.clusters} clusters | Inserted into DB: {ins}"); logger.info(f"Wrote: {out_path}")
+    return out.rows
 def main():
     ap = argparse.ArgumentParser(description="Phase 2: NLP process for daily news")
     ap.add_argument("--date", type=str, default="today", help="YYYY-MM-DD (IST) or 'today'")
+    ap.add_argument("--start", type=str, default=None, help="Backfill from YYYY-MM-DD (with --end)")
+    ap.add_argument("--end", type=str, default=None, help="Backfill up to YYYY-MM-DD inclusive")
+    ap.add_argument("--workers", type=int, default=None, help="Backfill processes (default: CPU count)")
+    ap.add_argument("--force", action="store_true", help="Reprocess every item (and, when backfilling, days that already have output)")
     ap.add_argument("--config", type=str, default="config/config.yaml")
+    add_cli_args(ap)
     args = ap.parse_args()
     cfg = load_config(args.config)
+    logger = get_logger(__name__)
+    NewsDB_NLP("db/news.db").create_tables()
+    if args.start or args.end:
+        days = day_range(args.start or args.end, args.end or args.start)
+        todo = [d for d in days if args.force or not processed_exists(d)]
+        logger.info(f"Phase 2 NLP backfill {days[0]}..{days[-1]}: {len(todo)}/{len(days)} days to process")
+        report = RunReport.from_args("nlp_backfill", f"{days[0]}..{days[-1]}", args)
+        try:
+            with report.stage("nlp") as stage:
+                res = run_days(todo, partial(process_day, force=args.force), init_worker, (cfg,), args.workers, logger)
+                stage.add(items=sum(v or 0 for v in res.values()))
+                for d, v in res.items():
+                    if v is None: stage.failure("day", d, "failed")
+        finally:
+            logger.info(f"Run report: {report.write()}")
+        logger.info(f"Backfill finished: {sum(1 for v in res.values() if v is not None)}/{len(todo)} days, {sum(v or 0 for v in res.values())} items")
+        return
     tz = ZoneInfo(cfg.get("timezone", "Asia/Kolkata"))
     run_day = (datetime.now(tz).date().isoformat() if args.date == "today" else datetime.fromisoformat(args.date).date().isoformat())
-    logger = get_logger(__name__); logger.info(f"Phase 2 NLP for {run_day}")
-    raw_file = Path(f"data/raw/{run_day}.json")
-    if not raw_file.exists():
-        logger.error(f"Raw file not found: {raw_file}. Run Phase 1 first."); return
-    sym_csv = cfg.get("reference", {}).get("nse_symbols_csv", "data/reference/nse_symbols.csv")
-    index = load_symbol_index(sym_csv)
-    sent_cfg = cfg.get("nlp", {}).get("sentiment", {})
-    engine = SentimentEngine(engine=sent_cfg.get("engine","rule"), hf_model=sent_cfg.get("hf_model","ProsusAI/finbert"))
-    items = json.loads(raw_file.read_text(encoding="utf-8"))
-    out_rows = []
-    for it in items:
-        title = it.get("title") or ""; summary = it.get("summary") or ""
-        text = clean_text(f"{title}. {summary}")
-        events = detect_events(text) if cfg.get("nlp", {}).get("events", {}).get("enabled", True) else []
-        symbols_existing = it.get("company_symbols") or []
-        symbols_detected = map_symbols(text, index, max_symbols=cfg.get("nlp", {}).get("ticker_map", {}).get("max_symbols", 5))
-        symbols = list(dict.fromkeys([*symbols_existing, *symbols_detected]))
-        sent = engine.score(text)
-        out_rows.append({
-            "url": it.get("url",""), "title": title, "published_at": it.get("published_at"),
-            "symbols": symbols, "events": events,
-            "sentiment_label": sent["label"], "sentiment_score": sent["score"], "sentiment_engine": sent["engine"],
-            "source": it.get("source","rss"),
-        })
-    out_dir = Path("data/processed"); out_dir.mkdir(parents=True, exist_ok=True)
-    jp = out_dir / f"{run_day}.json"; cp = out_dir / f"{run_day}.csv"
-    jp.write_text(json.dumps(out_rows, ensure_ascii=False, indent=2), encoding="utf-8")
-    pd.DataFrame(out_rows).to_csv(cp, index=False, encoding="utf-8")
-    db = NewsDB_NLP("db/news.db"); db.create_tables(); ins = db.insert_many(out_rows)
-    logger.info(f"Processed items: {len(out_rows)} | Inserted into DB: {ins}"); logger.info(f"Wrote: {jp} and {cp}")
+    logger.info(f"Phase 2 NLP for {run_day}")
+    if not raw_exists(run_day):
+        logger.error(f"Raw file not found: {raw_path(run_day)}. Run Phase 1 first."); return
+    report = RunReport.from_args("nlp", run_day, args)
+    try:
+        with report.stage("nlp") as stage:
+            init_worker(cfg)
+            process_day(run_day, force=args.force, stage=stage)
+    finally:
+        logger.info(f"Run report: {report.write()}")
+    if _CTX["cache"] is not None: _CTX["cache"].close()
 if __name__ == "__main__":
     main()
@@ -0,0 +1,203 @@
+"""Single-process daily pipeline: fetch -> nlp -> features with content-addressed stage caching.
+
+Each stage's fingerprint covers its config sections, its code and the digests of its input files
+(including the previous stage's output); the features stage also covers the stored price bars it reads. A stage whose fingerprint and recorded output digests
+still match is skipped; stage modules are imported only when a stage actually runs.
+"""
+from __future__ import annotations
+import argparse, glob, hashlib, json, os, time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional
+from zoneinfo import ZoneInfo
+import yaml
+from src.utils.logger import get_logger
+from src.utils.metrics import RunReport, StageMetrics, add_cli_args
+
+STATE_PATH = "db/pipeline_state.json"
+
+class Stage(NamedTuple):
+    name: str
+    spec: Callable[[dict, str], dict]  # (cfg, day) -> {"config", "inputs", "outputs"[, "max_age", "retry_on"]}
+    run: Callable[[dict, str, StageMetrics], bool]
+
+class StageCache:
+    """JSON record of the last successful run of each (stage, day).
+
+    File digests are memoised by (size, mtime_ns), so checking an unchanged file costs one ``stat``.
+    """
+    def __init__(self, path: str = STATE_PATH):
+        self.path = Path(path)
+        try:
+            self.data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            self.data = {}
+        self.files: Dict[str, list] = self.data.setdefault("files", {})
+        self.stages: Dict[str, dict] = self.data.setdefault("stages", {})
+
+    def digest(self, path) -> Optional[str]:
+        p = str(path)
+        try: st = os.stat(p)
+        except FileNotFoundError: return None
+        memo = self.files.get(p)
+        if memo and memo[0] == st.st_size and memo[1] == st.st_mtime_ns: return memo[2]
+        h = hashlib.blake2b(digest_size=16)
+        with open(p, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""): h.update(chunk)
+        self.files[p] = [st.st_size, st.st_mtime_ns, h.hexdigest()]
+        return self.files[p][2]
+
+    def fingerprint(self, config, inputs: List[str]) -> str:
+        payload = [config, sorted((str(p), self.digest(p)) for p in inputs)]
+        return hashlib.sha1(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    def fresh(self, key: str, fp: str, max_age: Optional[float] = None) -> bool:
+        rec = self.stages.get(key)
+        if not rec or rec["fingerprint"] != fp or not rec["outputs"]: return False
+        if max_age is not None and time.time() - rec["finished_at"] > max_age: return False
+        return all(self.digest(p) == d for p, d in rec["outputs"].items())
+
+    def record(self, key: str, fp: str, outputs: List[str]) -> None:
+        self.stages[key] = {"fingerprint": fp, "finished_at": time.time(), "outputs": {str(p): self.digest(p) for p in outputs}}
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.data, sort_keys=True), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+def _code(*patterns: str) -> List[str]:
+    return sorted(p for pat in patterns for p in glob.glob(pat))
+
+def _section(cfg: dict, *keys: str) -> dict:
+    return {k: cfg.get(k) for k in keys}
+
+def _fetch_spec(cfg: dict, day: str) -> dict:
+    raw_dir = cfg.get("storage", {}).get("json_out_dir", "data/raw")
+    today = datetime.now(ZoneInfo(cfg.get("timezone", "Asia/Kolkata"))).date().isoformat()
+    ttl = float(cfg.get("pipeline", {}).get("fetch_ttl_minutes", 30)) * 60
+    return {"config": _section(cfg, "timezone", "feeds", "feed_fetch", "nse_corporate_announcements", "storage"),
+            "inputs": _code("src/data_fetch.py", "src/sources/*.py"),
+            "outputs": [f"{raw_dir}/{day}.jsonl.gz"],
+            # feeds change under us: today's fetch is redone once the TTL has passed
+            "max_age": ttl if day >= today else None}
+
+def _nlp_spec(cfg: dict, day: str) -> dict:
+    nlp_cfg = cfg.get("nlp", {})
+    sym_csv = cfg.get("reference", {}).get("nse_symbols_csv", "data/reference/nse_symbols.csv")
+    lexicon = nlp_cfg.get("sentiment", {}).get("lexicon_path") or "data/reference/sentiment_lexicon.yaml"
+    raw = [p for p in (f"data/raw/{day}.json", f"data/raw/{day}.jsonl.gz") if os.path.exists(p)]
+    return {"config": _section(cfg, "timezone", "nlp", "reference"),
+            "inputs": raw + [sym_csv, lexicon] + _code("src/nlp_process.py", "src/nlp/*.py", "src/storage/files.py", "src/storage/db_nlp_addon.py"),
+            "outputs": [f"data/processed/{day}.parquet"]}
+
+def _price_digest(cfg: dict, day: str) -> Optional[str]:
+    """Digest of the stored bars the features stage reads for ``day``'s symbols (None without a price store)."""
+    from sqlalchemy.exc import OperationalError
+    from src.storage.db_prices_addon import PricesDB
+    from src.storage.files import read_processed
+    feat_cfg = cfg.get("features", {}); px_cfg = feat_cfg.get("price_cache", {})
+    rows = read_processed(day)
+    if not px_cfg.get("enabled", True) or rows is None or "symbols" not in rows: return None
+    symbols = sorted({s for syms in rows["symbols"] for s in (syms or [])})
+    start = (date.fromisoformat(day) - timedelta(days=int(feat_cfg.get("lookback_days", 180)) + 10)).isoformat()
+    try:
+        return PricesDB(px_cfg.get("sqlite_path", "db/news.db")).digest(symbols, start, day)
+    except OperationalError:  # no prices table yet
+        return None
+
+def _features_spec(cfg: dict, day: str) -> dict:
+    st = {"enabled": True, "root": "data/feature_store", **cfg.get("features", {}).get("store", {})}
+    # stored price bars are an input too: a backfill or correction invalidates the day
+    return {"config": {**_section(cfg, "features"), "prices": _price_digest(cfg, day)},
+            "inputs": [f"data/processed/{day}.parquet"] + _code("src/features_process.py", "src/features/*.py",
+                                                                 "src/storage/db_features_addon.py", "src/storage/db_prices_addon.py",
+                                                                 "src/storage/feature_store.py"),
+            "outputs": [f"data/processed/features/{day}.parquet"] + ([f"{st['root']}/{day}.arrow"] if st["enabled"] else []),
+            # a run with failed symbols is redone next time
+            "retry_on": ["symbol"]}
+
+def _run_fetch(cfg: dict, day: str, stage: StageMetrics) -> bool:
+    from src import data_fetch
+    data_fetch.run(cfg, day, stage=stage)
+    return True
+
+def _run_nlp(cfg: dict, day: str, stage: StageMetrics) -> bool:
+    from src import nlp_process
+    from src.storage.db_nlp_addon import NewsDB_NLP
+    NewsDB_NLP("db/news.db").create_tables()
+    nlp_process.init_worker(cfg)
+    return nlp_process.process_day(day, stage=stage) is not None
+
+def _run_features(cfg: dict, day: str, stage: StageMetrics) -> bool:
+    from src import features_process
+    from src.storage.db_features_addon import FeaturesDB
+    feat_cfg = cfg.get("features", {})
+    store = features_process._price_store(feat_cfg)
+    if store is not None: store.create_tables()
+    FeaturesDB("db/news.db").create_tables()
+    features_process.init_worker(cfg, int(feat_cfg.get("lookback_days", 180)), bool(feat_cfg.get("incremental", False)))
+    return features_process.process_day(day, stage=stage) is not None
+
+STAGES = [Stage("fetch", _fetch_spec, _run_fetch), Stage("nlp", _nlp_spec, _run_nlp), Stage("features", _features_spec, _run_features)]
+
+def run_pipeline(cfg: dict, day: str, stages: Optional[List[str]] = None, force: bool = False,
+                 cache: Optional[StageCache] = None, logger=None, report: Optional[RunReport] = None) -> Dict[str, str]:
+    """Run the selected stages in order for ``day``; returns ``{stage: "ran" | "cached" | "failed"}``.
+
+    A failed stage stops the run so later stages never read a stale input. A stage that reported
+    failures of a kind in its spec's ``retry_on`` runs but is not recorded, so the next run redoes
+    it. Stage metrics go to ``report``.
+    """
+    logger = logger or get_logger(__name__)
+    report = report or RunReport("pipeline", day)
+    cache = cache or StageCache(cfg.get("pipeline", {}).get("state_path", STATE_PATH))
+    status: Dict[str, str] = {}
+    try:
+        for st in STAGES:
+            if stages and st.name not in stages: continue
+            t0 = time.perf_counter()
+            spec = st.spec(cfg, day)
+            key = f"{st.name}|{day}"
+            fp = cache.fingerprint(spec["config"], spec["inputs"])
+            if not force and cache.fresh(key, fp, spec.get("max_age")):
+                status[st.name] = "cached"; report.skipped(st.name)
+                logger.info(f"{st.name}: up to date ({time.perf_counter() - t0:.3f}s)"); continue
+            with report.stage(st.name) as metrics:
+                ok = st.run(cfg, day, metrics)
+                if not ok: metrics.status = "failed"
+            status[st.name] = "ran" if ok else "failed"
+            logger.info(f"{st.name}: {status[st.name]} in {time.perf_counter() - t0:.2f}s")
+            if not ok: break
+            partial = [f for f in metrics.failures if f["kind"] in spec.get("retry_on", ())]
+            if partial:
+                logger.info(f"{st.name}: {len(partial)} {partial[0]['kind']} failures, not cached"); continue
+            # inputs the stage itself produced (e.g. a first raw file) are picked up in the recorded fingerprint
+            spec = st.spec(cfg, day)
+            cache.record(key, cache.fingerprint(spec["config"], spec["inputs"]), spec["outputs"])
+    finally:
+        cache.save()
+    return status
+
+def main():
+    ap = argparse.ArgumentParser(prog="python -m src", description="Run fetch -> nlp -> features for one day, skipping unchanged stages")
+    ap.add_argument("--date", type=str, default="today", help="YYYY-MM-DD (IST) or 'today'")
+    ap.add_argument("--config", type=str, default="config/config.yaml")
+    ap.add_argument("--stages", type=str, default=None, help="Comma-separated subset of fetch,nlp,features")
+    ap.add_argument("--force", action="store_true", help="Run the selected stages even if cached")
+    add_cli_args(ap, stages=[s.name for s in STAGES])
+    args = ap.parse_args()
+    with open(args.config, "r", encoding="utf-8") as f:
+        cfg = yaml.safe_load(f)
+    day = args.date
+    if day == "today":
+        day = datetime.now(ZoneInfo(cfg.get("timezone", "Asia/Kolkata"))).date().isoformat()
+    logger = get_logger(__name__)
+    report = RunReport.from_args("pipeline", day, args)
+    t0 = time.perf_counter()
+    try:
+        status = run_pipeline(cfg, day, args.stages.split(",") if args.stages else None, args.force, logger=logger, report=report)
+    finally:
+        logger.info(f"Run report: {report.write()}")
+    logger.info(f"Pipeline {day}: {status} in {time.perf_counter() - t0:.2f}s")
+    if "failed" in status.values(): raise SystemExit(1)
@@ -0,0 +1,260 @@
+"""Local read-only HTTP/JSON service over news_nlp and features.
+
+    python -m src.service --port 8765
+
+    GET /health
+    GET /features/latest?symbols=INFY,TCS&asof=2024-01-05
+    GET /features/date/2024-01-05?symbols=INFY
+    GET /features/INFY?start=2024-01-01&end=2024-01-31
+    GET /news/INFY?start=2024-01-01&end=2024-01-31&limit=50
+    GET /events/DIVIDEND?start=2024-01-01&limit=50
+    GET /stats
+
+Queries run on a pooled read-only SQLite engine (WAL readers never block the nightly writers).
+Encoded responses are kept in a TTL/LRU cache that is dropped whenever ``PRAGMA data_version``
+shows another connection (a pipeline run, the daemon) has committed.
+"""
+from __future__ import annotations
+import argparse, json, os, sqlite3, threading, time
+from collections import OrderedDict, deque
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+import pandas as pd
+import yaml
+from src.utils.logger import get_logger
+from src.storage.db_features_addon import FeaturesDB
+from src.storage.db_nlp_addon import NewsDB_NLP
+
+class BadRequest(ValueError):
+    pass
+
+class ResponseCache:
+    """LRU of encoded responses with a TTL, cleared when the database's data_version moves."""
+    def __init__(self, db_path: str, max_entries: int = 1024, ttl: float = 60.0, check_interval: float = 0.0):
+        self.max_entries, self.ttl, self.check_interval = max(1, int(max_entries)), float(ttl), float(check_interval)
+        self._d: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        # data_version is per connection, so one dedicated connection watches for commits
+        self._conn = sqlite3.connect(f"file:{os.path.abspath(db_path)}?mode=ro", uri=True, check_same_thread=False)
+        self._version = self._data_version()
+        self._checked = time.monotonic()
+        self.hits = self.misses = self.invalidations = 0
+
+    def _data_version(self) -> int:
+        return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _sync(self, now: float) -> None:
+        if now - self._checked < self.check_interval: return
+        self._checked = now
+        v = self._data_version()
+        if v != self._version:
+            self._version = v; self._d.clear(); self.invalidations += 1
+
+    def get(self, key: str, count: bool = True) -> Optional[Tuple[int, bytes]]:
+        now = time.monotonic()
+        with self._lock:
+            self._sync(now)
+            hit = self._d.get(key)
+            if hit is None or now - hit[0] > self.ttl:
+                if count: self.misses += 1
+                return None
+            self._d.move_to_end(key)
+            if count: self.hits += 1
+            return hit[1]
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def put(self, key: str, value: Tuple[int, bytes], version: Optional[int] = None) -> None:
+        """Store ``value`` unless a commit landed since ``version`` (the query may have seen old data)."""
+        with self._lock:
+            if version is not None:
+                self._sync(time.monotonic())
+                if version != self._version: return
+            self._d[key] = (time.monotonic(), value); self._d.move_to_end(key)
+            while len(self._d) > self.max_entries: self._d.popitem(last=False)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"entries": len(self._d), "hits": self.hits, "misses": self.misses,
+                    "hit_rate": round(self.hits / max(1, self.hits + self.misses), 4), "invalidations": self.invalidations}
+
+    def close(self) -> None:
+        self._conn.close()
+
+class Latency:
+    """Rolling request latencies (seconds) per route."""
+    def __init__(self, window: int = 10_000):
+        self.window = window
+        self.samples: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def add(self, route: str, seconds: float) -> None:
+        with self._lock:
+            self.samples.setdefault(route, deque(maxlen=self.window)).append(seconds)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            snap = {k: sorted(v) for k, v in self.samples.items() if v}
+        return {k: {"n": len(s), "p50_ms": round(s[len(s) // 2] * 1e3, 3),
+                    "p99_ms": round(s[min(len(s) - 1, int(len(s) * 0.99))] * 1e3, 3), "max_ms": round(s[-1] * 1e3, 3)}
+                for k, s in snap.items()}
+
+def _day(q: Dict[str, str], name: str) -> Optional[str]:
+    v = q.get(name)
+    if v is None: return None
+    try:
+        return date.fromisoformat(v).isoformat()
+    except ValueError:
+        raise BadRequest(f"{name} must be YYYY-MM-DD") from None
+
+def _symbols(q: Dict[str, str]) -> Optional[List[str]]:
+    return [s.strip().upper() for s in q["symbols"].split(",") if s.strip()] if q.get("symbols") else None
+
+def _limit(q: Dict[str, str], cap: int = 1000) -> int:
+    try:
+        return max(1, min(cap, int(q.get("limit", 100))))
+    except ValueError:
+        raise BadRequest("limit must be an integer") from None
+
+def _records(df: pd.DataFrame) -> List[Dict]:
+    if "id" in df: df = df.drop(columns="id")
+    return df.astype(object).where(df.notna(), None).to_dict(orient="records")
+
+class QueryService:
+    """Routes ``GET`` paths to the store query methods; returns ``(status, body)`` and caches 200s."""
+    def __init__(self, db_path: str = "db/news.db", cache_entries: int = 1024, cache_ttl: float = 60.0, check_interval: float = 0.0,
+                 p99_target_ms: Optional[float] = None):
+        self.nlp = NewsDB_NLP(db_path, read_only=True)
+        self.features = FeaturesDB(db_path, read_only=True)
+        self.cache = ResponseCache(db_path, cache_entries, cache_ttl, check_interval)
+        self.latency = Latency()
+        self.p99_target_ms = p99_target_ms
+        self._inflight: Dict[str, threading.Lock] = {}
+        self._inflight_lock = threading.Lock()
+        self.routes: Dict[str, Callable[[List[str], Dict[str, str]], object]] = {
+            "features": self._features, "news": self._news, "events": self._events}
+
+    def _features(self, parts: List[str], q: Dict[str, str]):
+        if parts == ["latest"]:
+            return _records(self.features.latest_features(_symbols(q), _day(q, "asof")))
+        if len(parts) == 2 and parts[0] == "date":
+            return _records(self.features.features_for_date(_day({"date": parts[1]}, "date"), _symbols(q)))
+        if len(parts) == 1:
+            return _records(self.features.features_for_symbol(parts[0], _day(q, "start"), _day(q, "end")))
+        return None
+
+    def _news(self, parts: List[str], q: Dict[str, str]):
+        if len(parts) != 1: return None
+        return self.nlp.news_for_symbol(parts[0], _day(q, "start"), _day(q, "end"), _limit(q))
+
+    def _events(self, parts: List[str], q: Dict[str, str]):
+        if len(parts) != 1: return None
+        return self.nlp.news_for_event(parts[0], _day(q, "start"), _day(q, "end"), _limit(q))
+
+    def handle(self, target: str) -> Tuple[int, bytes]:
+        t0 = time.perf_counter()
+        url = urlsplit(target)
+        parts = [p for p in url.path.split("/") if p]
+        route = parts[0] if parts and parts[0] in self.routes else ""
+        if parts == ["health"]:
+            return 200, _json({"status": "ok"})
+        if parts == ["stats"]:
+            return 200, _json(self.stats())
+        key = f"{url.path}?{url.query}"
+        res = self.cache.get(key)
+        if res is None:
+            res = self._fill(key, route, parts[1:], url.query)
+        self.latency.add(route, time.perf_counter() - t0)
+        return res
+
+    def _fill(self, key: str, route: str, parts: List[str], query: str) -> Tuple[int, bytes]:
+        # concurrent misses on one key wait for a single query instead of all hitting SQLite
+        with self._inflight_lock:
+            lock = self._inflight.setdefault(key, threading.Lock())
+        with lock:
+            res = self.cache.get(key, count=False)
+            if res is None:
+                version = self.cache.version
+                res = self._compute(route, parts, {k: v[-1] for k, v in parse_qs(query).items()})
+                if res[0] == 200: self.cache.put(key, res, version)
+        with self._inflight_lock:
+            if self._inflight.get(key) is lock and not lock.locked(): del self._inflight[key]
+        return res
+
+    def _compute(self, route: str, parts: List[str], q: Dict[str, str]) -> Tuple[int, bytes]:
+        fn = self.routes.get(route)
+        try:
+            data = fn(parts, q) if fn else None
+        except BadRequest as e:
+            return 400, _json({"error": str(e)})
+        if data is None:
+            return 404, _json({"error": "not found"})
+        return 200, _json(data)
+
+    def stats(self) -> Dict:
+        lat = self.latency.summary()
+        out = {"cache": self.cache.stats(), "latency": lat}
+        if self.p99_target_ms is not None:
+            out["p99_target_ms"] = self.p99_target_ms
+            out["over_target"] = sorted(k for k, v in lat.items() if v["p99_ms"] > self.p99_target_ms)
+        return out
+
+    def close(self) -> None:
+        self.cache.close()
+
+def _json(obj) -> bytes:
+    return json.dumps(obj, separators=(",", ":"), default=str).encode("utf-8")
+
+def make_server(service: QueryService, host: str = "127.0.0.1", port: int = 8765) -> ThreadingHTTPServer:
+    logger = get_logger(__name__)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            try:
+                status, body = service.handle(self.path)
+            except Exception as e:
+                logger.exception(f"Query failed: {self.path}")
+                status, body = 500, _json({"error": type(e).__name__})
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, fmt, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    return server
+
+def main():
+    ap = argparse.ArgumentParser(prog="python -m src.service", description="Read-only JSON query service over db/news.db")
+    ap.add_argument("--config", type=str, default="config/config.yaml")
+    ap.add_argument("--host", type=str, default=None)
+    ap.add_argument("--port", type=int, default=None)
+    args = ap.parse_args()
+    with open(args.config, "r", encoding="utf-8") as f:
+        cfg = (yaml.safe_load(f) or {}).get("service", {})
+    logger = get_logger(__name__)
+    service = QueryService(cfg.get("db_path", "db/news.db"), int(cfg.get("cache_entries", 1024)),
+                           float(cfg.get("cache_ttl_seconds", 60)), float(cfg.get("version_check_seconds", 0)),
+                           cfg.get("p99_target_ms"))
+    server = make_server(service, args.host or cfg.get("host", "127.0.0.1"), args.port or int(cfg.get("port", 8765)))
+    logger.info(f"Serving on http://{server.server_address[0]}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close(); service.close()
+        logger.info(f"Service stats: {service.stats()}")
+
+if __name__ == "__main__":
+    main()
@@ -1,62 +1,230 @@
 
 from __future__ import annotations
 
-import json
-from datetime import datetime, timedelta
-from typing import Dict, List
-
+import logging
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
 import requests
+from requests.adapters import HTTPAdapter
+from tenacity import Retrying, retry_if_exception_type, stop_after_attempt
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ENDPOINT = "/api/corporate-announcements?index=equities&from_date={from_date}&to_date={to_date}"
+RETRY_STATUS = {401, 403, 429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Thread-safe token bucket: ``rate`` requests per second on average, bursts up to ``burst``."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = float(rate)
+        self.capacity = max(1, int(burst))
+        self.tokens = float(self.capacity)
+        self.stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.stamp) * self.rate)
+                self.stamp = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+
+
+class RetryableStatus(Exception):
+    def __init__(self, status: int, retry_after: Optional[float] = None):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+        self.retry_after = retry_after
+
+
+def _retry_after(value: Optional[str]) -> Optional[float]:
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except ValueError:
+        return None
+
+
+def parse_announcement(item: Dict) -> Dict:
+    return {
+        "source": "nse_corporate",
+        "title": item.get("sm_ann_desc", ""),
+        "summary": item.get("subject", ""),
+        "url": item.get("pdfUrl") or item.get("attchmntFile") or "",
+        "published_at": item.get("ann_date") or item.get("dissemDT") or None,
+        "company_symbols": [item.get("symbol")] if item.get("symbol") else [],
+        "raw": item,
+    }
+
+
+class NSEClient:
+    """Reusable NSE API client.
+
+    One pooled session whose cookies (from a warm-up GET of the home page) are refreshed every
+    ``cookie_ttl`` seconds or after a 401/403. Every request, warm-ups included, takes a token from a
+    shared bucket. 401/403/429/5xx and connection errors are retried with exponential backoff,
+    honouring ``Retry-After`` on 429.
+    """
+
+    def __init__(
+        self,
+        base_url: str = "https://www.nseindia.com",
+        rate: float = 2.0,
+        burst: int = 4,
+        timeout: float = 30.0,
+        cookie_ttl: float = 300.0,
+        max_retries: int = 5,
+        backoff: float = 1.0,
+        backoff_max: float = 30.0,
+        pool_size: int = 8,
+        headers: Optional[Dict[str, str]] = None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.cookie_ttl = cookie_ttl
+        self.max_retries = max(1, int(max_retries))
+        self.backoff, self.backoff_max = backoff, backoff_max
+        self.bucket = TokenBucket(rate, burst)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "User-Agent": os.environ.get("HTTP_USER_AGENT", "Mozilla/5.0"),
+            "Accept": "application/json, text/plain, */*",
+            "Referer": f"{self.base_url}/",
+            "Accept-Language": "en-US,en;q=0.9",
+            **(headers or {}),
+        })
+        self._cookie_lock = threading.Lock()
+        self._cookie_at: Optional[float] = None
+
+    @classmethod
+    def from_config(cls, cfg: Dict) -> "NSEClient":
+        return cls(
+            base_url=cfg.get("base_url", "https://www.nseindia.com"),
+            rate=float(cfg.get("rate_per_sec", 2.0)),
+            burst=int(cfg.get("burst", 4)),
+            timeout=float(cfg.get("timeout_seconds", 30)),
+            cookie_ttl=float(cfg.get("cookie_ttl_seconds", 300)),
+            max_retries=int(cfg.get("max_retries", 5)),
+            headers=cfg.get("headers"),
+        )
+
+    def _get(self, url: str) -> requests.Response:
+        self.bucket.acquire()
+        return self.session.get(url, timeout=self.timeout)
+
+    def refresh_cookies(self, force: bool = False) -> None:
+        with self._cookie_lock:
+            stale = self._cookie_at is None or time.monotonic() - self._cookie_at > self.cookie_ttl
+            if force or stale:
+                self._get(f"{self.base_url}/")
+                self._cookie_at = time.monotonic()
+
+    def _wait(self, retry_state) -> float:
+        exc = retry_state.outcome.exception()
+        ra = getattr(exc, "retry_after", None)
+        if ra is not None:
+            return min(ra, self.backoff_max)
+        return min(self.backoff_max, self.backoff * 2 ** (retry_state.attempt_number - 1))
+
+    def _fetch_json(self, url: str):
+        self.refresh_cookies()
+        r = self._get(url)
+        if r.status_code in (401, 403):
+            with self._cookie_lock:
+                self._cookie_at = None  # next attempt warms up again
+        if r.status_code in RETRY_STATUS:
+            raise RetryableStatus(r.status_code, _retry_after(r.headers.get("Retry-After")) if r.status_code == 429 else None)
+        r.raise_for_status()
+        return r.json()
+
+    def get_json(self, path_or_url: str):
+        url = path_or_url if path_or_url.startswith("http") else f"{self.base_url}{path_or_url}"
+        retrying = Retrying(
+            retry=retry_if_exception_type((RetryableStatus, requests.ConnectionError, requests.Timeout)),
+            stop=stop_after_attempt(self.max_retries),
+            wait=self._wait,
+            reraise=True,
+        )
+        return retrying(self._fetch_json, url)
+
+    def announcements(
+        self,
+        start: date,
+        end: date,
+        window_days: int = 7,
+        max_workers: int = 4,
+        endpoint_template: Optional[str] = None,
+        date_format: str = "%Y-%m-%d",
+    ) -> List[Dict]:
+        """Announcements ``start``..``end`` (inclusive), fetched as ``window_days`` pages on up to
+        ``max_workers`` threads; the token bucket keeps the combined rate in budget. A page that
+        still fails after retries (the cookie warm-up included) is logged and skipped."""
+        template = endpoint_template or DEFAULT_ENDPOINT
+        windows = []
+        d = start
+        while d <= end:
+            w_end = min(end, d + timedelta(days=max(1, window_days) - 1))
+            windows.append((d, w_end))
+            d = w_end + timedelta(days=1)
+
+        def page(w):
+            url = template.format(from_date=w[0].strftime(date_format), to_date=w[1].strftime(date_format))
+            try:
+                data = self.get_json(url)
+            except Exception as e:
+                logger.warning(f"NSE announcements {w[0]}..{w[1]} failed: {type(e).__name__}: {e}")
+                return []
+            return [parse_announcement(it) for it in (data if isinstance(data, list) else data.get("data", []))]
+
+        if not windows:
+            return []
+        # each page warms up cookies inside its retry loop; the lock lets only the first one hit the home page
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(windows)))) as ex:
+            pages = list(ex.map(page, windows))
+        return [it for p in pages for it in p]
+
+
+_CLIENTS: Dict[tuple, NSEClient] = {}
+
+
+def get_client(cfg: Dict) -> NSEClient:
+    """Process-wide client per configuration, so cookies and the rate budget are shared."""
+    key = tuple(sorted((k, str(v)) for k, v in cfg.items()))
+    if key not in _CLIENTS:
+        _CLIENTS[key] = NSEClient.from_config(cfg)
+    return _CLIENTS[key]
 
 
 def try_fetch_nse_announcements(run_day: datetime, cfg: Dict) -> List[Dict]:
-    """Best-effort query to NSE corporate announcements.
+    """Best-effort NSE corporate announcements for ``run_day - from_days_back`` ..
+    ``run_day - to_days_back``.
 
     NOTE:
-      - NSE often blocks automated clients (403) without proper session cookies, headers and pacing.
-      - This Phase 1 helper returns [] if the call fails; enable gradually.
+      - NSE often blocks automated clients (403) without proper session cookies, headers and pacing;
+        the shared client handles cookies, pacing and retries. Pages that keep failing yield no items.
     """
     from_days = cfg.get("from_days_back", 0)
     to_days = cfg.get("to_days_back", 0)
-
-    start = (run_day - timedelta(days=from_days)).date().isoformat()
-    end = (run_day - timedelta(days=to_days)).date().isoformat()
-
-    endpoint = cfg.get("endpoint_template") or (
-        "https://www.nseindia.com/api/corporate-announcements?index=equities&from_date={from_date}&to_date={to_date}"
+    start = (run_day - timedelta(days=from_days)).date()
+    end = (run_day - timedelta(days=to_days)).date()
+    return get_client(cfg).announcements(
+        start, end,
+        window_days=int(cfg.get("window_days", 7)),
+        max_workers=int(cfg.get("max_workers", 4)),
+        endpoint_template=cfg.get("endpoint_template"),
+        date_format=cfg.get("date_format", "%Y-%m-%d"),
     )
-    url = endpoint.format(from_date=start, to_date=end)
-
-    headers = {
-        "User-Agent": os.environ.get("HTTP_USER_AGENT", "Mozilla/5.0"),
-        "Accept": "application/json, text/plain, */*",
-        "Referer": "https://www.nseindia.com/",
-        "Connection": "keep-alive",
-        "Accept-Language": "en-US,en;q=0.9",
-    }
-
-    try:
-        s = requests.Session()
-        # Warm-up GET to set cookies
-        s.get("https://www.nseindia.com/", headers=headers, timeout=15)
-        r = s.get(url, headers=headers, timeout=30)
-        if r.status_code != 200:
-            return []
-        data = r.json()
-    except Exception:
-        return []
-
-    out: List[Dict] = []
-    for item in data if isinstance(data, list) else data.get("data", []):
-        out.append(
-            {
-                "source": "nse_corporate",
-                "title": item.get("sm_ann_desc", ""),
-                "summary": item.get("subject", ""),
-                "url": item.get("pdfUrl") or item.get("attchmntFile") or "",
-                "published_at": item.get("ann_date") or item.get("dissemDT") or None,
-                "company_symbols": [item.get("symbol")] if item.get("symbol") else [],
-                "raw": item,
-            }
-        )
-    return out
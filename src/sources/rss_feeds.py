@@ -1,11 +1,20 @@
 
 from __future__ import annotations
 
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, List
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
 from zoneinfo import ZoneInfo
 
 import feedparser
+import requests
+
+_local = threading.local()
 
 
 def parse_entry(entry, tz) -> Dict:
@@ -34,9 +43,9 @@ def parse_entry(entry, tz) -> Dict:
     }
 
 
-def fetch_from_feed(url: str, tz_name: str = "Asia/Kolkata") -> List[Dict]:
+def parse_feed(content, tz_name: str = "Asia/Kolkata") -> List[Dict]:
     tz = ZoneInfo(tz_name)
-    parsed = feedparser.parse(url)
+    parsed = feedparser.parse(content)
     items = []
     for entry in parsed.entries:
         try:
@@ -47,12 +56,109 @@ def fetch_from_feed(url: str, tz_name: str = "Asia/Kolkata") -> List[Dict]:
     return items
 
 
-def fetch_from_all_feeds(urls: List[str], tz_name: str = "Asia/Kolkata") -> List[Dict]:
+def fetch_from_feed(url: str, tz_name: str = "Asia/Kolkata") -> List[Dict]:
+    return parse_feed(url, tz_name)
+
+
+def load_feed_state(path: str | None) -> Dict[str, Dict]:
+    if not path or not Path(path).exists():
+        return {}
+    try:
+        return json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def save_feed_state(path: str | None, state: Dict[str, Dict]) -> None:
+    if not path:
+        return
+    p = Path(path)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    tmp = p.with_suffix(p.suffix + ".tmp")
+    tmp.write_text(json.dumps(state, indent=2, sort_keys=True), encoding="utf-8")
+    tmp.replace(p)
+
+
+def _session() -> requests.Session:
+    # One session per worker thread so connections to the same host are reused.
+    s = getattr(_local, "session", None)
+    if s is None:
+        s = _local.session = requests.Session()
+    return s
+
+
+def _read_body(r: requests.Response, deadline: float) -> bytes:
+    # ``timeout`` bounds each socket read; a feed trickling bytes is cut off at ``deadline``
+    chunks = []
+    for chunk in r.iter_content(64 * 1024):
+        chunks.append(chunk)
+        if time.perf_counter() > deadline:
+            raise requests.Timeout("feed body not received within the deadline")
+    return b"".join(chunks)
+
+
+def fetch_feed_conditional(
+    url: str, tz_name: str = "Asia/Kolkata", timeout: float = 15.0, cached: Optional[Dict] = None
+) -> Tuple[List[Dict], Dict, Optional[Dict]]:
+    """Fetch one feed with If-None-Match/If-Modified-Since.
+
+    ``timeout`` applies per socket operation and the whole download must finish within twice
+    that of the request's start. Returns ``(items, stat, new_state)``. A 304 yields no items and
+    keeps the cached validators; ``new_state`` is None when the fetch failed.
+    """
+    headers = {"User-Agent": os.environ.get("HTTP_USER_AGENT", "Mozilla/5.0")}
+    cached = cached or {}
+    if cached.get("etag"):
+        headers["If-None-Match"] = cached["etag"]
+    if cached.get("last_modified"):
+        headers["If-Modified-Since"] = cached["last_modified"]
+    stat = {"url": url, "status": None, "items": 0, "elapsed_ms": 0.0, "error": None}
+    t0 = time.perf_counter()
+    try:
+        with _session().get(url, headers=headers, timeout=timeout, stream=True) as r:
+            stat["status"] = r.status_code
+            if r.status_code == 304:
+                return [], stat, cached
+            r.raise_for_status()
+            content = _read_body(r, t0 + timeout * 2)
+        items = parse_feed(content, tz_name)
+        stat["items"] = len(items)
+        new_state = {"etag": r.headers.get("ETag"), "last_modified": r.headers.get("Last-Modified")}
+        return items, stat, {k: v for k, v in new_state.items() if v}
+    except Exception as e:
+        stat["error"] = f"{type(e).__name__}: {e}"
+        return [], stat, None
+    finally:
+        stat["elapsed_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+
+
+def fetch_from_all_feeds(
+    urls: List[str],
+    tz_name: str = "Asia/Kolkata",
+    max_workers: int = 16,
+    timeout: float = 15.0,
+    state: Optional[Dict[str, Dict]] = None,
+    stats: Optional[List[Dict]] = None,
+) -> Tuple[List[Dict], Dict[str, Dict]]:
+    """Fetch all feeds concurrently on a bounded thread pool.
+
+    Each request has its own deadline (see ``fetch_feed_conditional``), so a slow feed never
+    cuts short the ones queued behind it. ``state`` holds the ETag/Last-Modified validators
+    (``load_feed_state``) so unchanged feeds answer 304 and are not reparsed. Returns
+    ``(items, new_state)``; callers save ``new_state`` only once the items are stored, so a
+    failed run refetches them. Per-feed stats are appended to ``stats``.
+    """
+    state = dict(state or {})
+    if not urls:
+        return [], state
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(urls)))) as ex:
+        results = list(ex.map(lambda u: fetch_feed_conditional(u, tz_name, timeout, state.get(u)), urls))
+
     all_items: List[Dict] = []
-    for u in urls:
-        try:
-            all_items.extend(fetch_from_feed(u, tz_name))
-        except Exception:
-            # Ignore feed errors for robustness in Phase 1
-            pass
-    return all_items
+    for u, (items, stat, new_state) in zip(urls, results):
+        all_items.extend(items)
+        if new_state is not None:
+            state[u] = new_state
+        if stats is not None:
+            stats.append(stat)
+    return all_items, state
@@ -9,15 +9,23 @@ from sqlalchemy import (
     DateTime,
     Text,
     select,
+    Index,
     UniqueConstraint,
 )
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import declarative_base, Mapped, mapped_column, Session
 
+from src.storage.engine import make_engine
+
+# Rows per executemany round trip for bulk upserts.
+CHUNK_SIZE = 5000
+
 Base = declarative_base()
 
 
 class News(Base):
     __tablename__ = "news"
+    __table_args__ = (Index("ix_news_published_at", "published_at"),)
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     source: Mapped[str] = mapped_column(String(50), nullable=False)
     title: Mapped[str] = mapped_column(Text, nullable=False)
@@ -29,32 +37,33 @@ class News(Base):
 
 
 class NewsDB:
-    def __init__(self, path: str):
-        self.engine = create_engine(f"sqlite:///{path}", future=True)
+    def __init__(self, path: str, read_only: bool = False):
+        self.engine = make_engine(path, read_only)
 
     def create_tables(self) -> None:
         Base.metadata.create_all(self.engine)
+        for ix in News.__table__.indexes:
+            ix.create(self.engine, checkfirst=True)
 
     def insert_many(self, items: List[Dict]) -> int:
         if not items:
             return 0
-        rows = 0
-        with Session(self.engine) as s:
-            for it in items:
-                # Upsert-lite: skip if URL exists
-                exists = s.execute(select(News).where(News.url == it.get("url"))).scalar_one_or_none()
-                if exists:
-                    continue
-                row = News(
-                    source=it.get("source", ""),
-                    title=it.get("title", ""),
-                    summary=it.get("summary"),
-                    url=it.get("url", ""),
-                    published_at=it.get("published_at"),
-                    company_symbols=",".join(it.get("company_symbols") or []),
-                    raw=str(it.get("raw")) if it.get("raw") is not None else None,
-                )
-                s.add(row)
-                rows += 1
-            s.commit()
-        return rows
+        rows = [
+            {
+                "source": it.get("source", ""),
+                "title": it.get("title", ""),
+                "summary": it.get("summary"),
+                "url": it.get("url", ""),
+                "published_at": it.get("published_at"),
+                "company_symbols": ",".join(it.get("company_symbols") or []),
+                "raw": str(it.get("raw")) if it.get("raw") is not None else None,
+            }
+            for it in items
+        ]
+        # Upsert-lite: skip rows whose URL already exists (first occurrence in a batch wins)
+        stmt = sqlite_insert(News).on_conflict_do_nothing(index_elements=["url"])
+        inserted = 0
+        with self.engine.begin() as conn:
+            for i in range(0, len(rows), CHUNK_SIZE):
+                inserted += conn.execute(stmt, rows[i : i + CHUNK_SIZE]).rowcount
+        return inserted
@@ -1,12 +1,18 @@
 from __future__ import annotations
-from sqlalchemy import create_engine, String, Text, Float, Integer
+from typing import List, Optional
+from sqlalchemy import create_engine, String, Text, Float, Integer, Index, select, func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import declarative_base, Mapped, mapped_column, Session
 import pandas as pd
+from src.storage.db import CHUNK_SIZE
+from src.storage.engine import make_engine, needs_real_migration, rebuild_table, table_exists
 
 BaseFE = declarative_base()
 
 class Features(BaseFE):
     __tablename__ = "features"
+    __table_args__ = (Index("ux_features_date_symbol", "fe_date", "symbol", unique=True),
+                      Index("ix_features_symbol_date", "symbol", "fe_date"))
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     fe_date: Mapped[str] = mapped_column(String(16), nullable=False)
     symbol: Mapped[str] = mapped_column(String(32), nullable=False)
@@ -14,11 +20,11 @@ class Features(BaseFE):
     is_pos_sum: Mapped[int] = mapped_column(Integer, nullable=True)
     is_neg_sum: Mapped[int] = mapped_column(Integer, nullable=True)
     is_neu_sum: Mapped[int] = mapped_column(Integer, nullable=True)
-    sent_mean: Mapped[str] = mapped_column(String(32), nullable=True)
-    sent_max: Mapped[str] = mapped_column(String(32), nullable=True)
-    sent_min: Mapped[str] = mapped_column(String(32), nullable=True)
-    pos_ratio: Mapped[str] = mapped_column(String(32), nullable=True)
-    neg_ratio: Mapped[str] = mapped_column(String(32), nullable=True)
+    sent_mean: Mapped[float] = mapped_column(Float, nullable=True)
+    sent_max: Mapped[float] = mapped_column(Float, nullable=True)
+    sent_min: Mapped[float] = mapped_column(Float, nullable=True)
+    pos_ratio: Mapped[float] = mapped_column(Float, nullable=True)
+    neg_ratio: Mapped[float] = mapped_column(Float, nullable=True)
     EARNINGS: Mapped[int] = mapped_column(Integer, nullable=True)
     DIVIDEND: Mapped[int] = mapped_column(Integer, nullable=True)
     ORDER_WIN: Mapped[int] = mapped_column(Integer, nullable=True)
@@ -33,49 +39,64 @@ class Features(BaseFE):
     atr: Mapped[float] = mapped_column(Float, nullable=True)
     vol_20: Mapped[float] = mapped_column(Float, nullable=True)
 
+_INT_COLS = ("news_count", "is_pos_sum", "is_neg_sum", "is_neu_sum")
+_EVENT_COLS = ("EARNINGS", "DIVIDEND", "ORDER_WIN")
+_FLOAT_COLS = ("sent_mean", "sent_max", "sent_min", "pos_ratio", "neg_ratio", "close", "sma_20", "ema_20", "ema_50", "rsi", "macd", "macd_signal", "macd_hist", "atr", "vol_20")
+
+# stored as String(32) before the typed schema
+_LEGACY_TEXT_COLS = ("sent_mean", "sent_max", "sent_min", "pos_ratio", "neg_ratio")
+
 class FeaturesDB:
-    def __init__(self, path: str):
-        self.engine = create_engine(f"sqlite:///{path}", future=True)
+    def __init__(self, path: str, read_only: bool = False):
+        self.engine = make_engine(path, read_only)
 
     def create_tables(self) -> None:
+        with self.engine.begin() as conn:
+            if table_exists(conn, "features") and needs_real_migration(conn, "features", _LEGACY_TEXT_COLS):
+                rebuild_table(conn, Features.__table__, _LEGACY_TEXT_COLS)
         BaseFE.metadata.create_all(self.engine)
+        # tables created before the unique index existed need it for ON CONFLICT upserts
+        for ix in Features.__table__.indexes: ix.create(self.engine, checkfirst=True)
 
     def insert_many(self, df: pd.DataFrame) -> int:
         if df is None or df.empty: return 0
         rows = df.to_dict(orient="records")
-        with Session(self.engine) as s:
-            for r in rows:
-                s.execute(
-                    Features.__table__.delete().where(
-                        (Features.fe_date == r.get("fe_date")) & (Features.symbol == r.get("symbol"))
-                    )
-                )
-                obj = Features(
-                    fe_date=r.get("fe_date"),
-                    symbol=r.get("symbol"),
-                    news_count=int(r.get("news_count") or 0),
-                    is_pos_sum=int(r.get("is_pos_sum") or 0),
-                    is_neg_sum=int(r.get("is_neg_sum") or 0),
-                    is_neu_sum=int(r.get("is_neu_sum") or 0),
-                    sent_mean=str(r.get("sent_mean")) if r.get("sent_mean") is not None else None,
-                    sent_max=str(r.get("sent_max")) if r.get("sent_max") is not None else None,
-                    sent_min=str(r.get("sent_min")) if r.get("sent_min") is not None else None,
-                    pos_ratio=str(r.get("pos_ratio")) if r.get("pos_ratio") is not None else None,
-                    neg_ratio=str(r.get("neg_ratio")) if r.get("neg_ratio") is not None else None,
-                    EARNINGS=int(r.get("EARNINGS") or 0) if "EARNINGS" in r else None,
-                    DIVIDEND=int(r.get("DIVIDEND") or 0) if "DIVIDEND" in r else None,
-                    ORDER_WIN=int(r.get("ORDER_WIN") or 0) if "ORDER_WIN" in r else None,
-                    close=float(r.get("close")) if r.get("close") is not None else None,
-                    sma_20=float(r.get("sma_20")) if r.get("sma_20") is not None else None,
-                    ema_20=float(r.get("ema_20")) if r.get("ema_20") is not None else None,
-                    ema_50=float(r.get("ema_50")) if r.get("ema_50") is not None else None,
-                    rsi=float(r.get("rsi")) if r.get("rsi") is not None else None,
-                    macd=float(r.get("macd")) if r.get("macd") is not None else None,
-                    macd_signal=float(r.get("macd_signal")) if r.get("macd_signal") is not None else None,
-                    macd_hist=float(r.get("macd_hist")) if r.get("macd_hist") is not None else None,
-                    atr=float(r.get("atr")) if r.get("atr") is not None else None,
-                    vol_20=float(r.get("vol_20")) if r.get("vol_20") is not None else None,
-                )
-                s.add(obj)
-            s.commit()
+        values = [{
+            "fe_date": r.get("fe_date"), "symbol": r.get("symbol"),
+            **{c: int(r.get(c) or 0) for c in _INT_COLS},
+            # features_process names the event counts <EVENT>_sum
+            **{c: int(r.get(f"{c}_sum") or 0) if f"{c}_sum" in r else None for c in _EVENT_COLS},
+            **{c: float(r.get(c)) if r.get(c) is not None else None for c in _FLOAT_COLS},
+        } for r in rows]
+        stmt = sqlite_insert(Features)
+        stmt = stmt.on_conflict_do_update(index_elements=["fe_date", "symbol"],
+                                          set_={c: stmt.excluded[c] for c in (*_INT_COLS, *_EVENT_COLS, *_FLOAT_COLS)})
+        with self.engine.begin() as conn:
+            for i in range(0, len(values), CHUNK_SIZE):
+                conn.execute(stmt, values[i:i + CHUNK_SIZE])
         return len(rows)
+
+    def _frame(self, q) -> pd.DataFrame:
+        with self.engine.connect() as conn:
+            return pd.read_sql(q, conn)
+
+    def features_for_date(self, fe_date: str, symbols: Optional[List[str]] = None) -> pd.DataFrame:
+        q = select(Features).where(Features.fe_date == fe_date)
+        if symbols: q = q.where(Features.symbol.in_([s.upper() for s in symbols]))
+        return self._frame(q.order_by(Features.symbol))
+
+    def features_for_symbol(self, symbol: str, start: Optional[str] = None, end: Optional[str] = None) -> pd.DataFrame:
+        """Feature history for ``symbol`` between ISO dates ``start``..``end`` (inclusive), oldest first."""
+        q = select(Features).where(Features.symbol == symbol.upper())
+        if start: q = q.where(Features.fe_date >= start)
+        if end: q = q.where(Features.fe_date <= end)
+        return self._frame(q.order_by(Features.fe_date))
+
+    def latest_features(self, symbols: Optional[List[str]] = None, asof: Optional[str] = None) -> pd.DataFrame:
+        """Most recent feature row per symbol, optionally as of ISO date ``asof``."""
+        latest = select(Features.symbol, func.max(Features.fe_date).label("fe_date"))
+        if asof: latest = latest.where(Features.fe_date <= asof)
+        if symbols: latest = latest.where(Features.symbol.in_([s.upper() for s in symbols]))
+        latest = latest.group_by(Features.symbol).subquery()
+        q = select(Features).join(latest, (Features.symbol == latest.c.symbol) & (Features.fe_date == latest.c.fe_date))
+        return self._frame(q.order_by(Features.symbol))
@@ -1,11 +1,17 @@
 
 from __future__ import annotations
-from typing import List, Dict
-from sqlalchemy import create_engine, String, Text, select
+from datetime import date, timedelta
+from typing import List, Dict, Optional
+from sqlalchemy import create_engine, String, Text, Float, Integer, Index, select, delete, func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import declarative_base, Mapped, mapped_column, Session
+import pandas as pd
+from src.storage.db import CHUNK_SIZE
+from src.storage.engine import add_missing_columns, make_engine, normalize_ts, needs_real_migration, rebuild_table, table_exists
 BaseNLP = declarative_base()
 class NewsNLP(BaseNLP):
     __tablename__ = "news_nlp"
+    __table_args__ = (Index("ix_news_nlp_published_at", "published_at"), Index("ix_news_nlp_cluster", "cluster_id"))
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     url: Mapped[str] = mapped_column(Text, nullable=False, unique=True)
     title: Mapped[str] = mapped_column(Text, nullable=True)
@@ -13,37 +19,157 @@ class NewsNLP(BaseNLP):
     symbols: Mapped[str] = mapped_column(Text, nullable=True)
     events: Mapped[str] = mapped_column(Text, nullable=True)
     sentiment_label: Mapped[str] = mapped_column(String(16), nullable=True)
-    sentiment_score: Mapped[str] = mapped_column(String(32), nullable=True)
+    sentiment_score: Mapped[float] = mapped_column(Float, nullable=True)
     sentiment_engine: Mapped[str] = mapped_column(String(16), nullable=True)
     source: Mapped[str] = mapped_column(String(32), nullable=True)
+    # near-duplicate cluster (url_key of the first story seen) and signed 64-bit SimHash
+    cluster_id: Mapped[int] = mapped_column(Integer, nullable=True)
+    simhash: Mapped[int] = mapped_column(Integer, nullable=True)
+    # watermark: hash of the item content and the versions of the NLP stages that produced the row
+    content_hash: Mapped[str] = mapped_column(String(40), nullable=True)
+    sent_version: Mapped[str] = mapped_column(String(96), nullable=True)
+    events_version: Mapped[str] = mapped_column(String(48), nullable=True)
+    map_version: Mapped[str] = mapped_column(String(64), nullable=True)
+WATERMARK_COLS = ("content_hash", "sent_version", "events_version", "map_version")
+class NewsSymbol(BaseNLP):
+    """One row per (news item, symbol); ``published_at`` is normalised ISO and denormalised for range scans."""
+    __tablename__ = "news_symbol"
+    __table_args__ = (Index("ix_news_symbol_symbol_published", "symbol", "published_at"),
+                      Index("ix_news_symbol_published", "published_at"))
+    news_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    symbol: Mapped[str] = mapped_column(String(32), primary_key=True)
+    published_at: Mapped[str] = mapped_column(String(32), nullable=True)
+class NewsEvent(BaseNLP):
+    __tablename__ = "news_event"
+    __table_args__ = (Index("ix_news_event_event_published", "event", "published_at"),)
+    news_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    event: Mapped[str] = mapped_column(String(32), primary_key=True)
+    published_at: Mapped[str] = mapped_column(String(32), nullable=True)
+def _split(s: Optional[str]) -> List[str]:
+    return [x for x in (s or "").split(",") if x]
+def _end_bound(end: Optional[str]) -> Optional[str]:
+    # end dates are inclusive; compare against the start of the following day
+    return None if end is None else (date.fromisoformat(end[:10]) + timedelta(days=1)).isoformat()
 class NewsDB_NLP:
-    def __init__(self, path: str):
-        self.engine = create_engine(f"sqlite:///{path}", future=True)
+    def __init__(self, path: str, read_only: bool = False):
+        self.engine = make_engine(path, read_only)
     def create_tables(self) -> None:
+        with self.engine.begin() as conn:
+            if table_exists(conn, "news_nlp"):
+                add_missing_columns(conn, NewsNLP.__table__)
+                if needs_real_migration(conn, "news_nlp", ("sentiment_score",)):
+                    rebuild_table(conn, NewsNLP.__table__, ("sentiment_score",))
         BaseNLP.metadata.create_all(self.engine)
+        for t in BaseNLP.metadata.sorted_tables:
+            for ix in t.indexes: ix.create(self.engine, checkfirst=True)
+        with self.engine.begin() as conn:
+            if conn.execute(select(NewsSymbol.news_id).limit(1)).first() is None and conn.execute(select(NewsEvent.news_id).limit(1)).first() is None:
+                res = conn.execute(select(NewsNLP.id, NewsNLP.symbols, NewsNLP.events, NewsNLP.published_at))
+                while True:
+                    batch = res.fetchmany(CHUNK_SIZE)
+                    if not batch: break
+                    self._write_links(conn, [(i, _split(sy), _split(ev), pa) for i, sy, ev, pa in batch], replace=False)
+    def _write_links(self, conn, links, replace: bool = True) -> None:
+        if not links: return
+        ids = [l[0] for l in links]
+        if replace:
+            conn.execute(delete(NewsSymbol).where(NewsSymbol.news_id.in_(ids)))
+            conn.execute(delete(NewsEvent).where(NewsEvent.news_id.in_(ids)))
+        sym_rows = [{"news_id": i, "symbol": s, "published_at": normalize_ts(pa)} for i, syms, _, pa in links for s in dict.fromkeys(syms)]
+        ev_rows = [{"news_id": i, "event": e, "published_at": normalize_ts(pa)} for i, _, evs, pa in links for e in dict.fromkeys(evs)]
+        if sym_rows: conn.execute(sqlite_insert(NewsSymbol).on_conflict_do_nothing(), sym_rows)
+        if ev_rows: conn.execute(sqlite_insert(NewsEvent).on_conflict_do_nothing(), ev_rows)
     def insert_many(self, rows: List[Dict]) -> int:
         if not rows: return 0
+        values = [{
+            "url": r.get("url",""), "title": r.get("title"), "published_at": r.get("published_at"),
+            "symbols": ",".join(r.get("symbols") or []), "events": ",".join(r.get("events") or []),
+            "sentiment_label": r.get("sentiment_label"),
+            "sentiment_score": float(r["sentiment_score"]) if r.get("sentiment_score") is not None else None,
+            "sentiment_engine": r.get("sentiment_engine"), "source": r.get("source"),
+            "cluster_id": r.get("cluster_id"), "simhash": r.get("simhash"),
+            **{c: r.get(c) for c in WATERMARK_COLS},
+        } for r in rows]
+        stmt = sqlite_insert(NewsNLP)
+        stmt = stmt.on_conflict_do_update(index_elements=["url"], set_={
+            c: stmt.excluded[c] for c in ("title", "published_at", "symbols", "events", "sentiment_label", "sentiment_score",
+                                          "sentiment_engine", "source", "cluster_id", "simhash", *WATERMARK_COLS)})
         inserted = 0
-        with Session(self.engine) as s:
-            for r in rows:
-                exists = s.execute(select(NewsNLP).where(NewsNLP.url == r.get("url"))).scalar_one_or_none()
-                if exists:
-                    exists.symbols = ",".join(r.get("symbols") or [])
-                    exists.events = ",".join(r.get("events") or [])
-                    exists.sentiment_label = r.get("sentiment_label")
-                    exists.sentiment_score = str(r.get("sentiment_score"))
-                    exists.sentiment_engine = r.get("sentiment_engine")
-                    s.add(exists)
-                else:
-                    row = NewsNLP(
-                        url=r.get("url",""), title=r.get("title"),
-                        published_at=r.get("published_at"),
-                        symbols=",".join(r.get("symbols") or []),
-                        events=",".join(r.get("events") or []),
-                        sentiment_label=r.get("sentiment_label"),
-                        sentiment_score=str(r.get("sentiment_score")),
-                        sentiment_engine=r.get("sentiment_engine"),
-                        source=r.get("source"),
-                    ); s.add(row); inserted += 1
-            s.commit()
+        with self.engine.begin() as conn:
+            for i in range(0, len(values), CHUNK_SIZE):
+                chunk = values[i:i + CHUNK_SIZE]
+                urls = {v["url"] for v in chunk}
+                existing = set(conn.execute(select(NewsNLP.url).where(NewsNLP.url.in_(urls))).scalars())
+                inserted += len(urls - existing)
+                conn.execute(stmt, chunk)
+                stored = conn.execute(select(NewsNLP.id, NewsNLP.symbols, NewsNLP.events, NewsNLP.published_at).where(NewsNLP.url.in_(urls)))
+                self._write_links(conn, [(i_, _split(sy), _split(ev), pa) for i_, sy, ev, pa in stored])
         return inserted
+    def fingerprints(self, limit: int) -> List[tuple]:
+        """``(simhash, cluster_id, symbols)`` of the ``limit`` most recent rows, oldest first."""
+        q = (select(NewsNLP.simhash, NewsNLP.cluster_id, NewsNLP.symbols).where(NewsNLP.simhash.is_not(None))
+             .order_by(NewsNLP.id.desc()).limit(limit))
+        with self.engine.connect() as conn:
+            return [(fp, c, _split(sy)) for fp, c, sy in conn.execute(q).all()[::-1]]
+    def cluster_results(self, cluster_ids, versions: Optional[Dict[str, str]] = None) -> Dict[int, Dict]:
+        """Events and sentiment of the first stored row of each cluster (produced by ``versions``, if given)."""
+        out: Dict[int, Dict] = {}
+        ids = list(cluster_ids)
+        with self.engine.connect() as conn:
+            for i in range(0, len(ids), CHUNK_SIZE):
+                q = (select(NewsNLP.cluster_id, NewsNLP.events, NewsNLP.sentiment_label,
+                            NewsNLP.sentiment_score, NewsNLP.sentiment_engine)
+                     .where(NewsNLP.cluster_id.in_(ids[i:i + CHUNK_SIZE])).order_by(NewsNLP.id))
+                for c, v in (versions or {}).items(): q = q.where(getattr(NewsNLP, c) == v)
+                for c, ev, lab, sc, eng in conn.execute(q):
+                    out.setdefault(c, {"events": _split(ev),
+                                       "sentiment": {"label": lab, "score": sc, "engine": eng}})
+        return out
+    def rows_for_urls(self, urls) -> Dict[str, Dict]:
+        """Stored rows by URL, in processed-row form plus the watermark columns."""
+        out: Dict[str, Dict] = {}
+        ids = list(urls)
+        with self.engine.connect() as conn:
+            for i in range(0, len(ids), CHUNK_SIZE):
+                for r in conn.execute(select(NewsNLP).where(NewsNLP.url.in_(ids[i:i + CHUNK_SIZE]))).mappings():
+                    d = {k: r[k] for k in r.keys() if k != "id"}
+                    d["symbols"], d["events"] = _split(d["symbols"]), _split(d["events"])
+                    out[d["url"]] = d
+        return out
+    def recent_urls(self, limit: int) -> List[str]:
+        with self.engine.connect() as conn:
+            return list(conn.execute(select(NewsNLP.url).order_by(NewsNLP.id.desc()).limit(limit)).scalars())
+    def _query(self, link, key_col, key: str, start: Optional[str], end: Optional[str], limit: Optional[int]) -> List[Dict]:
+        q = (select(NewsNLP).join(link, link.news_id == NewsNLP.id).where(key_col == key)
+             .order_by(link.published_at.desc()))
+        if start: q = q.where(link.published_at >= start)
+        if end: q = q.where(link.published_at < _end_bound(end))
+        if limit: q = q.limit(limit)
+        with Session(self.engine) as s:
+            return [{
+                "url": n.url, "title": n.title, "published_at": n.published_at,
+                "symbols": _split(n.symbols), "events": _split(n.events),
+                "sentiment_label": n.sentiment_label, "sentiment_score": n.sentiment_score,
+                "sentiment_engine": n.sentiment_engine, "source": n.source,
+            } for n in s.execute(q).scalars()]
+    def news_for_symbol(self, symbol: str, start: Optional[str] = None, end: Optional[str] = None, limit: Optional[int] = None) -> List[Dict]:
+        """News for ``symbol`` between ISO dates ``start``..``end`` (inclusive), newest first."""
+        return self._query(NewsSymbol, NewsSymbol.symbol, symbol.upper(), start, end, limit)
+    def news_for_event(self, event: str, start: Optional[str] = None, end: Optional[str] = None, limit: Optional[int] = None) -> List[Dict]:
+        return self._query(NewsEvent, NewsEvent.event, event.upper(), start, end, limit)
+    def frame_between(self, start: str, end: str) -> pd.DataFrame:
+        """Symbol-tagged NLP rows published ``start``..``end`` (inclusive) as a DataFrame.
+
+        ``symbols``/``events`` come back as lists and ``published_at`` in normalised ISO form.
+        """
+        q = (select(NewsNLP.url, NewsNLP.title, func.min(NewsSymbol.published_at).label("published_at"),
+                    NewsNLP.symbols, NewsNLP.events, NewsNLP.sentiment_label, NewsNLP.sentiment_score,
+                    NewsNLP.sentiment_engine, NewsNLP.source, NewsNLP.cluster_id)
+             .join(NewsSymbol, NewsSymbol.news_id == NewsNLP.id)
+             .where(NewsSymbol.published_at >= start, NewsSymbol.published_at < _end_bound(end))
+             .group_by(NewsNLP.id))
+        with self.engine.connect() as conn:
+            df = pd.read_sql(q, conn)
+        df["symbols"] = df["symbols"].map(_split)
+        df["events"] = df["events"].map(_split)
+        return df
@@ -0,0 +1,122 @@
+from __future__ import annotations
+import hashlib, json
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from sqlalchemy import String, Text, Float, Integer, select, func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import declarative_base, Mapped, mapped_column
+import pandas as pd
+from src.storage.db import CHUNK_SIZE
+from src.storage.engine import make_engine
+
+BasePX = declarative_base()
+PRICE_COLS = ["open", "high", "low", "close", "adj_close", "volume"]
+
+class Price(BasePX):
+    __tablename__ = "prices"
+    symbol: Mapped[str] = mapped_column(String(32), primary_key=True)
+    date: Mapped[str] = mapped_column(String(10), primary_key=True)
+    open: Mapped[float] = mapped_column(Float, nullable=True)
+    high: Mapped[float] = mapped_column(Float, nullable=True)
+    low: Mapped[float] = mapped_column(Float, nullable=True)
+    close: Mapped[float] = mapped_column(Float, nullable=True)
+    adj_close: Mapped[float] = mapped_column(Float, nullable=True)
+    volume: Mapped[float] = mapped_column(Float, nullable=True)
+
+class PriceFetchStatus(BasePX):
+    __tablename__ = "price_fetch_status"
+    symbol: Mapped[str] = mapped_column(String(32), primary_key=True)
+    last_attempt: Mapped[str] = mapped_column(String(32), nullable=True)
+    last_success: Mapped[str] = mapped_column(String(32), nullable=True)
+    status: Mapped[str] = mapped_column(String(16), nullable=True)
+    error: Mapped[str] = mapped_column(Text, nullable=True)
+    rows: Mapped[int] = mapped_column(Integer, nullable=True)
+
+class IndicatorStateRow(BasePX):
+    __tablename__ = "indicator_state"
+    symbol: Mapped[str] = mapped_column(String(32), primary_key=True)
+    asof: Mapped[str] = mapped_column(String(10), nullable=True)
+    state: Mapped[str] = mapped_column(Text, nullable=False)
+
+class PricesDB:
+    """Local daily OHLCV store keyed by (symbol, date), plus per-symbol fetch status."""
+    def __init__(self, path: str):
+        self.engine = make_engine(path)
+
+    def create_tables(self) -> None:
+        BasePX.metadata.create_all(self.engine)
+
+    def date_ranges(self, symbols: List[str]) -> Dict[str, tuple]:
+        """``{symbol: (first_date, last_date)}`` of stored bars."""
+        if not symbols: return {}
+        q = (select(Price.symbol, func.min(Price.date), func.max(Price.date))
+             .where(Price.symbol.in_(symbols)).group_by(Price.symbol))
+        with self.engine.connect() as conn:
+            return {s: (lo, hi) for s, lo, hi in conn.execute(q)}
+
+    def digest(self, symbols: List[str], start: str, end: str) -> str:
+        """Fingerprint of the bars ``load(symbols, start, end)`` returns: per symbol the bar count,
+        last date and column totals, so new, backfilled or corrected bars change it."""
+        if not symbols: return ""
+        q = (select(Price.symbol, func.count(), func.max(Price.date), *[func.total(getattr(Price, c)) for c in PRICE_COLS])
+             .where(Price.symbol.in_(symbols), Price.date >= start, Price.date < end).group_by(Price.symbol).order_by(Price.symbol))
+        with self.engine.connect() as conn:
+            return hashlib.sha1(json.dumps([list(r) for r in conn.execute(q)]).encode()).hexdigest()
+
+    def upsert(self, symbol: str, df: pd.DataFrame) -> int:
+        if df is None or df.empty: return 0
+        values = [{"symbol": symbol, "date": pd.Timestamp(r["date"]).date().isoformat(),
+                   **{c: (float(r[c]) if c in r and pd.notna(r[c]) else None) for c in PRICE_COLS}}
+                  for r in df.to_dict(orient="records")]
+        stmt = sqlite_insert(Price)
+        stmt = stmt.on_conflict_do_update(index_elements=["symbol", "date"], set_={c: stmt.excluded[c] for c in PRICE_COLS})
+        with self.engine.begin() as conn:
+            for i in range(0, len(values), CHUNK_SIZE):
+                conn.execute(stmt, values[i:i + CHUNK_SIZE])
+        return len(values)
+
+    def load(self, symbols: List[str], start: str, end: str) -> Dict[str, pd.DataFrame]:
+        """Bars with ``start <= date < end`` per symbol (``end`` exclusive, like yfinance)."""
+        if not symbols: return {}
+        q = (select(Price).where(Price.symbol.in_(symbols), Price.date >= start, Price.date < end)
+             .order_by(Price.symbol, Price.date))
+        with self.engine.connect() as conn:
+            df = pd.read_sql(q, conn)
+        df["date"] = pd.to_datetime(df["date"])
+        return {s: g.drop(columns="symbol").reset_index(drop=True) for s, g in df.groupby("symbol", sort=False)}
+
+    def record_status(self, status: Dict[str, Dict]) -> None:
+        if not status: return
+        now = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        values = [{"symbol": s, "last_attempt": now, "last_success": now if st["status"] in ("ok", "up_to_date") else None,
+                   "status": st["status"], "error": st.get("error"), "rows": st.get("rows", 0)} for s, st in status.items()]
+        stmt = sqlite_insert(PriceFetchStatus)
+        stmt = stmt.on_conflict_do_update(index_elements=["symbol"], set_={
+            "last_attempt": stmt.excluded.last_attempt, "status": stmt.excluded.status, "error": stmt.excluded.error,
+            "rows": stmt.excluded.rows,
+            "last_success": func.coalesce(stmt.excluded.last_success, PriceFetchStatus.last_success)})
+        with self.engine.begin() as conn:
+            conn.execute(stmt, values)
+
+    def fetch_status(self, symbols: Optional[List[str]] = None) -> pd.DataFrame:
+        q = select(PriceFetchStatus)
+        if symbols: q = q.where(PriceFetchStatus.symbol.in_(symbols))
+        with self.engine.connect() as conn:
+            return pd.read_sql(q.order_by(PriceFetchStatus.symbol), conn)
+
+    def load_indicator_states(self, symbols: List[str]) -> Dict[str, dict]:
+        if not symbols: return {}
+        q = select(IndicatorStateRow.symbol, IndicatorStateRow.state).where(IndicatorStateRow.symbol.in_(symbols))
+        with self.engine.connect() as conn:
+            return {s: json.loads(st) for s, st in conn.execute(q)}
+
+    def save_indicator_states(self, states: Dict[str, dict]) -> None:
+        """Upsert serialised states; a stored state is only replaced by one with a later ``asof``
+        (backfilling older days must not rewind it)."""
+        if not states: return
+        values = [{"symbol": s, "asof": st.get("asof"), "state": json.dumps(st)} for s, st in states.items()]
+        stmt = sqlite_insert(IndicatorStateRow)
+        stmt = stmt.on_conflict_do_update(index_elements=["symbol"], set_={"asof": stmt.excluded.asof, "state": stmt.excluded.state},
+                                          where=IndicatorStateRow.asof.is_(None) | (stmt.excluded.asof > IndicatorStateRow.asof))
+        with self.engine.begin() as conn:
+            conn.execute(stmt, values)
@@ -0,0 +1,126 @@
+
+from __future__ import annotations
+
+import os
+import sqlite3
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlalchemy import Table, create_engine, event, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.pool import QueuePool
+
+# Applied to every new SQLite connection: WAL lets readers run alongside the nightly writers.
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 30000,
+    "temp_store": "MEMORY",
+    "cache_size": -64000,
+    "mmap_size": 268435456,
+}
+# Connections per read-only engine; further readers wait for a free one.
+READ_POOL_SIZE = 8
+
+
+# Read-only connections (the query service) must not touch the journal mode.
+READ_ONLY_PRAGMAS = {"query_only": 1, **{k: v for k, v in SQLITE_PRAGMAS.items() if k not in ("journal_mode", "synchronous")}}
+
+
+_ENGINES: Dict[tuple, Engine] = {}
+
+
+def make_engine(path: str, read_only: bool = False) -> Engine:
+    """One engine (and connection pool) per database file, mode and process, shared by every store class."""
+    key = (os.getpid(), os.path.abspath(path), read_only)
+    engine = _ENGINES.get(key)
+    if engine is None:
+        engine = _ENGINES[key] = _new_engine(path, read_only)
+    return engine
+
+
+def _new_engine(path: str, read_only: bool = False) -> Engine:
+    if read_only:
+        uri = f"file:{os.path.abspath(path)}?mode=ro"
+        engine = create_engine("sqlite://", future=True, creator=lambda: sqlite3.connect(uri, uri=True, check_same_thread=False),
+                               poolclass=QueuePool, pool_size=READ_POOL_SIZE, max_overflow=0)
+    else:
+        engine = create_engine(f"sqlite:///{path}", future=True)
+    pragmas = READ_ONLY_PRAGMAS if read_only else SQLITE_PRAGMAS
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_conn, _record):
+        cur = dbapi_conn.cursor()
+        for k, v in pragmas.items():
+            cur.execute(f"PRAGMA {k}={v}")
+        cur.close()
+
+    return engine
+
+
+def normalize_ts(value: Optional[str]) -> Optional[str]:
+    """Best-effort ISO-8601 form of a feed/NSE timestamp so string order matches time order."""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value).isoformat()
+    except ValueError:
+        pass
+    for fmt in ("%d-%b-%Y %H:%M:%S", "%d-%b-%Y"):
+        try:
+            return datetime.strptime(value, fmt).isoformat()
+        except ValueError:
+            continue
+    return value
+
+
+def declared_type(conn: Connection, table: str, column: str) -> Optional[str]:
+    for row in conn.exec_driver_sql(f"PRAGMA table_info({table})"):
+        if row[1] == column:
+            return (row[2] or "").upper()
+    return None
+
+
+def rebuild_table(conn: Connection, table: Table, real_columns: tuple) -> None:
+    """Recreate ``table`` from its model definition and copy rows, casting ``real_columns`` to REAL.
+
+    SQLite cannot change a column type in place; legacy text values such as ``'None'`` or
+    ``'nan'`` become NULL.
+    """
+    old = f"{table.name}__old"
+    conn.exec_driver_sql(f"ALTER TABLE {table.name} RENAME TO {old}")
+    for (ix,) in conn.exec_driver_sql(
+        "SELECT name FROM sqlite_master WHERE type='index' AND tbl_name=? AND sql IS NOT NULL", (old,)
+    ).all():
+        conn.exec_driver_sql(f"DROP INDEX {ix}")
+    table.create(conn)
+    old_cols = {row[1] for row in conn.exec_driver_sql(f"PRAGMA table_info({old})")}
+    cols = [c.name for c in table.columns if c.name in old_cols]
+    select_cols = [
+        f"CASE WHEN {c} IS NULL OR TRIM({c}) IN ('', 'None', 'nan', 'NaN') THEN NULL ELSE CAST({c} AS REAL) END"
+        if c in real_columns
+        else c
+        for c in cols
+    ]
+    conn.exec_driver_sql(f"INSERT INTO {table.name} ({', '.join(cols)}) SELECT {', '.join(select_cols)} FROM {old}")
+    conn.exec_driver_sql(f"DROP TABLE {old}")
+
+
+def needs_real_migration(conn: Connection, table: str, columns: tuple) -> bool:
+    types: Dict[str, Optional[str]] = {c: declared_type(conn, table, c) for c in columns}
+    return any(t is not None and t not in ("REAL", "FLOAT") for t in types.values())
+
+
+def table_exists(conn: Connection, name: str) -> bool:
+    return conn.execute(text("SELECT 1 FROM sqlite_master WHERE type='table' AND name=:n"), {"n": name}).first() is not None
+
+
+def add_missing_columns(conn: Connection, table: Table) -> list:
+    """ALTER TABLE ADD COLUMN for model columns a legacy table lacks (nullable, no default)."""
+    have = {row[1] for row in conn.exec_driver_sql(f"PRAGMA table_info({table.name})")}
+    added = []
+    for c in table.columns:
+        if c.name not in have:
+            conn.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {c.name} {c.type.compile(dialect=conn.dialect)}")
+            added.append(c.name)
+    return added
@@ -0,0 +1,150 @@
+"""Date-partitioned Arrow feature store for model training.
+
+One uncompressed Arrow IPC file per feature date (``<root>/<fe_date>.arrow``) with a fixed typed
+schema: int16 counts, float32 ratios/indicators, float64 prices and a dictionary-encoded symbol.
+Reads memory-map the files and project columns before touching data, so a multi-year slice
+costs roughly the bytes of the selected columns.
+
+    python -m src.storage.feature_store build --start 2020-01-01 --end 2024-12-31
+"""
+from __future__ import annotations
+import argparse
+from datetime import date
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence
+import numpy as np
+import pandas as pd
+from src.features.fe_news import EVENTS
+from src.storage.files import atomic_target
+
+STORE_DIR = "data/feature_store"
+COUNT_COLS = ["news_count", "is_pos_sum", "is_neg_sum", "is_neu_sum", *[f"{e}_sum" for e in EVENTS]]
+FLOAT32_COLS = ["sent_mean", "sent_max", "sent_min", "pos_ratio", "neg_ratio", "sma_20", "ema_20", "ema_50", "rsi",
+                "macd", "macd_signal", "macd_hist", "atr", "ret_1d", "ret_5d", "vol_20", "vol_chg"]
+PRICE_COLS = ["open", "high", "low", "close", "adj_close", "volume"]
+DATE_COLS = ["date_news", "date"]  # news day and the as-of price bar used for the row
+
+def feature_schema():
+    import pyarrow as pa
+    return pa.schema([("fe_date", pa.date32()), ("symbol", pa.dictionary(pa.int16(), pa.string())),
+                      *[(c, pa.date32()) for c in DATE_COLS], *[(c, pa.int16()) for c in COUNT_COLS],
+                      *[(c, pa.float32()) for c in FLOAT32_COLS], *[(c, pa.float64()) for c in PRICE_COLS]])
+
+def to_table(df: pd.DataFrame):
+    """Cast a ``features_process`` frame to the store schema (missing columns: 0 counts, NaN floats)."""
+    import pyarrow as pa
+    schema, n = feature_schema(), len(df)
+    df = df.sort_values("symbol", kind="stable") if n else df
+    cols = {}
+    for f in schema:
+        c = f.name
+        if c == "symbol":
+            cols[c] = pa.array(df[c].astype(str).to_numpy(), pa.string()).dictionary_encode().cast(f.type)
+        elif c in DATE_COLS or c == "fe_date":
+            v = pd.to_datetime(df[c], errors="coerce") if c in df else pd.Series(pd.NaT, index=df.index, dtype="datetime64[ns]")
+            cols[c] = pa.array(v.dt.normalize(), from_pandas=True).cast(f.type)
+        elif c in COUNT_COLS:
+            v = pd.to_numeric(df[c], errors="coerce").fillna(0) if c in df else np.zeros(n)
+            cols[c] = pa.array(np.asarray(v, dtype=np.int16))
+        else:
+            v = pd.to_numeric(df[c], errors="coerce") if c in df else np.full(n, np.nan)
+            cols[c] = pa.array(np.asarray(v, dtype=f.type.to_pandas_dtype()))
+    return pa.table(cols, schema=schema)
+
+def _day(d) -> str:
+    return date.fromisoformat(str(d)[:10]).isoformat()
+
+class FeatureStore:
+    def __init__(self, root: str = STORE_DIR):
+        self.root = Path(root)
+
+    def path(self, fe_date: str) -> Path:
+        return self.root / f"{_day(fe_date)}.arrow"
+
+    def days(self, start: Optional[str] = None, end: Optional[str] = None) -> List[str]:
+        """Stored feature dates between ISO dates ``start``..``end`` (inclusive), ascending."""
+        days = sorted(p.stem for p in self.root.glob("*.arrow")) if self.root.exists() else []
+        return [d for d in days if (start is None or d >= _day(start)) and (end is None or d <= _day(end))]
+
+    def write_day(self, df: pd.DataFrame, fe_date: Optional[str] = None) -> int:
+        """Replace one feature date's partition with ``df``; returns the number of rows written."""
+        import pyarrow as pa
+        fe_date = _day(fe_date or df["fe_date"].iloc[0])
+        table = to_table(df.assign(fe_date=fe_date))
+        with atomic_target(self.path(fe_date)) as tmp:
+            with pa.OSFile(str(tmp), "wb") as sink, pa.ipc.new_file(sink, table.schema) as w:
+                w.write_table(table)
+        return table.num_rows
+
+    def iter_tables(self, start: Optional[str] = None, end: Optional[str] = None,
+                    symbols: Optional[Sequence[str]] = None, columns: Optional[Sequence[str]] = None) -> Iterator:
+        """Memory-mapped per-day tables, projected to ``columns`` (plus fe_date/symbol) and filtered to ``symbols``.
+
+        Without ``symbols`` the tables are zero-copy views of the mapped files.
+        """
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        cols = list(dict.fromkeys(["fe_date", "symbol", *(columns or feature_schema().names)]))
+        want = pa.array(sorted({s.upper() for s in symbols})) if symbols else None
+        for d in self.days(start, end):
+            t = pa.ipc.open_file(pa.memory_map(str(self.path(d)), "r")).read_all().select(cols)
+            if want is not None: t = t.filter(pc.is_in(t.column("symbol"), value_set=want))
+            if t.num_rows: yield t
+
+    def load(self, start: Optional[str] = None, end: Optional[str] = None,
+             symbols: Optional[Sequence[str]] = None, columns: Optional[Sequence[str]] = None):
+        """A (date range x symbols x columns) slice as one Arrow table with a unified symbol dictionary."""
+        import pyarrow as pa
+        tables = list(self.iter_tables(start, end, symbols, columns))
+        if not tables:
+            schema = feature_schema()
+            return schema.empty_table().select(list(dict.fromkeys(["fe_date", "symbol", *(columns or schema.names)])))
+        return pa.concat_tables(tables).unify_dictionaries()
+
+    def load_arrays(self, start: Optional[str] = None, end: Optional[str] = None,
+                    symbols: Optional[Sequence[str]] = None, columns: Optional[Sequence[str]] = None) -> Dict[str, np.ndarray]:
+        """The slice as NumPy arrays: ``fe_date`` as datetime64[D], ``symbol`` as int16 codes into
+        ``symbols`` (a str array), feature columns in their stored dtype.
+
+        Each numeric column is read through zero-copy views of the mapped files and copied once into
+        its output array.
+        """
+        out: Dict[str, List[np.ndarray]] = {}
+        names: Dict[str, int] = {}
+        for t in self.iter_tables(start, end, symbols, columns):
+            for name in t.column_names:
+                col = t.column(name).combine_chunks()
+                if name == "symbol":
+                    remap = np.array([names.setdefault(s, len(names)) for s in col.dictionary.to_pylist()], dtype=np.int16)
+                    arr = remap[col.indices.to_numpy()]
+                else:
+                    # numeric columns without nulls come back as views of the mapped file
+                    arr = col.to_numpy(zero_copy_only=False)
+                out.setdefault(name, []).append(arr)
+        res = {k: np.concatenate(v) for k, v in out.items()}
+        res["symbols"] = np.array(list(names), dtype=str)
+        return res
+
+    def build(self, start: str, end: str, features_dir: str = "data/processed/features") -> int:
+        """(Re)build partitions from the daily feature Parquet files; returns the number of days written."""
+        n = 0
+        for p in sorted(Path(features_dir).glob("*.parquet")):
+            if _day(start) <= p.stem <= _day(end):
+                self.write_day(pd.read_parquet(p), p.stem); n += 1
+        return n
+
+def main():
+    from src.utils.logger import get_logger
+    ap = argparse.ArgumentParser(prog="python -m src.storage.feature_store", description="Arrow feature store")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("build", help="Import daily feature Parquet files")
+    b.add_argument("--start", type=str, default="1900-01-01")
+    b.add_argument("--end", type=str, default="2999-12-31")
+    b.add_argument("--features-dir", type=str, default="data/processed/features")
+    b.add_argument("--root", type=str, default=STORE_DIR)
+    args = ap.parse_args()
+    n = FeatureStore(args.root).build(args.start, args.end, args.features_dir)
+    get_logger(__name__).info(f"Feature store {args.root}: wrote {n} days")
+
+if __name__ == "__main__":
+    main()
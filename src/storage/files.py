@@ -0,0 +1,164 @@
+
+from __future__ import annotations
+
+import gzip
+import json
+import os
+from contextlib import contextmanager
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+
+import pandas as pd
+
+# Daily files: raw items as append-only gzip JSONL, processed NLP rows and features as Parquet.
+# Legacy pretty-printed ``<day>.json`` files are still read.
+RAW_SUFFIX = ".jsonl.gz"
+PROCESSED_COLUMNS = ["url", "title", "published_at", "symbols", "events", "sentiment_label",
+                     "sentiment_score", "sentiment_engine", "source", "cluster_id", "simhash"]
+
+
+def raw_path(day: str, raw_dir: str = "data/raw") -> Path:
+    return Path(raw_dir) / f"{day}{RAW_SUFFIX}"
+
+
+def processed_path(day: str, processed_dir: str = "data/processed") -> Path:
+    return Path(processed_dir) / f"{day}.parquet"
+
+
+def batched(items: Iterable, n: int) -> Iterator[List]:
+    it = iter(items)
+    while batch := list(islice(it, n)):
+        yield batch
+
+
+@contextmanager
+def atomic_target(path):
+    """Yield a temp path next to ``path``; it replaces ``path`` only if the block succeeds."""
+    p = Path(path)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    tmp = p.with_name(f".{p.name}.{os.getpid()}.tmp")
+    try:
+        yield tmp
+        os.replace(tmp, p)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+def iter_jsonl(path) -> Iterator[Dict]:
+    opener = gzip.open if str(path).endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def append_jsonl(path, items: Iterable[Dict]) -> int:
+    """Append ``items`` as JSON lines (a new gzip member per call); returns the number written."""
+    p = Path(path)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    opener = gzip.open if p.suffix == ".gz" else open
+    n = 0
+    with opener(p, "at", encoding="utf-8") as f:
+        for it in items:
+            f.write(json.dumps(it, ensure_ascii=False))
+            f.write("\n")
+            n += 1
+    return n
+
+
+def raw_exists(day: str, raw_dir: str = "data/raw") -> bool:
+    return raw_path(day, raw_dir).exists() or (Path(raw_dir) / f"{day}.json").exists()
+
+
+def iter_raw_items(day: str, raw_dir: str = "data/raw") -> Iterator[Dict]:
+    """Stream one day's raw items: a legacy JSON array first (if any), then the JSONL file."""
+    legacy = Path(raw_dir) / f"{day}.json"
+    if legacy.exists():
+        yield from json.loads(legacy.read_text(encoding="utf-8"))
+    p = raw_path(day, raw_dir)
+    if p.exists():
+        yield from iter_jsonl(p)
+
+
+def raw_urls(day: str, raw_dir: str = "data/raw") -> Set[str]:
+    return {(it.get("url") or "").strip() for it in iter_raw_items(day, raw_dir)}
+
+
+def _processed_schema():
+    import pyarrow as pa
+    return pa.schema([
+        ("url", pa.string()), ("title", pa.string()), ("published_at", pa.string()),
+        ("symbols", pa.list_(pa.string())), ("events", pa.list_(pa.string())),
+        ("sentiment_label", pa.string()), ("sentiment_score", pa.float64()),
+        ("sentiment_engine", pa.string()), ("source", pa.string()),
+        ("cluster_id", pa.int64()), ("simhash", pa.int64()),
+    ])
+
+
+class ProcessedWriter:
+    """Stream processed NLP rows into a typed Parquet file, one row group per ``write`` call.
+
+    The file appears at ``path`` only when the writer is closed without error.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.rows = 0
+        self._clusters: set = set()
+
+    def __enter__(self):
+        import pyarrow.parquet as pq
+        self._target = atomic_target(self.path)
+        tmp = self._target.__enter__()
+        self.schema = _processed_schema()
+        self._writer = pq.ParquetWriter(tmp, self.schema, compression="zstd")
+        return self
+
+    def write(self, rows: List[Dict]) -> None:
+        import pyarrow as pa
+        if not rows:
+            return
+        self._writer.write_table(pa.Table.from_pylist([{c: r.get(c) for c in PROCESSED_COLUMNS} for r in rows], schema=self.schema))
+        self.rows += len(rows)
+        self._clusters.update(r.get("cluster_id") for r in rows)
+
+    @property
+    def clusters(self) -> int:
+        return len(self._clusters)
+
+    def __exit__(self, *exc):
+        self._writer.close()
+        return self._target.__exit__(*exc)
+
+
+def _listify(df: pd.DataFrame, columns) -> pd.DataFrame:
+    for c in columns:
+        if c in df.columns:
+            df[c] = [list(v) if v is not None else [] for v in df[c]]
+    return df
+
+
+def read_processed(day: str, processed_dir: str = "data/processed") -> Optional[pd.DataFrame]:
+    """One day's processed NLP rows (Parquet, else legacy JSON); None when the day is missing.
+
+    ``symbols``/``events`` come back as Python lists either way.
+    """
+    p = processed_path(day, processed_dir)
+    if p.exists():
+        return _listify(pd.read_parquet(p), ("symbols", "events"))
+    legacy = Path(processed_dir) / f"{day}.json"
+    if legacy.exists():
+        return pd.DataFrame(json.loads(legacy.read_text(encoding="utf-8")))
+    return None
+
+
+def processed_exists(day: str, processed_dir: str = "data/processed") -> bool:
+    return processed_path(day, processed_dir).exists() or (Path(processed_dir) / f"{day}.json").exists()
+
+
+def write_frame(df: pd.DataFrame, path) -> None:
+    """Atomically write a DataFrame as Parquet."""
+    with atomic_target(path) as tmp:
+        df.to_parquet(tmp, index=False, compression="zstd")
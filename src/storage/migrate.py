@@ -0,0 +1,33 @@
+
+from __future__ import annotations
+
+import argparse
+
+from src.storage.db import NewsDB
+from src.storage.db_features_addon import FeaturesDB
+from src.storage.db_nlp_addon import NewsDB_NLP
+from src.utils.logger import get_logger
+
+
+def migrate(path: str) -> None:
+    """Bring a news DB to the current schema.
+
+    Retypes legacy text columns (news_nlp.sentiment_score, features ratios/sentiment) to REAL,
+    adds the published_at/(symbol, published_at)/(fe_date, symbol) indexes and backfills the
+    news_symbol/news_event link tables from the comma-joined columns. Safe to re-run.
+    """
+    for db_cls in (NewsDB, NewsDB_NLP, FeaturesDB):
+        db_cls(path).create_tables()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate the SQLite news DB to the current schema")
+    parser.add_argument("--db", type=str, default="db/news.db")
+    args = parser.parse_args()
+    logger = get_logger(__name__)
+    migrate(args.db)
+    logger.info(f"Migrated {args.db}")
+
+
+if __name__ == "__main__":
+    main()
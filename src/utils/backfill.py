@@ -0,0 +1,38 @@
+from __future__ import annotations
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, timedelta
+from typing import Callable, Dict, List, Optional
+
+def day_range(start: str, end: str) -> List[str]:
+    """ISO days ``start``..``end`` inclusive."""
+    d0, d1 = date.fromisoformat(start), date.fromisoformat(end)
+    return [(d0 + timedelta(days=i)).isoformat() for i in range((d1 - d0).days + 1)]
+
+def run_days(days: List[str], work: Callable[[str], object], init: Callable = None, initargs: tuple = (),
+             workers: Optional[int] = None, logger=None) -> Dict[str, object]:
+    """Run ``work(day)`` for every day on a process pool; ``init(*initargs)`` runs once per worker.
+
+    A failing day is logged and reported as ``None`` without stopping the others; completed days
+    keep their outputs, so a rerun only has to redo what is missing.
+    """
+    workers = max(1, min(workers or os.cpu_count() or 1, len(days)))
+    results: Dict[str, object] = {}
+    if workers == 1:
+        if init is not None: init(*initargs)
+        for d in days:
+            try: results[d] = work(d)
+            except Exception as e:
+                results[d] = None
+                if logger: logger.error(f"{d}: {type(e).__name__}: {e}")
+        return results
+    with ProcessPoolExecutor(max_workers=workers, initializer=init, initargs=initargs) as ex:
+        futs = {ex.submit(work, d): d for d in days}
+        for i, f in enumerate(as_completed(futs), 1):
+            d = futs[f]
+            try: results[d] = f.result()
+            except Exception as e:
+                results[d] = None
+                if logger: logger.error(f"{d}: {type(e).__name__}: {e}")
+            if logger: logger.info(f"Backfill {i}/{len(days)} done ({d}: {results[d]})")
+    return results
@@ -0,0 +1,176 @@
+from __future__ import annotations
+import argparse, cProfile, json, os, pstats, sys, time, tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Union
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+def peak_rss_bytes() -> Optional[int]:
+    """Peak resident set size of this process so far."""
+    if resource is None: return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return int(peak if sys.platform == "darwin" else peak * 1024)
+
+def _atomic_write(path: Path, text: str) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+    return path
+
+class StageMetrics:
+    """Counters of one pipeline stage; usable on its own when no report is being written."""
+    def __init__(self, name: str):
+        self.name = name
+        self.status = "ok"
+        self.items = 0
+        self.db_rows = 0
+        self.wall = self.cpu = 0.0
+        self.peak_rss: Optional[int] = None
+        self.timers: Dict[str, float] = {}
+        self.counters: Dict[str, float] = {}
+        self.caches: Dict[str, Dict[str, int]] = {}
+        self.failures: List[Dict[str, str]] = []
+        self.profiles: Dict[str, str] = {}
+
+    def add(self, items: int = 0, db_rows: int = 0) -> None:
+        self.items += int(items); self.db_rows += int(db_rows)
+
+    def count(self, name: str, n: float = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def cache(self, name: str, hits: int, misses: int) -> None:
+        self.caches[name] = {"hits": int(hits), "misses": int(misses)}
+
+    def failure(self, kind: str, key: str, error) -> None:
+        self.failures.append({"kind": kind, "key": str(key), "error": str(error)})
+
+    @contextmanager
+    def timed(self, name: str):
+        """Accumulate the wall time of a block under ``timers[name]`` (``"db"`` feeds db_rows_per_sec)."""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timers[name] = self.timers.get(name, 0.0) + time.perf_counter() - t0
+
+    def to_dict(self) -> Dict:
+        db_s = self.timers.get("db")
+        fail_kinds: Dict[str, int] = {}
+        for f in self.failures: fail_kinds[f["kind"]] = fail_kinds.get(f["kind"], 0) + 1
+        return {
+            "status": self.status, "wall_seconds": round(self.wall, 4), "cpu_seconds": round(self.cpu, 4),
+            "items": self.items, "items_per_sec": round(self.items / self.wall, 1) if self.wall else None,
+            "db_rows": self.db_rows, "db_rows_per_sec": round(self.db_rows / db_s, 1) if db_s else None,
+            "peak_rss_bytes": self.peak_rss, "timers": {k: round(v, 4) for k, v in self.timers.items()},
+            "counters": self.counters,
+            "caches": {k: {**v, "hit_rate": round(v["hits"] / max(1, v["hits"] + v["misses"]), 4)} for k, v in self.caches.items()},
+            "failure_counts": fail_kinds, "failures": self.failures, "profiles": self.profiles,
+        }
+
+class RunReport:
+    """Per-stage wall/CPU time, throughput, peak RSS, cache hit rates and failures of one run.
+
+    ``write`` saves ``<out_dir>/<run>_<day>.json`` and, with ``prometheus``, a node-exporter textfile.
+    Stages named in ``profile`` (or all, with ``True``) are run under cProfile and tracemalloc; the
+    ``.prof`` dump, its top functions and the top allocation sites go to ``<out_dir>/profiles/``.
+    """
+    def __init__(self, run: str, day: Optional[str] = None, out_dir: str = "data/reports",
+                 profile: Union[bool, Iterable[str]] = False, prometheus: Optional[str] = None):
+        self.run, self.day = run, day
+        self.out_dir = Path(out_dir)
+        self.profile = profile if isinstance(profile, bool) else set(profile)
+        self.prometheus = prometheus
+        self.started_at = datetime.now(timezone.utc)
+        self.stages: Dict[str, StageMetrics] = {}
+
+    @classmethod
+    def from_args(cls, run: str, day: Optional[str], args) -> "RunReport":
+        return cls(run, day, args.report_dir, args.profile, args.prometheus)
+
+    def _profiled(self, name: str) -> bool:
+        return self.profile is True or (isinstance(self.profile, set) and name in self.profile)
+
+    @contextmanager
+    def stage(self, name: str):
+        st = self.stages[name] = StageMetrics(name)
+        prof = cProfile.Profile() if self._profiled(name) else None
+        if prof is not None:
+            tracemalloc.start(25); prof.enable()
+        w0, c0 = time.perf_counter(), time.process_time()
+        try:
+            yield st
+        except BaseException as e:
+            st.status = "error"; st.failure("stage", name, f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            st.wall, st.cpu = time.perf_counter() - w0, time.process_time() - c0
+            st.peak_rss = peak_rss_bytes()
+            if prof is not None:
+                prof.disable()
+                self._save_profile(st, prof, tracemalloc.take_snapshot())
+                tracemalloc.stop()
+
+    def skipped(self, name: str, status: str = "cached") -> None:
+        self.stages[name] = StageMetrics(name); self.stages[name].status = status
+
+    def _save_profile(self, st: StageMetrics, prof: cProfile.Profile, snap) -> None:
+        base = self.out_dir / "profiles" / f"{self.run}_{self.day or 'run'}_{st.name}"
+        base.parent.mkdir(parents=True, exist_ok=True)
+        prof.dump_stats(f"{base}.prof")
+        with open(f"{base}.txt", "w", encoding="utf-8") as f:
+            pstats.Stats(prof, stream=f).sort_stats("cumulative").print_stats(40)
+        snap = snap.filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+        lines = [str(s) for s in snap.statistics("lineno")[:30]]
+        Path(f"{base}.alloc.txt").write_text("\n".join(lines) + "\n", encoding="utf-8")
+        st.profiles = {"cprofile": f"{base}.prof", "top_functions": f"{base}.txt", "top_allocations": f"{base}.alloc.txt"}
+
+    def to_dict(self) -> Dict:
+        return {"run": self.run, "day": self.day, "started_at": self.started_at.isoformat(),
+                "wall_seconds": round(sum(s.wall for s in self.stages.values()), 4), "peak_rss_bytes": peak_rss_bytes(),
+                "stages": {k: s.to_dict() for k, s in self.stages.items()}}
+
+    def prometheus_text(self) -> str:
+        out: List[str] = []
+        def metric(name: str, help_: str, samples: List[tuple]) -> None:
+            if not samples: return
+            out.extend([f"# HELP nsebot_{name} {help_}", f"# TYPE nsebot_{name} gauge"])
+            for labels, v in samples:
+                lab = ",".join(f'{k}="{str(x).replace(chr(34), chr(39))}"' for k, x in {"run": self.run, **labels}.items())
+                out.append(f"nsebot_{name}{{{lab}}} {float(v)}")
+        stages = self.stages.values()
+        metric("stage_success", "1 if the stage succeeded or was cached", [({"stage": s.name}, s.status in ("ok", "cached")) for s in stages])
+        metric("stage_wall_seconds", "Stage wall time", [({"stage": s.name}, s.wall) for s in stages])
+        metric("stage_cpu_seconds", "Stage CPU time", [({"stage": s.name}, s.cpu) for s in stages])
+        metric("stage_items", "Items processed", [({"stage": s.name}, s.items) for s in stages])
+        metric("stage_items_per_second", "Items per wall second", [({"stage": s.name}, s.items / s.wall) for s in stages if s.wall])
+        metric("stage_db_rows", "Rows written to SQLite", [({"stage": s.name}, s.db_rows) for s in stages])
+        metric("stage_db_rows_per_second", "Rows per second of DB write time",
+               [({"stage": s.name}, s.db_rows / s.timers["db"]) for s in stages if s.timers.get("db")])
+        metric("stage_peak_rss_bytes", "Process peak RSS at stage end", [({"stage": s.name}, s.peak_rss) for s in stages if s.peak_rss])
+        metric("stage_failures", "Failures by kind (feed, symbol, day, stage)",
+               [({"stage": s.name, "kind": k}, n) for s in stages for k, n in s.to_dict()["failure_counts"].items()])
+        metric("stage_cache_hit_ratio", "Cache hit ratio",
+               [({"stage": s.name, "cache": c}, v["hits"] / max(1, v["hits"] + v["misses"])) for s in stages for c, v in s.caches.items()])
+        metric("run_last_timestamp_seconds", "Start time of the last run", [({}, self.started_at.timestamp())])
+        return "\n".join(out) + "\n"
+
+    def write(self) -> Path:
+        path = _atomic_write(self.out_dir / f"{self.run}_{self.day or 'run'}.json", json.dumps(self.to_dict(), indent=2, default=str))
+        if self.prometheus: _atomic_write(Path(self.prometheus), self.prometheus_text())
+        return path
+
+def add_cli_args(ap: argparse.ArgumentParser, stages: Optional[List[str]] = None) -> None:
+    """``--report-dir``, ``--prometheus`` and ``--profile`` (a flag, or a stage list when ``stages`` is given)."""
+    ap.add_argument("--report-dir", type=str, default="data/reports", help="Where the JSON run report is written")
+    ap.add_argument("--prometheus", type=str, default=None, help="Also write a Prometheus textfile here (*.prom)")
+    if stages:
+        ap.add_argument("--profile", type=lambda s: s.split(","), default=False,
+                        help=f"Comma-separated stages to run under cProfile + tracemalloc ({','.join(stages)})")
+    else:
+        ap.add_argument("--profile", action="store_true", help="Run under cProfile + tracemalloc; dumps go to <report-dir>/profiles")
@@ -0,0 +1,35 @@
+import json, sys
+import numpy as np
+import pandas as pd
+from src import features_process
+from src.storage.db_prices_addon import PricesDB
+from src.utils.backfill import day_range, run_days
+
+def _work(day):
+    if day.endswith("02"): raise ValueError("bad day")
+    return day[-2:]
+
+def test_run_days_on_pool_reports_failures():
+    days = day_range("2024-01-01", "2024-01-04")
+    assert days[0] == "2024-01-01" and len(days) == 4
+    assert run_days(days, _work, workers=2) == {"2024-01-01": "01", "2024-01-02": None, "2024-01-03": "03", "2024-01-04": "04"}
+
+def test_features_backfill_writes_and_resumes(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "db").mkdir(); (tmp_path / "data/processed").mkdir(parents=True)
+    (tmp_path / "config.yaml").write_text("features:\n  lookback_days: 10\n", encoding="utf-8")
+    for day in ("2024-01-02", "2024-01-03"):
+        rows = [{"url": f"u{day}", "published_at": f"{day}T10:00:00+05:30", "symbols": ["INFY"], "events": [],
+                 "sentiment_label": "positive", "sentiment_score": 0.5}]
+        (tmp_path / f"data/processed/{day}.json").write_text(json.dumps(rows), encoding="utf-8")
+    idx = pd.bdate_range("2023-12-15", "2024-01-05")
+    bars = pd.DataFrame({"date": idx, **{c: np.arange(1.0, len(idx) + 1) for c in ("open", "high", "low", "close", "adj_close", "volume")}})
+    store = PricesDB("db/news.db"); store.create_tables(); store.upsert("INFY", bars)
+    argv = ["features_process", "--start", "2024-01-02", "--end", "2024-01-03", "--workers", "1", "--config", "config.yaml"]
+    monkeypatch.setattr(sys, "argv", argv)
+    features_process.main()
+    out = pd.read_parquet(tmp_path / "data/processed/features/2024-01-03.parquet")
+    assert out["date"].tolist() == [pd.Timestamp("2024-01-02")] and out["fe_date"].tolist() == ["2024-01-03"]
+    mtime = (tmp_path / "data/processed/features/2024-01-02.parquet").stat().st_mtime_ns
+    features_process.main()
+    assert (tmp_path / "data/processed/features/2024-01-02.parquet").stat().st_mtime_ns == mtime
@@ -0,0 +1,23 @@
+import json
+from benchmarks import run, synth
+
+def test_synthetic_corpora_are_deterministic():
+    u = synth.symbol_universe(50)
+    assert u == synth.symbol_universe(50) and len({r["symbol"] for r in u}) == 50
+    assert synth.news_items(20, u) == synth.news_items(20, u) != synth.news_items(20, u, seed=1)
+    panel = synth.ohlcv_panel(3, 30, universe=u)
+    assert list(panel) == [r["symbol"] for r in u[:3]] and all((df["high"] >= df["low"]).all() for df in panel.values())
+
+def test_check_fails_on_regression(tmp_path, capsys):
+    base = tmp_path / "baseline.json"
+    argv = ["--scale", "1k", "--cases", "clean_text,build_news_features", "--repeat", "1", "--baseline", str(base)]
+    assert run.main(argv + ["--update-baseline"]) == 0
+    recorded = json.loads(base.read_text())["1k"]
+    assert set(recorded) == {"clean_text", "build_news_features"}
+    base.write_text(json.dumps({"1k": {k: v * 100 for k, v in recorded.items()}}))
+    assert run.main(argv + ["--check", "--threshold", "0.5"]) == 1
+    assert "REGRESSION clean_text" in capsys.readouterr().out
+
+def test_fuzzy_mapping_reports_higher_recall():
+    exact, fuzzy = (run.run_case(c, 300, repeat=1)["quality"] for c in ("map_symbols_exact", "map_symbols_fuzzy"))
+    assert fuzzy["recall"] > exact["recall"] + 0.3 and fuzzy["precision"] > 0.9
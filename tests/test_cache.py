@@ -0,0 +1,19 @@
+
+from src.nlp.cache import ResultCache, cached_apply
+from src.nlp.sentiment import SentimentEngine
+def test_cache_hits_namespaces_and_lru_eviction(tmp_path):
+    c = ResultCache(str(tmp_path / "c.db"), max_entries=2)
+    calls = []
+    fn = lambda ts: calls.extend(ts) or [t.upper() for t in ts]
+    assert cached_apply(c, "v1", ["a", "b", "a"], fn) == ["A", "B", "A"]
+    assert cached_apply(c, "v1", ["b"], fn) == ["B"] and calls == ["a", "b"]
+    cached_apply(c, "v2", ["a"], fn)
+    assert calls == ["a", "b", "a"]
+    assert c.stats()["entries"] == 2 and c.get("v1", "a") is None
+    assert c.stats()["hits"] == 1
+def test_sentiment_engine_uses_cache(tmp_path):
+    c = ResultCache(str(tmp_path / "c.db"))
+    se = SentimentEngine(engine="rule", cache=c)
+    first = se.score_batch(["profit growth", "probe"])
+    assert se.score_batch(["probe", "profit growth"]) == first[::-1]
+    assert c.stats()["hits"] == 2
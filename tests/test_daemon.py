@@ -0,0 +1,51 @@
+import queue, threading, time
+from zoneinfo import ZoneInfo
+from src import daemon
+from src.nlp_process import init_worker
+from src.storage.db import NewsDB
+from src.storage.db_nlp_addon import NewsDB_NLP
+
+def test_seen_urls_is_bounded_lru():
+    seen = daemon.SeenURLs(2)
+    assert seen.add("a") and seen.add("b") and not seen.add("a")
+    assert seen.add("c") and len(seen) == 2
+    assert not seen.add("a") and seen.add("b") and seen.add("c")
+
+def test_micro_batches_flush_on_size_and_time():
+    q, stop = queue.Queue(maxsize=10), threading.Event()
+    for i in range(5): q.put(i)
+    gen = daemon.micro_batches(q, 3, 0.05, stop)
+    assert next(gen) == [0, 1, 2] and next(gen) == [3, 4]
+    stop.set()
+    assert list(gen) == []
+
+def test_store_batch_scores_and_writes(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path); (tmp_path / "db").mkdir()
+    (tmp_path / "syms.csv").write_text("symbol,company_name,aliases\nINFY,Infosys Limited,Infosys\n", encoding="utf-8")
+    news_db = NewsDB("db/news.db"); news_db.create_tables(); NewsDB_NLP("db/news.db").create_tables()
+    init_worker({"nlp": {"cache": {"enabled": False}}, "reference": {"nse_symbols_csv": "syms.csv"}})
+    items = [{"title": "Infosys board declares dividend", "summary": "profit rises", "url": "https://x/1",
+              "published_at": "2024-01-02T10:00:00+05:30", "source": "rss"}]
+    latency = daemon.LatencyStats()
+    assert daemon.store_batch([(time.time(), it) for it in items], news_db, latency, ZoneInfo("Asia/Kolkata")) == 1
+    rows = daemon._CTX["db"].news_for_symbol("INFY")
+    assert rows[0]["url"] == "https://x/1" and rows[0]["sentiment_label"] == "positive"
+    s = latency.summary()
+    assert latency.items == 1 and s["pipeline"]["max"] < 60 and s["publish"]["p50"] > 0
+
+def test_feed_validators_commit_after_store(tmp_path):
+    path = str(tmp_path / "daemon_state.json")
+    v = daemon.FeedValidators(path)
+    state, gen = v.current()
+    v.opened(gen, {"f": {"etag": "1"}}, ["a", "b"])
+    v.opened(gen, {"f": {"etag": "2"}}, [])
+    v.stored(["a"])
+    assert v.current()[0] == {} and daemon.load_feed_state(path) == {}
+    v.stored(["b"])  # first poll stored -> the empty second one commits right after it
+    assert v.current()[0] == {"f": {"etag": "2"}} and daemon.load_feed_state(path) == {"f": {"etag": "2"}}
+    state, gen = v.current()
+    v.opened(gen, {"f": {"etag": "3"}}, ["c"])
+    v.failed()
+    v.opened(gen, {"f": {"etag": "4"}}, [])  # fetched before the failure: dropped
+    v.stored(["c"])
+    assert daemon.FeedValidators(path).current()[0] == {"f": {"etag": "2"}}
@@ -0,0 +1,54 @@
+from src.features.fe_news import build_news_features
+from src.nlp import dedup
+from src.nlp_process import _CTX, annotate_items, init_worker
+from src.storage.db_nlp_addon import NewsDB_NLP
+
+STORY = ("Infosys Q2 results: net profit rises 12% to Rs 6,200 crore, beats street estimates. The IT major also "
+         "announced an interim dividend of Rs 18 per share and raised its revenue guidance for the full year.")
+
+def test_normalize_url_drops_tracking_and_fragment():
+    assert dedup.normalize_url("HTTPS://www.Example.com/a/b/?utm_source=x&id=3&fbclid=9#top") == "https://example.com/a/b?id=3"
+    assert dedup.url_key("https://example.com/a?utm_medium=rss") == dedup.url_key("https://www.example.com/a/")
+
+def test_index_clusters_near_duplicates_only():
+    idx = dedup.DedupIndex(max_distance=3)
+    a, b = dedup.simhash(STORY), dedup.simhash(STORY.replace("street ", "Street "))
+    c = dedup.simhash("TCS board approves share buyback worth Rs 17,000 crore at a premium to market price.")
+    assert idx.assign(1, a) == 1 and idx.assign(2, b) == 1 and idx.assign(3, c) == 3
+    assert idx.assign(4, None) == 4 and len(idx) == 3
+    assert dedup.to_unsigned(dedup.to_signed(a)) == a
+
+def test_nlp_runs_once_per_cluster_and_features_count_once(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path); (tmp_path / "db").mkdir()
+    (tmp_path / "syms.csv").write_text("symbol,company_name,aliases\nINFY,Infosys Limited,Infosys\n", encoding="utf-8")
+    NewsDB_NLP("db/news.db").create_tables()
+    init_worker({"nlp": {"cache": {"enabled": False}}, "reference": {"nse_symbols_csv": "syms.csv"}})
+    scored = []
+    score_batch = _CTX["engine"].score_batch
+    monkeypatch.setattr(_CTX["engine"], "score_batch", lambda ts: scored.extend(ts) or score_batch(ts))
+    item = {"title": "Infosys Q2", "summary": STORY, "published_at": "2024-01-02T10:00:00+05:30"}
+    rows = annotate_items([{**item, "url": "https://et.com/a"}, {**item, "url": "https://et.com/a?utm_source=rss", "source": "x"},
+                           {**item, "url": "https://other.com/b", "title": "Infosys Q2:"}])
+    assert len(scored) == 1 and len({r["cluster_id"] for r in rows}) == 1 and rows[2]["symbols"] == ["INFY"]
+    _CTX["db"].insert_many(rows)
+    later = annotate_items([{**item, "url": "https://third.com/c", "company_symbols": ["INFY"]}])
+    assert len(scored) == 1 and later[0]["cluster_id"] == rows[0]["cluster_id"] and later[0]["symbols"] == ["INFY"]
+    assert build_news_features(rows + later).set_index("symbol")["news_count"].to_dict() == {"INFY": 1}
+
+def test_templated_headlines_keep_their_own_symbols(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path); (tmp_path / "db").mkdir()
+    (tmp_path / "syms.csv").write_text("symbol,company_name,aliases\nINFY,Infosys Limited,Infosys\nWIPRO,Wipro Limited,Wipro\n", encoding="utf-8")
+    NewsDB_NLP("db/news.db").create_tables()
+    init_worker({"nlp": {"cache": {"enabled": False}}, "reference": {"nse_symbols_csv": "syms.csv"}})
+    summary = ("Net profit rises 12% to Rs 6,200 crore, beating street estimates. The IT major also announced an interim "
+               "dividend of Rs 18 per share and raised its revenue guidance for the full year on strong deal wins.")
+    a, b = "Infosys Q2 profit up 12%", "Wipro Q2 profit up 12%"
+    assert (dedup.simhash(f"{a}. {summary}") ^ dedup.simhash(f"{b}. {summary}")).bit_count() <= 3
+    rows = annotate_items([{"title": a, "summary": summary, "url": "https://et.com/a", "published_at": "2024-01-02T10:00:00+05:30"},
+                           {"title": b, "summary": summary, "url": "https://et.com/b", "published_at": "2024-01-02T10:05:00+05:30"}])
+    assert [r["symbols"] for r in rows] == [["INFY"], ["WIPRO"]] and rows[0]["cluster_id"] != rows[1]["cluster_id"]
+    _CTX["db"].insert_many(rows)
+    init_worker({"nlp": {"cache": {"enabled": False}}, "reference": {"nse_symbols_csv": "syms.csv"}})
+    again = annotate_items([{"title": b, "summary": summary, "url": "https://moneycontrol.com/b", "published_at": "2024-01-02T11:00:00+05:30"}])
+    assert again[0]["symbols"] == ["WIPRO"] and again[0]["cluster_id"] == rows[1]["cluster_id"]
+    assert build_news_features(rows).set_index("symbol")["news_count"].to_dict() == {"INFY": 1, "WIPRO": 1}
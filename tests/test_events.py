@@ -1,6 +1,24 @@
+import re
 
 from src.nlp.events import detect_events
 def test_detect_events_basic():
     t = "Company secures order worth 500 crore and announces interim dividend."
     tags = detect_events(t)
     assert "ORDER_WIN" in tags and "DIVIDEND" in tags
+def test_detect_events_matches_per_pattern_scan():
+    from src.nlp.events import EVENT_PATTERNS, detect_events_batch
+    texts = [
+        "Board Meeting to consider Financial Results for Q2 FY25", "Stock split: sub-division of FACE VALUE",
+        "SEBI show cause notice; CRISIL rating downgrade", "Promoter sells stake; pledging of shares revoked",
+        "Buy-back and buyback of shares", "QIP and NCD issue; rights issue opens", "Compensation committee met",
+        "Company bags order; capital expenditure plan", "", "split\nface value", "Takeover bid, writ petition filed",
+    ]
+    legacy = [[t for t, ps in EVENT_PATTERNS.items() if any(p.search(x) for p in ps)] for x in texts]
+    assert [detect_events(x) for x in texts] == legacy
+    assert detect_events_batch(texts) == legacy
+
+def test_events_version_covers_keywords_and_patterns():
+    from src.nlp.events import EVENT_KEYWORDS, EVENTS_VERSION, _CONFIRM, _version
+    assert _version(EVENT_KEYWORDS, _CONFIRM) == EVENTS_VERSION
+    assert _version({**EVENT_KEYWORDS, "GUIDANCE": ["guidance"]}, _CONFIRM) != EVENTS_VERSION
+    assert _version(EVENT_KEYWORDS, {**_CONFIRM, "BONUS": re.compile("bonus")}) != EVENTS_VERSION
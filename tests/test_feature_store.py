@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+from src.storage.feature_store import FeatureStore
+
+def _day(fe_date, symbols, close):
+    return pd.DataFrame({"fe_date": fe_date, "symbol": symbols, "date": "2024-01-01", "news_count": 2, "EARNINGS_sum": 1,
+                         "sent_mean": 0.25, "close": close, "ret_1d": [0.01] * len(symbols), "rsi": [None] * len(symbols)})
+
+def test_typed_partitions_and_sliced_loads(tmp_path):
+    fs = FeatureStore(str(tmp_path))
+    assert fs.write_day(_day("2024-01-02", ["TCS", "INFY"], [10.0, 20.0])) == 2
+    fs.write_day(_day("2024-01-03", ["WIPRO", "INFY", "TCS"], [1.0, 21.0, 11.0]))
+    fs.write_day(_day("2024-01-03", ["WIPRO", "INFY"], [2.0, 22.0]))  # a rerun replaces the day
+    assert fs.days() == ["2024-01-02", "2024-01-03"] and fs.days(start="2024-01-03") == ["2024-01-03"]
+    t = fs.load(symbols=["infy"], columns=["close", "news_count", "EARNINGS_sum", "sent_mean"])
+    assert t.column_names == ["fe_date", "symbol", "close", "news_count", "EARNINGS_sum", "sent_mean"]
+    assert str(t.schema.field("news_count").type) == "int16" and str(t.schema.field("sent_mean").type) == "float"
+    assert t.column("close").to_pylist() == [20.0, 22.0]
+    arr = fs.load_arrays(columns=["close", "rsi", "date"])
+    assert arr["close"].dtype == np.float64 and arr["rsi"].dtype == np.float32 and np.isnan(arr["rsi"]).all()
+    assert arr["fe_date"].dtype == "datetime64[D]" and str(arr["date"][0]) == "2024-01-01"
+    # symbol codes index one dictionary across days with different per-file dictionaries
+    got = sorted(zip(arr["fe_date"].astype(str), arr["symbols"][arr["symbol"]], arr["close"]))
+    assert got == [("2024-01-02", "INFY", 20.0), ("2024-01-02", "TCS", 10.0), ("2024-01-03", "INFY", 22.0), ("2024-01-03", "WIPRO", 2.0)]
+    assert fs.load(start="2025-01-01", columns=["close"]).num_rows == 0
@@ -0,0 +1,26 @@
+
+import pandas as pd
+from src.features.fe_news import build_news_features
+from src.storage.db_nlp_addon import NewsDB_NLP
+
+ROWS = [
+    {"url": "u1", "published_at": "2024-01-02T10:00:00+05:30", "symbols": ["INFY", "TCS"], "events": ["EARNINGS", "EARNINGS", "X"],
+     "sentiment_label": "positive", "sentiment_score": 0.5},
+    {"url": "u2", "published_at": "2024-01-02T11:00:00+05:30", "symbols": ["INFY"], "events": [], "sentiment_label": "negative", "sentiment_score": -1.0},
+    {"url": "u3", "published_at": "2024-01-03T09:00:00+05:30", "symbols": [], "events": ["DIVIDEND"], "sentiment_label": "neutral", "sentiment_score": 0.0},
+    {"url": "u4", "published_at": None, "symbols": ["INFY"], "events": [], "sentiment_label": "neutral", "sentiment_score": 0.0},
+]
+
+def test_build_news_features_aggregates_per_date_symbol():
+    g = build_news_features(ROWS)
+    assert g[["symbol", "news_count"]].astype({"symbol": str}).values.tolist() == [["INFY", 2], ["TCS", 1]]
+    infy = g.iloc[0]
+    assert infy["EARNINGS_sum"] == 1 and infy["DIVIDEND_sum"] == 0
+    assert infy["sent_mean"] == -0.25 and infy["pos_ratio"] == 0.5 and infy["is_neg_sum"] == 1
+    assert build_news_features([]).columns.tolist() == ["date", "symbol"]
+
+def test_build_news_features_from_db_range(tmp_path):
+    db = NewsDB_NLP(str(tmp_path / "news.db")); db.create_tables(); db.insert_many(ROWS)
+    df = db.frame_between("2024-01-01", "2024-01-31")
+    assert sorted(df["url"]) == ["u1", "u2"]
+    pd.testing.assert_frame_equal(build_news_features(df), build_news_features(ROWS))
@@ -0,0 +1,21 @@
+import json
+import pytest
+from src.utils.metrics import RunReport
+
+def test_report_json_prometheus_and_profile(tmp_path):
+    rep = RunReport("nlp", "2024-01-02", out_dir=str(tmp_path), profile=["nlp"], prometheus=str(tmp_path / "nsebot.prom"))
+    with rep.stage("nlp") as st:
+        with st.timed("db"): sum(range(10000))
+        st.add(items=10, db_rows=8); st.cache("nlp", hits=3, misses=1); st.failure("feed", "rss", "timeout")
+    with pytest.raises(ValueError), rep.stage("features"):
+        raise ValueError("boom")
+    rep.skipped("fetch")
+    data = json.loads(rep.write().read_text())
+    nlp = data["stages"]["nlp"]
+    assert nlp["items"] == 10 and nlp["caches"]["nlp"]["hit_rate"] == 0.75 and nlp["failure_counts"] == {"feed": 1}
+    assert data["stages"]["features"]["status"] == "error" and data["stages"]["fetch"]["status"] == "cached"
+    assert all((tmp_path / "profiles" / f"nlp_2024-01-02_nlp{ext}").exists() for ext in (".prof", ".txt", ".alloc.txt"))
+    assert not (tmp_path / "profiles" / "nlp_2024-01-02_features.prof").exists()
+    prom = (tmp_path / "nsebot.prom").read_text()
+    assert 'nsebot_stage_success{run="nlp",stage="features"} 0.0' in prom
+    assert 'nsebot_stage_cache_hit_ratio{run="nlp",stage="nlp",cache="nlp"} 0.75' in prom
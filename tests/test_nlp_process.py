@@ -0,0 +1,52 @@
+from src import nlp_process
+from src.nlp_process import _CTX, init_worker, process_day
+from src.storage.db_nlp_addon import NewsDB_NLP
+from src.storage.files import append_jsonl, raw_path, read_processed
+
+def _items(summary2="Profit rises on strong orders"):
+    return [{"title": "Infosys declares dividend", "summary": "Board approves payout", "url": "https://x/1", "published_at": "2024-01-02T10:00:00+05:30"},
+            {"title": "TCS wins deal", "summary": summary2, "url": "https://x/2", "published_at": "2024-01-02T11:00:00+05:30"}]
+
+def test_rerun_only_processes_new_changed_or_reversioned_items(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path); (tmp_path / "db").mkdir()
+    (tmp_path / "syms.csv").write_text("symbol,company_name,aliases\nINFY,Infosys Limited,Infosys\nTCS,Tata Consultancy,TCS\n", encoding="utf-8")
+    NewsDB_NLP("db/news.db").create_tables()
+    init_worker({"nlp": {"cache": {"enabled": False}, "dedup": {"enabled": False}}, "reference": {"nse_symbols_csv": "syms.csv"}})
+    seen = []
+    annotate = nlp_process.annotate_items
+    monkeypatch.setattr(nlp_process, "annotate_items", lambda items: seen.append(len(items)) or annotate(items))
+    append_jsonl(raw_path("2024-01-02"), _items())
+    assert process_day("2024-01-02") == 2 and seen == [2]
+    assert process_day("2024-01-02") == 2 and seen == [2, 0]
+    raw_path("2024-01-02").unlink(); append_jsonl(raw_path("2024-01-02"), _items("Profit falls on weak orders"))
+    assert process_day("2024-01-02") == 2 and seen == [2, 0, 1]
+    df = read_processed("2024-01-02")
+    assert df["url"].tolist() == ["https://x/1", "https://x/2"] and df["symbols"].tolist() == [["INFY"], ["TCS"]]
+    assert df["sentiment_label"].tolist()[1] == "negative"
+    monkeypatch.setitem(_CTX["versions"], "sent_version", "sentiment|rule|next")
+    process_day("2024-01-02")
+    assert seen[-1] == 2
+    process_day("2024-01-02", force=True)
+    assert seen[-1] == 2
+
+def test_rule_fallback_rows_are_rescored(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path); (tmp_path / "db").mkdir()
+    (tmp_path / "syms.csv").write_text("symbol,company_name,aliases\nINFY,Infosys Limited,Infosys\nTCS,Tata Consultancy,TCS\n", encoding="utf-8")
+    NewsDB_NLP("db/news.db").create_tables()
+    init_worker({"nlp": {"cache": {"enabled": False}}, "reference": {"nse_symbols_csv": "syms.csv"}})
+    engine = _CTX["engine"]
+    def broken(texts, batch_size=None): raise RuntimeError("model down")
+    monkeypatch.setattr(engine, "engine", "hf_finbert"); monkeypatch.setattr(engine, "_pipe", broken)
+    monkeypatch.setitem(_CTX["versions"], "sent_version", engine.cache_namespace)
+    seen = []
+    annotate = nlp_process.annotate_items
+    monkeypatch.setattr(nlp_process, "annotate_items", lambda items: seen.append(len(items)) or annotate(items))
+    append_jsonl(raw_path("2024-01-02"), _items())
+    process_day("2024-01-02")
+    stored = _CTX["db"].rows_for_urls(["https://x/1", "https://x/2"])
+    assert [r["sent_version"] for r in stored.values()] == [None, None] and read_processed("2024-01-02")["sentiment_engine"].tolist() == ["rule"] * 2
+    monkeypatch.setattr(engine, "_pipe", lambda texts, batch_size=None: [{"label": "positive", "score": 0.9} for _ in texts])
+    process_day("2024-01-02")
+    assert seen == [2, 2] and read_processed("2024-01-02")["sentiment_engine"].tolist() == ["hf_finbert"] * 2
+    process_day("2024-01-02")
+    assert seen == [2, 2, 0]
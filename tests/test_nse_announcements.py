@@ -0,0 +1,63 @@
+import json, threading, time
+from datetime import date, datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from src.sources.nse_announcements import NSEClient, TokenBucket, try_fetch_nse_announcements
+
+class _Handler(BaseHTTPRequestHandler):
+    hits = {"warmup": 0, "api": 0, "throttled": 0}
+    lock = threading.Lock()
+
+    def do_GET(self):
+        u = urlsplit(self.path)
+        if u.path == "/":
+            with self.lock: self.hits["warmup"] += 1
+            self.send_response(200); self.send_header("Set-Cookie", "nsit=ok; Path=/"); self.end_headers(); return
+        with self.lock:
+            self.hits["api"] += 1
+            throttle = self.hits["throttled"] == 0 and "nsit=ok" in (self.headers.get("Cookie") or "")
+            if throttle: self.hits["throttled"] += 1
+        if "nsit=ok" not in (self.headers.get("Cookie") or ""):
+            self.send_response(401); self.end_headers(); return
+        if throttle:
+            self.send_response(429); self.send_header("Retry-After", "0"); self.end_headers(); return
+        q = parse_qs(u.query)
+        body = {"data": [{"symbol": "INFY", "sm_ann_desc": f"{q['from_date'][0]}..{q['to_date'][0]}", "pdfUrl": f"https://x/{q['from_date'][0]}.pdf"}]}
+        self.send_response(200); self.end_headers(); self.wfile.write(json.dumps(body).encode())
+    def log_message(self, *args): pass
+
+def test_client_pages_retries_and_reuses_cookies():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    try:
+        client = NSEClient(base_url=f"http://127.0.0.1:{srv.server_address[1]}", rate=200, burst=5, backoff=0.01, max_retries=3)
+        items = client.announcements(date(2024, 1, 1), date(2024, 1, 20), window_days=7, max_workers=3,
+                                     endpoint_template="/api/ann?from_date={from_date}&to_date={to_date}")
+        assert [it["title"] for it in items] == ["2024-01-01..2024-01-07", "2024-01-08..2024-01-14", "2024-01-15..2024-01-20"]
+        assert items[0]["company_symbols"] == ["INFY"] and items[0]["source"] == "nse_corporate"
+        assert _Handler.hits == {"warmup": 1, "api": 4, "throttled": 1}
+        client.session.cookies.clear()  # expired cookie -> 401 -> one warm-up, then retried
+        assert len(client.get_json("/api/ann?from_date=a&to_date=b")["data"]) == 1
+        assert _Handler.hits["warmup"] == 2
+    finally:
+        srv.shutdown()
+
+class _DownHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.close_connection = True  # drop the warm-up without a response
+    def log_message(self, *args): pass
+
+def test_failed_warmup_yields_no_items():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _DownHandler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    try:
+        cfg = {"base_url": f"http://127.0.0.1:{srv.server_address[1]}", "max_retries": 1, "from_days_back": 3}
+        assert try_fetch_nse_announcements(datetime(2024, 1, 10), cfg) == []
+    finally:
+        srv.shutdown()
+
+def test_token_bucket_paces_after_burst():
+    bucket = TokenBucket(rate=50, burst=2)
+    t0 = time.monotonic()
+    for _ in range(7): bucket.acquire()
+    assert time.monotonic() - t0 >= 0.09
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+from src import pipeline
+from src.pipeline import Stage, StageCache, run_pipeline
+from src.storage.db_prices_addon import PricesDB
+from src.storage.files import append_jsonl, raw_path
+from src.utils.metrics import RunReport
+
+DAY = "2024-01-03"
+
+def _fake_fetch(cfg, day, stage):
+    append_jsonl(raw_path(day), [{"title": "Infosys profit growth", "summary": "", "url": "https://x/1",
+                                  "published_at": f"{day}T10:00:00+05:30"}])
+    return True
+
+def test_rerun_skips_unchanged_stages_and_config_change_reruns_downstream(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path); (tmp_path / "db").mkdir()
+    (tmp_path / "syms.csv").write_text("symbol,company_name,aliases\nINFY,Infosys Limited,Infosys\n", encoding="utf-8")
+    idx = pd.bdate_range("2023-12-01", "2024-01-05")
+    bars = pd.DataFrame({"date": idx, **{c: np.arange(1.0, len(idx) + 1) for c in ("open", "high", "low", "close", "adj_close", "volume")}})
+    store = PricesDB("db/news.db"); store.create_tables(); store.upsert("INFY", bars)
+    stages = [Stage("fetch", pipeline._fetch_spec, _fake_fetch)] + pipeline.STAGES[1:]
+    runs = []
+    monkeypatch.setattr(pipeline, "STAGES", [s._replace(run=lambda c, d, m, f=s.run, n=s.name: runs.append(n) or f(c, d, m)) for s in stages])
+    cfg = {"timezone": "Asia/Kolkata", "reference": {"nse_symbols_csv": "syms.csv"},
+           "nlp": {"cache": {"enabled": False}}, "features": {"lookback_days": 20}}
+    report = RunReport("pipeline", DAY, out_dir="reports")
+    assert run_pipeline(cfg, DAY, report=report) == {"fetch": "ran", "nlp": "ran", "features": "ran"}
+    assert report.stages["nlp"].items == 1 and report.stages["features"].db_rows == 1
+    assert pd.read_parquet("data/processed/features/2024-01-03.parquet")["symbol"].tolist() == ["INFY"]
+    assert run_pipeline(cfg, DAY) == {"fetch": "cached", "nlp": "cached", "features": "cached"}
+    cfg["features"]["lookback_days"] = 15
+    assert run_pipeline(cfg, DAY) == {"fetch": "cached", "nlp": "cached", "features": "ran"}
+    store.upsert("INFY", bars[bars["date"] < DAY].tail(1).assign(close=99.0))  # a price correction reruns features
+    assert run_pipeline(cfg, DAY)["features"] == "ran" and run_pipeline(cfg, DAY)["features"] == "cached"
+    (tmp_path / "data/processed/2024-01-03.parquet").unlink()
+    assert run_pipeline(cfg, DAY)["nlp"] == "ran" and runs == ["fetch", "nlp", "features", "features", "features", "nlp"]
+
+def test_stage_with_failed_symbols_is_not_cached(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path); (tmp_path / "out").write_text("x")
+    calls = []
+    def run(cfg, day, m):
+        calls.append(day)
+        if len(calls) == 1: m.failure("symbol", "INFY", "no_data")
+        return True
+    spec = lambda cfg, day: {"config": {}, "inputs": [], "outputs": ["out"], "retry_on": ["symbol"]}
+    monkeypatch.setattr(pipeline, "STAGES", [Stage("features", spec, run)])
+    cache = StageCache("state.json")
+    assert [run_pipeline({}, DAY, cache=cache)["features"] for _ in range(3)] == ["ran", "ran", "cached"] and len(calls) == 2
+
+def test_stage_cache_digest_memo_and_max_age(tmp_path):
+    f = tmp_path / "a.txt"; f.write_text("x")
+    cache = StageCache(str(tmp_path / "state.json"))
+    fp = cache.fingerprint({"k": 1}, [str(f)])
+    cache.record("s|d", fp, [str(f)]); cache.save()
+    again = StageCache(str(tmp_path / "state.json"))
+    assert again.fresh("s|d", fp) and not again.fresh("s|d", fp, max_age=-1)
+    f.write_text("y")
+    assert again.fingerprint({"k": 1}, [str(f)]) != fp and not again.fresh("s|d", fp)
@@ -0,0 +1,94 @@
+
+import numpy as np
+import pandas as pd
+from src.features.fe_prices import fetch_prices, compute_indicators, latest_incremental, compute_indicators_panel, long_frame, asof_join
+from src.features.indicators import IndicatorState
+from src.storage.db_features_addon import FeaturesDB
+from src.storage.db_prices_addon import PricesDB
+
+def _stub(calls, fail=()):
+    def download(tickers, start, end):
+        calls.append((tuple(tickers), start, end))
+        if set(tickers) & set(fail): raise ConnectionError("boom")
+        idx = pd.bdate_range(start, pd.Timestamp(end) - pd.Timedelta(days=1), name="Date")
+        cols = pd.MultiIndex.from_product([tickers, ["Open", "High", "Low", "Close", "Adj Close", "Volume"]])
+        return pd.DataFrame(np.ones((len(idx), len(cols))), index=idx, columns=cols)
+    return download
+
+def test_fetch_prices_downloads_only_missing_tail(tmp_path):
+    store = PricesDB(str(tmp_path / "news.db")); store.create_tables()
+    calls, status = [], {}
+    out = fetch_prices(["INFY", "TCS"], 30, "2024-03-01", store=store, downloader=_stub(calls), status=status)
+    assert calls == [(("INFY.NS", "TCS.NS"), "2024-01-21", "2024-03-01")]
+    assert len(out["INFY"]) == 29 and status["TCS"]["status"] == "ok"
+    calls.clear()
+    out = fetch_prices(["INFY", "TCS"], 30, "2024-03-05", store=store, downloader=_stub(calls))
+    assert calls == [(("INFY.NS", "TCS.NS"), "2024-03-01", "2024-03-05")]
+    assert out["INFY"]["date"].max() == pd.Timestamp("2024-03-04")
+    calls.clear()
+    fetch_prices(["INFY", "TCS"], 30, "2024-03-05", store=store, downloader=_stub(calls))
+    assert calls == []
+
+def test_fetch_prices_records_errors(tmp_path):
+    store = PricesDB(str(tmp_path / "news.db")); store.create_tables()
+    status = {}
+    out = fetch_prices(["BAD"], 10, "2024-03-01", store=store, downloader=_stub([], fail=("BAD.NS",)), status=status)
+    assert out == {} and status["BAD"]["status"] == "error"
+    assert store.fetch_status(["BAD"])["error"].iloc[0] == "ConnectionError: boom"
+
+def _bars(n=120, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    return pd.DataFrame({"date": pd.bdate_range("2024-01-01", periods=n), "open": close, "high": close * 1.01,
+                         "low": close * 0.99, "close": close, "adj_close": close, "volume": rng.integers(1000, 5000, n).astype(float)})
+
+def test_incremental_indicators_match_full_recompute(tmp_path):
+    df, cfg = _bars(), {"indicators": {"rsi_period": 14}}
+    full = compute_indicators(df, cfg).iloc[-1]
+    _, states = latest_incremental({"INFY": df.iloc[:80]}, cfg, {})
+    store = PricesDB(str(tmp_path / "p.db")); store.create_tables(); store.save_indicator_states(states)
+    rows, states = latest_incremental({"INFY": df}, cfg, store.load_indicator_states(["INFY"]))
+    assert states["INFY"]["asof"] == df["date"].iloc[-1].date().isoformat()
+    # an older day's state (backfill) does not overwrite the newer stored one
+    store.save_indicator_states(states); store.save_indicator_states(latest_incremental({"INFY": df.iloc[:50]}, cfg, {})[1])
+    assert store.load_indicator_states(["INFY"])["INFY"] == states["INFY"]
+    for c in ("sma_20", "ema_50", "rsi", "macd_hist", "atr", "ret_5d", "vol_20", "vol_chg"):
+        assert np.isclose(rows[0][c], full[c], rtol=1e-9), c
+    # state built with other parameters is discarded and warm-started
+    rows2, _ = latest_incremental({"INFY": df}, {"indicators": {"rsi_period": 7}}, states)
+    assert np.isclose(rows2[0]["rsi"], compute_indicators(df, {"indicators": {"rsi_period": 7}})["rsi"].iloc[-1])
+    assert IndicatorState.from_dict(states["INFY"]).to_dict() == states["INFY"]
+
+def test_panel_indicators_and_asof_join_match_per_symbol():
+    prices = {"INFY": _bars(120, 1), "TCS": _bars(30, 2), "WIPRO": _bars(3, 3)}
+    panel = compute_indicators_panel(long_frame(prices), {}, chunk_size=2)
+    for sym, df in prices.items():
+        got = panel[panel["symbol"] == sym].drop(columns="symbol").reset_index(drop=True)
+        pd.testing.assert_frame_equal(got, compute_indicators(df, {}))
+    news = pd.DataFrame({"date": pd.Timestamp("2024-01-01"), "symbol": ["TCS", "INFY", "NONE", "INFY"],
+                         "fe_date": ["2024-01-10", "2024-03-01", "2024-03-01", "2023-12-01"]})
+    m = asof_join(news, panel)
+    assert m["symbol"].tolist() == ["TCS", "INFY", "NONE", "INFY"] and "date_news" in m
+    assert m["date"].iloc[0] == pd.Timestamp("2024-01-10") and m["date"].iloc[1] == pd.Timestamp("2024-03-01")
+    assert m["close"].iloc[1] == prices["INFY"].set_index("date").loc["2024-03-01", "close"]
+    assert m["close"].iloc[2:].isna().all()
+
+def test_process_day_discards_states_built_with_other_params(tmp_path, monkeypatch):
+    import json
+    from src import features_process
+    monkeypatch.chdir(tmp_path); (tmp_path / "db").mkdir(); (tmp_path / "data/processed").mkdir(parents=True)
+    df = _bars(120)
+    store = PricesDB("db/news.db"); store.create_tables(); store.upsert("INFY", df); FeaturesDB("db/news.db").create_tables()
+    def run(day, rsi_period):
+        rows = [{"url": f"u{day}", "published_at": f"{day}T10:00:00+05:30", "symbols": ["INFY"], "events": [],
+                 "sentiment_label": "positive", "sentiment_score": 0.5}]
+        (tmp_path / f"data/processed/{day}.json").write_text(json.dumps(rows), encoding="utf-8")
+        cfg = {"features": {"indicators": {"rsi_period": rsi_period}, "store": {"enabled": False}}}
+        features_process.init_worker(cfg, 100, True)
+        features_process.process_day(day)
+        return pd.read_parquet(f"data/processed/features/{day}.parquet").iloc[0]
+    run("2024-05-01", 14)
+    out = run("2024-05-03", 7)
+    full = compute_indicators(df[df["date"] < "2024-05-03"], {"indicators": {"rsi_period": 7}}).iloc[-1]
+    assert np.isclose(out["rsi"], full["rsi"]) and np.isclose(out["sma_20"], full["sma_20"])
+    assert store.load_indicator_states(["INFY"])["INFY"]["params"]["rsi_period"] == 7
@@ -0,0 +1,52 @@
+
+import threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from src.sources.rss_feeds import fetch_from_all_feeds, load_feed_state, save_feed_state
+
+RSS = b"""<?xml version="1.0"?><rss version="2.0"><channel><title>t</title>
+<item><title>Infosys bags order</title><link>https://example.com/a</link><description>s</description></item>
+</channel></rss>"""
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/broken":
+            self.send_response(500); self.end_headers(); return
+        if self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304); self.end_headers(); return
+        self.send_response(200); self.send_header("ETag", '"v1"'); self.end_headers()
+        if self.path == "/slow":  # trickles the body: every read is within the timeout, the whole is not
+            for b in RSS[:40]: self.wfile.write(bytes([b])); self.wfile.flush(); time.sleep(0.02)
+        self.wfile.write(RSS)
+    def log_message(self, *args): pass
+
+def test_fetch_from_all_feeds_conditional_get(tmp_path):
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{srv.server_address[1]}"
+    urls = [f"{base}/feed", f"{base}/broken"]
+    state = str(tmp_path / "state.json")
+    try:
+        stats = []
+        items, new_state = fetch_from_all_feeds(urls, state=load_feed_state(state), stats=stats, timeout=5)
+        assert [it["url"] for it in items] == ["https://example.com/a"]
+        assert stats[0]["status"] == 200 and stats[1]["error"] and list(new_state) == [urls[0]]
+        # validators are only advanced once the caller has stored the items
+        assert fetch_from_all_feeds(urls, state=load_feed_state(state), timeout=5)[0] == items
+        save_feed_state(state, new_state)
+        stats = []
+        assert fetch_from_all_feeds(urls, state=load_feed_state(state), stats=stats, timeout=5)[0] == []
+        assert stats[0]["status"] == 304 and stats[0]["elapsed_ms"] >= 0
+    finally:
+        srv.shutdown()
+
+def test_deadline_runs_from_each_request_start():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{srv.server_address[1]}"
+    try:
+        stats = []
+        # one worker: the fast feeds wait behind the slow one and still get their full deadline
+        items, _ = fetch_from_all_feeds([f"{base}/slow", f"{base}/a", f"{base}/b"], max_workers=1, timeout=0.2, stats=stats)
+        assert "Timeout" in stats[0]["error"] and [st["status"] for st in stats[1:]] == [200, 200] and len(items) == 2
+    finally:
+        srv.shutdown()
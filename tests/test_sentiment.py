@@ -8,3 +8,64 @@ def test_rule_sentiment_negative():
     se = SentimentEngine(engine="rule")
     out = se.score("Company faces SEBI probe and promoter resigns after default.")
     assert out["label"] == "negative"
+def test_score_batch_sorts_batches_and_falls_back_per_item():
+    se = SentimentEngine(engine="rule")
+    calls = []
+    def fake_pipe(x, batch_size=None):
+        if isinstance(x, list):
+            calls.append(x)
+            if any("boom" in t for t in x): raise RuntimeError("batch failed")
+            return [{"label": "positive", "score": 0.9} for _ in x]
+        raise RuntimeError("single failed")
+    se.engine, se._pipe = "hf_finbert", fake_pipe
+    texts = ["a much longer headline here", "short", "boom loss", "mid size text"]
+    out = se.score_batch(texts, batch_size=2)
+    assert calls[0] == ["short", "boom loss"]
+    assert out[0]["engine"] == "hf_finbert" and out[3]["score"] == 0.9
+    assert out[2] == {"label": "negative", "score": -1.0, "engine": "rule"}
+    assert out[1]["engine"] == "rule"
+def test_rule_lexicon_word_boundaries_negation_and_weights():
+    se = SentimentEngine(engine="rule")
+    assert se.score("Glossary of terms")["label"] == "neutral"
+    assert se.score("No loss reported this quarter")["label"] == "positive"
+    assert se.score("No change. Loss widened")["label"] == "negative"
+    assert se.score("Profits hit all-time  high")["score"] == 1.0
+    out = se.score("Record order win but fraud probe")  # 0.5 + 1.5 vs 2.0 + 1.5
+    assert out["label"] == "negative" and abs(out["score"] + 1.5 / 5.5) < 1e-9
+def test_lexicon_weight_memo_is_per_instance():
+    import gc, weakref
+    from src.nlp.sentiment import RuleLexicon
+    a, b = RuleLexicon({"profit*": 1.0}), RuleLexicon({"profit*": -2.0})
+    assert a.weight("profits") == 1.0 and b.weight("profits") == -2.0 and "profits" not in RuleLexicon({"profit*": 1.0})._weights
+    ref = weakref.ref(a); del a; gc.collect()
+    assert ref() is None
+def test_score_series_matches_single_path():
+    import pandas as pd
+    se = SentimentEngine(engine="rule")
+    texts = ["profit growth", None, "no loss", "sebi notice; penalty", "neutral words"] * 60
+    df = se.score_series(pd.Series(texts, index=range(100, 400)))
+    assert list(df.index) == list(range(100, 400)) and len(df) == 300
+    assert [(l, round(s, 9)) for l, s in zip(df["label"], df["score"])] == \
+        [(o["label"], round(o["score"], 9)) for o in map(se.score, [t or "" for t in texts])]
+def test_onnx_engine_contract_and_fallback(tmp_path):
+    import numpy as np
+    from src.nlp.onnx_finbert import OnnxFinbert, agreement_report
+    assert SentimentEngine(engine="onnx_finbert", onnx_model_dir=str(tmp_path)).engine == "rule"
+    class Enc:
+        def __init__(self, n): self.ids, self.attention_mask, self.type_ids = [1] * n, [1] * n, [0] * n
+    class Tok:
+        def encode_batch(self, texts): return [Enc(3) for _ in texts]
+    class Inp:
+        def __init__(self, name): self.name = name
+    class Session:
+        def get_inputs(self): return [Inp("input_ids"), Inp("attention_mask")]
+        def run(self, _, feed):
+            assert set(feed) == {"input_ids", "attention_mask"}
+            return [np.tile([[2.0, 0.0, 0.0]], (len(feed["input_ids"]), 1))]
+    se = SentimentEngine(engine="rule")
+    se.engine, se._pipe = "onnx_finbert", OnnxFinbert(Session(), Tok(), {0: "Negative", 1: "Neutral", 2: "Positive"}, "v1")
+    out = se.score_batch(["a", "bb", "ccc"], batch_size=2)
+    assert out[0]["label"] == "negative" and out[0]["engine"] == "onnx_finbert" and abs(out[0]["score"] + 0.7870) < 1e-3
+    assert se.score("x") == out[0] and se.cache_namespace == "sentiment|onnx_finbert|v1"
+    rep = agreement_report(["loss", "profit"], ["negative", "positive"], [SentimentEngine(engine="rule"), se])
+    assert rep["engines"]["rule"]["accuracy"] == 1.0 and rep["engines"]["onnx_finbert"]["agreement"] == 0.5
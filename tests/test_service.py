@@ -0,0 +1,47 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+import pytest
+from src.service import QueryService, make_server
+from src.storage.db_features_addon import FeaturesDB
+from src.storage.db_nlp_addon import NewsDB_NLP
+
+def _seed(db):
+    nlp = NewsDB_NLP(db); nlp.create_tables()
+    nlp.insert_many([{"url": f"https://x/{i}", "title": f"t{i}", "published_at": f"2024-01-0{i}T10:00:00+05:30", "symbols": ["INFY"],
+                      "events": ["DIVIDEND"] if i == 2 else [], "sentiment_label": "positive", "sentiment_score": 0.5} for i in (1, 2, 3)])
+    fe = FeaturesDB(db); fe.create_tables()
+    fe.insert_many(pd.DataFrame({"fe_date": ["2024-01-02", "2024-01-03"], "symbol": ["INFY", "INFY"], "news_count": [1, 2], "close": [10.0, None]}))
+    return fe
+
+def test_query_service_over_http(tmp_path):
+    db = str(tmp_path / "news.db")
+    fe = _seed(db)
+    svc = QueryService(db, p99_target_ms=1000)
+    server = make_server(svc, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    get = lambda path: json.loads(urllib.request.urlopen(base + path).read())
+    try:
+        latest = get("/features/latest?symbols=infy")
+        assert [(r["fe_date"], r["close"]) for r in latest] == [("2024-01-03", None)]
+        assert [r["url"] for r in get("/news/INFY?start=2024-01-02&end=2024-01-03")] == ["https://x/3", "https://x/2"]
+        assert get("/events/dividend")[0]["symbols"] == ["INFY"]
+        calls, compute = [], svc._compute
+        svc._compute = lambda *a: calls.append(a) or compute(*a)
+        with ThreadPoolExecutor(16) as ex:
+            assert all(len(r) == 2 for r in ex.map(lambda _: get("/features/INFY"), range(200)))
+        assert len(calls) == 1
+        # a committed write from another connection invalidates cached responses
+        fe.insert_many(pd.DataFrame({"fe_date": ["2024-01-04"], "symbol": ["INFY"], "close": [12.0]}))
+        assert len(get("/features/INFY")) == 3 and svc.cache.stats()["invalidations"] == 1
+        with pytest.raises(urllib.error.HTTPError) as err:
+            urllib.request.urlopen(base + "/news/INFY?start=jan")
+        assert err.value.code == 400
+        stats = get("/stats")
+        assert stats["latency"]["features"]["n"] >= 200 and stats["over_target"] == []
+    finally:
+        server.shutdown(); server.server_close(); svc.close()
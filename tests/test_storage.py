@@ -0,0 +1,80 @@
+import json
+import pandas as pd
+import pytest
+from src.storage.db import NewsDB
+from src.storage.db_nlp_addon import NewsDB_NLP
+from src.storage.db_features_addon import FeaturesDB
+from src.storage.files import (PROCESSED_COLUMNS, ProcessedWriter, append_jsonl, iter_raw_items, processed_path,
+                               raw_path, raw_urls, read_processed)
+
+def test_news_insert_many_skips_existing_urls(tmp_path):
+    db = NewsDB(str(tmp_path / "news.db")); db.create_tables()
+    items = [{"source": "rss", "title": "a", "url": "u1"}, {"source": "rss", "title": "b", "url": "u2"}, {"source": "rss", "title": "c", "url": "u1"}]
+    assert db.insert_many(items) == 2
+    assert db.insert_many(items + [{"source": "rss", "title": "d", "url": "u3"}]) == 1
+
+def test_nlp_insert_many_counts_new_rows_and_updates_existing(tmp_path):
+    db = NewsDB_NLP(str(tmp_path / "news.db")); db.create_tables()
+    row = {"url": "u1", "symbols": ["INFY"], "events": [], "sentiment_label": "neutral", "sentiment_score": 0.0}
+    assert db.insert_many([row]) == 1
+    assert db.insert_many([{**row, "symbols": ["TCS"]}, {**row, "url": "u2"}]) == 1
+    with db.engine.connect() as c:
+        assert c.exec_driver_sql("SELECT symbols FROM news_nlp WHERE url='u1'").scalar() == "TCS"
+
+def test_features_insert_many_replaces_same_date_symbol(tmp_path):
+    db = FeaturesDB(str(tmp_path / "news.db")); db.create_tables()
+    df = pd.DataFrame([{"fe_date": "2024-01-02", "symbol": "INFY", "news_count": 1, "close": 10.0}])
+    assert db.insert_many(df) == 1
+    assert db.insert_many(df.assign(news_count=3, EARNINGS_sum=2)) == 1
+    with db.engine.connect() as c:
+        assert c.exec_driver_sql("SELECT COUNT(*), MAX(news_count), MAX(EARNINGS) FROM features").one() == (1, 3, 2)
+
+def test_migrate_legacy_db_and_query_api(tmp_path):
+    import sqlite3
+    from src.storage.migrate import migrate
+    p = str(tmp_path / "news.db")
+    con = sqlite3.connect(p)
+    con.execute("CREATE TABLE news_nlp (id INTEGER PRIMARY KEY, url TEXT UNIQUE NOT NULL, title TEXT, published_at VARCHAR(32), symbols TEXT, events TEXT, sentiment_label VARCHAR(16), sentiment_score VARCHAR(32), sentiment_engine VARCHAR(16), source VARCHAR(32))")
+    con.execute("INSERT INTO news_nlp VALUES (1, 'u1', 't', '2024-01-02T10:00:00+05:30', 'INFY,TCS', 'EARNINGS', 'positive', '0.5', 'rule', 'rss')")
+    con.execute("INSERT INTO news_nlp VALUES (2, 'u2', 't', '05-Jan-2024 09:00:00', 'INFY', '', 'neutral', 'None', 'rule', 'nse_corporate')")
+    con.execute("CREATE TABLE features (id INTEGER PRIMARY KEY, fe_date VARCHAR(16) NOT NULL, symbol VARCHAR(32) NOT NULL, news_count INTEGER, sent_mean VARCHAR(32), pos_ratio VARCHAR(32))")
+    con.execute("INSERT INTO features (fe_date, symbol, news_count, sent_mean, pos_ratio) VALUES ('2024-01-02', 'INFY', 1, '0.5', 'nan')")
+    con.commit(); con.close()
+    migrate(p)
+    con = sqlite3.connect(p)
+    assert con.execute("SELECT typeof(sentiment_score) FROM news_nlp ORDER BY id").fetchall() == [("real",), ("null",)]
+    assert con.execute("SELECT sent_mean, pos_ratio FROM features").fetchone() == (0.5, None)
+    assert con.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    con.close()
+    nlp = NewsDB_NLP(p)
+    assert [r["url"] for r in nlp.news_for_symbol("infy", start="2024-01-01", end="2024-01-05")] == ["u2", "u1"]
+    assert [r["url"] for r in nlp.news_for_symbol("INFY", end="2024-01-02")] == ["u1"]
+    assert nlp.news_for_event("EARNINGS")[0]["symbols"] == ["INFY", "TCS"]
+    nlp.insert_many([{"url": "u1", "symbols": ["WIPRO"], "events": [], "published_at": "2024-01-02T10:00:00+05:30"}])
+    assert nlp.news_for_symbol("TCS") == [] and len(nlp.news_for_symbol("WIPRO")) == 1
+    fe = FeaturesDB(p)
+    fe.insert_many(pd.DataFrame([{"fe_date": "2024-01-03", "symbol": "INFY", "news_count": 2, "sent_mean": 0.1}]))
+    assert fe.latest_features(["INFY"])["fe_date"].tolist() == ["2024-01-03"]
+    assert fe.latest_features(asof="2024-01-02")["sent_mean"].tolist() == [0.5]
+    assert len(fe.features_for_symbol("INFY", start="2024-01-01")) == 2
+
+def test_raw_jsonl_appends_and_reads_legacy(tmp_path):
+    raw = tmp_path / "raw"; raw.mkdir()
+    (raw / "2024-01-02.json").write_text(json.dumps([{"url": "a"}]), encoding="utf-8")
+    append_jsonl(raw_path("2024-01-02", str(raw)), [{"url": "b"}])
+    append_jsonl(raw_path("2024-01-02", str(raw)), iter([{"url": "c", "title": "é"}]))
+    assert [it["url"] for it in iter_raw_items("2024-01-02", str(raw))] == ["a", "b", "c"]
+    assert raw_urls("2024-01-02", str(raw)) == {"a", "b", "c"}
+
+def test_processed_parquet_round_trip(tmp_path):
+    rows = [{"url": "u1", "symbols": ["INFY"], "events": [], "sentiment_score": 0.5, "sentiment_label": "positive"},
+            {"url": "u2", "symbols": [], "events": ["DIVIDEND"], "sentiment_score": None}]
+    with ProcessedWriter(processed_path("2024-01-02", str(tmp_path))) as out:
+        out.write(rows[:1]); out.write(rows[1:])
+    df = read_processed("2024-01-02", str(tmp_path))
+    assert df["symbols"].tolist() == [["INFY"], []] and df["events"].tolist() == [[], ["DIVIDEND"]]
+    assert df["sentiment_score"].dtype == float and list(df.columns) == PROCESSED_COLUMNS
+    with pytest.raises(RuntimeError):
+        with ProcessedWriter(processed_path("2024-01-03", str(tmp_path))) as out:
+            out.write(rows); raise RuntimeError
+    assert read_processed("2024-01-03", str(tmp_path)) is None and len(list(tmp_path.iterdir())) == 1
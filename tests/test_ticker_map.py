@@ -0,0 +1,24 @@
+
+from src.nlp.ticker_map import load_symbol_index, map_symbols
+def test_map_symbols_word_boundaries_and_specificity():
+    index = load_symbol_index("data/reference/nse_symbols.csv", use_pickle=False)
+    assert map_symbols("FETCSX shares slump", index) == []
+    out = map_symbols("TCS and Tata Consultancy Services; Infosys too", index)
+    assert out[0] == "TCS" and "INFY" in out
+    assert map_symbols("Wipro, Infosys, TCS, ITC", index, max_symbols=2) == ["INFY", "WIPRO"]
+def test_load_symbol_index_reuses_compiled_index(tmp_path):
+    p = tmp_path / "syms.csv"
+    p.write_text("symbol,company_name,aliases\nABC,Abc Limited,ABC Co\n", encoding="utf-8")
+    a = load_symbol_index(str(p))
+    assert (tmp_path / "syms.csv.pkl").exists()
+    assert load_symbol_index(str(p)) is a
+    assert map_symbols("abc co wins order", a) == ["ABC"]
+def test_fuzzy_tier_matches_abbreviated_names_after_exact():
+    index = load_symbol_index("data/reference/nse_symbols.csv", use_pickle=False)
+    text = "Tata Consultancy Svcs and Hindustan Unilvr gain; Infosys flat"
+    assert map_symbols(text, index) == ["INFY"]
+    assert map_symbols(text, index, fuzzy_cutoff=80) == ["INFY", "HINDUNILVR", "TCS"]
+    assert map_symbols("Bajaj Finserv shares up", index, fuzzy_cutoff=80) == []
+    assert map_symbols("Kotak Mahindra Bank and Kotak Mahindra Bk", index, fuzzy_cutoff=80) == ["KOTAKBANK"]
+    windows = index.fuzzy.candidates("RELIANCE INDS TATA CONSULTANCY SVCS".split(), max_windows=1)
+    assert sum(map(len, windows.values())) == 1